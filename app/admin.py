@@ -1,3 +1,202 @@
-# from django.contrib import admin
+from contextlib import nullcontext
 
-# Register your models here.
+from app.db.shards import (
+    fanout,
+    fanout_count,
+    is_sharded,
+    ordering_key,
+    shard_databases,
+    shard_of,
+    using_shard,
+)
+from app.models import Pedido, PedidoProduto, Produto, Usuario, VendaDiaria
+from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.admin import UserAdmin
+
+
+class SafeDeleteCascadeAdmin(admin.ModelAdmin):
+    """Lists deleted rows too and (un)deletes through the bulk cascade."""
+
+    list_display = ("__str__", "deleted")
+    list_filter = ("deleted",)
+    actions = ["undelete_selected"]
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.all()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def delete_model(self, request, obj):
+        self.model.objects.filter(pk=obj.pk).delete()
+
+    def delete_queryset(self, request, queryset):
+        queryset.delete()
+
+    def undelete_queryset(self, request, queryset):
+        total, _ = queryset.undelete()
+        return total
+
+    def undelete_selected(self, request, queryset):
+        total = self.undelete_queryset(request, queryset)
+        self.message_user(request, f"{total} registro(s) restaurado(s).")
+
+    undelete_selected.short_description = "Restaurar selecionados"
+
+
+class ShardedResults:
+    """A changelist queryset's rows on every shard, merged in its order.
+
+    A page fetches from each shard the rows up to its end, so later pages
+    cost more, like an OFFSET on one database.
+    """
+
+    def __init__(self, queryset):
+        # No joins, the usuarios or produtos are on the primary
+        self.queryset = queryset.select_related(None)
+
+    def count(self):
+        return fanout_count(self.queryset)
+
+    def __getitem__(self, k):
+        # The changelist and its paginator only take slices
+        rows = fanout(
+            self.queryset, key=ordering_key(self.queryset), limit=k.stop
+        )
+        return rows[k.start :]
+
+    def _clone(self):
+        return self[:]
+
+
+class ShardedChangeList(ChangeList):
+    def get_results(self, request):
+        # Only the listed rows come from the shards, actions still get the
+        # changelist's querysets
+        queryset, root_queryset = self.queryset, self.root_queryset
+        self.queryset = ShardedResults(queryset)
+        self.root_queryset = ShardedResults(root_queryset)
+        try:
+            super().get_results(request)
+        finally:
+            self.queryset, self.root_queryset = queryset, root_queryset
+
+
+class ShardedAdminMixin:
+    """Admin views of a sharded model.
+
+    Lists merge the rows of every shard, and actions run on each shard.
+    A single row is looked up on every shard and edited on its own.
+    Django's delete_selected lists the rows to remove through a single
+    database, so "remove_selected" replaces it.
+    """
+
+    actions = ["remove_selected", "undelete_selected"]
+
+    def shard(self, object_id=None):
+        if not is_sharded(self.model):
+            return nullcontext()
+        alias = None
+        if object_id is not None:
+            alias = shard_of(self.model, unquote(object_id))
+        # Saved rows still go to the shard of their usuario
+        return using_shard(alias or shard_databases()[0])
+
+    def get_changelist(self, request, **kwargs):
+        if is_sharded(self.model):
+            return ShardedChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop(
+            "delete_selected" if is_sharded(self.model) else "remove_selected",
+            None,
+        )
+        return actions
+
+    def delete_queryset(self, request, queryset):
+        if not is_sharded(self.model):
+            return super().delete_queryset(request, queryset)
+        for alias in shard_databases():
+            super().delete_queryset(request, queryset.using(alias))
+
+    def undelete_queryset(self, request, queryset):
+        if not is_sharded(self.model):
+            return super().undelete_queryset(request, queryset)
+        total = 0
+        for alias in shard_databases():
+            total += super().undelete_queryset(request, queryset.using(alias))
+        return total
+
+    def remove_selected(self, request, queryset):
+        total = fanout_count(queryset)
+        self.delete_queryset(request, queryset)
+        self.message_user(request, f"{total} registro(s) removido(s).")
+
+    remove_selected.short_description = "Remover selecionados"
+
+    def changeform_view(
+        self, request, object_id=None, form_url="", extra_context=None
+    ):
+        with self.shard(object_id):
+            return super().changeform_view(
+                request, object_id, form_url, extra_context
+            )
+
+    def delete_view(self, request, object_id, extra_context=None):
+        with self.shard(object_id):
+            return super().delete_view(request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        with self.shard(object_id):
+            return super().history_view(request, object_id, extra_context)
+
+
+@admin.register(Usuario)
+class UsuarioAdmin(SafeDeleteCascadeAdmin, UserAdmin):
+    list_display = ("email", "username", "is_staff", "deleted")
+    list_filter = UserAdmin.list_filter + ("deleted",)
+    ordering = ("email",)
+    fieldsets = UserAdmin.fieldsets + (
+        ("Dados pessoais", {"fields": ("endereco", "cpf", "rg")}),
+    )
+
+
+@admin.register(Produto)
+class ProdutoAdmin(SafeDeleteCascadeAdmin):
+    search_fields = ("nome",)
+
+
+@admin.register(Pedido)
+class PedidoAdmin(ShardedAdminMixin, SafeDeleteCascadeAdmin):
+    list_display = ("__str__", "usuario", "deleted")
+    raw_id_fields = ("usuario",)
+
+
+@admin.register(PedidoProduto)
+class PedidoProdutoAdmin(ShardedAdminMixin, SafeDeleteCascadeAdmin):
+    raw_id_fields = ("pedido", "produto")
+
+
+@admin.register(VendaDiaria)
+class VendaDiariaAdmin(admin.ModelAdmin):
+    """Read-only view of the sales totals, maintained by app.vendas."""
+
+    list_display = ("produto", "dia", "quantidade")
+    list_filter = ("dia",)
+    list_select_related = ("produto",)
+    date_hierarchy = "dia"
+    ordering = ("-dia", "-quantidade")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
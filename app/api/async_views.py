@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db.connections import check_connections
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+# Routes served by async_view when ASYNC_READ_VIEWS is enabled
+ASYNC_READ_ROUTES = {
+    "produto-list",
+    "produto-detail",
+    "pedido-list",
+    "pedidoproduto-list",
+}
+
+# Methods of those routes that run on read_executor
+READ_METHODS = {"GET", "HEAD"}
+
+read_executor = ThreadPoolExecutor(
+    settings.ASYNC_READ_WORKERS, thread_name_prefix="async-read"
+)
+
+
+def run_view(view, request, args, kwargs):
+    # Pool threads never see request_started/finished, so the connection
+    # housekeeping those signals do happens here for every call
+    close_old_connections()
+    check_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # Render here so JSON encoding stays off the event loop too
+        if callable(getattr(response, "render", None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view, executor=read_executor):
+    """Runs a sync view's reads on `executor` from a coroutine.
+
+    Under ASGI the event loop holds slow clients and only the ORM and
+    serialization work takes a pool thread, so concurrency is bounded by
+    the pool size rather than by one thread per connection. Other methods
+    run where Django runs any sync view.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await sync_to_async(view, thread_sensitive=True)(
+                request, *args, **kwargs
+            )
+        loop = asyncio.get_running_loop()
+        # The request's context, e.g. its SQL stats, goes with the call
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            executor, context.run, run_view, view, request, args, kwargs
+        )
+
+    return wrapper
+
+
+def async_read_urls(urlpatterns):
+    """Replaces the views of ASYNC_READ_ROUTES with their async variants."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if pattern.name in ASYNC_READ_ROUTES
+        else pattern
+        for pattern in urlpatterns
+    ]
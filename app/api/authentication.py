@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import User
+
+
+class UserCache:
+    """Bounded, thread-safe LRU of users whose entries expire after `ttl`.
+
+    The cache is per process, so invalidation only reaches the process
+    that handled the change; the TTL bounds how long the others lag.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, pk):
+        with self.lock:
+            try:
+                expires, user = self.entries[pk]
+            except KeyError:
+                return None
+            if expires <= time.monotonic():
+                del self.entries[pk]
+                return None
+            self.entries.move_to_end(pk)
+        # Views may change the user they get, never hand out the cached one
+        return copy.copy(user)
+
+    def set(self, pk, user):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[pk] = (time.monotonic() + self.ttl, copy.copy(user))
+            self.entries.move_to_end(pk)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, *pks):
+        with self.lock:
+            for pk in pks:
+                self.entries.pop(pk, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(
+    settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL
+)
+
+
+class LazyUser(SimpleLazyObject):
+    """A user that is only loaded when something other than its id is used."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, pk, func):
+        super().__init__(func)
+        self.__dict__["pk"] = self.__dict__["id"] = pk
+
+    def __bool__(self):
+        return True
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves users through `user_cache`.
+
+    With AUTH_USER_LAZY a cache miss returns a LazyUser, so requests that
+    only need `request.user.pk` run no user query at all. The inactive
+    check then happens when, and only if, the user is loaded.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        user = user_cache.get(str(user_id))
+        if user is not None:
+            return user
+        if settings.AUTH_USER_LAZY:
+            pk = User._meta.pk.to_python(user_id)
+            return LazyUser(pk, lambda: self.load_user(user_id))
+        return self.load_user(user_id)
+
+    def load_user(self, user_id):
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        user_cache.set(str(user_id), user)
+        return user
@@ -0,0 +1,112 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag, urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from .exceptions import PreconditionFailed
+
+CATALOGO_VERSAO = "catalogo:versao"
+
+
+def versao_catalogo():
+    versao = cache.get(CATALOGO_VERSAO)
+    if versao is None:
+        # Never reuse a number an evicted version may have had
+        cache.add(CATALOGO_VERSAO, time.time_ns(), None)
+        versao = cache.get(CATALOGO_VERSAO)
+    return versao
+
+
+def invalidar_catalogo():
+    try:
+        cache.incr(CATALOGO_VERSAO)
+    except ValueError:
+        versao_catalogo()
+
+
+def opaque_tag(etag):
+    """The ETag without its weak indicator."""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def not_modified(request, etag):
+    """Weak comparison against If-None-Match."""
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or opaque_tag(etag) in map(opaque_tag, etags)
+
+
+def check_if_match(request, pk, versao):
+    """Raises 412 when If-Match is sent and names another pedido version.
+
+    Every ETag issued for the pedido, its expansions or its item list
+    starts with the same pk and version, so any of them is accepted.
+    """
+    if_match = request.META.get("HTTP_IF_MATCH")
+    if not if_match:
+        return
+    base = f"{pk}-{versao}"
+    for etag in parse_etags(if_match):
+        if etag == "*":
+            return
+        # If-Match uses the strong comparison, weak ETags never match
+        valor = etag.strip('"')
+        if not etag.startswith("W/") and (
+            valor == base or valor.startswith(base + "-")
+        ):
+            return
+    raise PreconditionFailed
+
+
+def pedido_etag(pk, versao, *partes):
+    return quote_etag("-".join(str(parte) for parte in (pk, versao, *partes)))
+
+
+class CatalogCacheMixin:
+    """Caches list/retrieve data per catalog version and query string.
+
+    Any Produto write bumps the version, which changes every key and ETag
+    at once; stale entries just expire.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, versao):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        url = f"{request.get_host()}{request.path}?{params}"
+        return f"catalogo:{versao}:{hashlib.md5(url.encode()).hexdigest()}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versao = versao_catalogo()
+        key = self.get_cache_key(request, versao)
+        etag = "W/" + quote_etag(key.rsplit(":", 1)[-1] + f"-{versao}")
+
+        if not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+
+        response["ETag"] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.CATALOG_MAX_AGE
+        )
+        patch_vary_headers(response, ["Accept"])
+        return response
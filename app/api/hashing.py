@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework.exceptions import Throttled
+from rest_framework.request import Request
+
+
+class BoundedExecutor:
+    """Thread pool that rejects work instead of queueing it without limit.
+
+    At most `workers` tasks run and `queue` more wait; past that `submit`
+    raises Throttled, which DRF turns into 429 with Retry-After.
+    """
+
+    def __init__(self, workers, queue, retry_after, name):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.retry_after = retry_after
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise Throttled(wait=self.retry_after)
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+
+password_executor = BoundedExecutor(
+    settings.PASSWORD_HASHING_WORKERS,
+    settings.PASSWORD_HASHING_QUEUE,
+    settings.PASSWORD_HASHING_RETRY_AFTER,
+    "password-hashing",
+)
+
+
+def verify_password(password, encoded):
+    """Returns (is_correct, must_update); touches neither the DB nor a user.
+
+    Unknown users still pay for one hash, like ModelBackend does.
+    """
+    if encoded is None:
+        make_password(password)
+        return False, False
+    upgrade = []
+    return check_password(password, encoded, upgrade.append), bool(upgrade)
+
+
+class PooledPasswordBackend(ModelBackend):
+    """ModelBackend that hashes API logins on `password_executor`.
+
+    Only the hashing leaves the request thread; lookups and rehash saves
+    stay on it. Other logins, e.g. the admin's, are checked inline.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if not isinstance(request, Request):
+            return super().authenticate(
+                request, username=username, password=password, **kwargs
+            )
+
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            user = None
+
+        encoded = user.password if user is not None else None
+        correct, must_update = password_executor.run(
+            verify_password, password, encoded
+        )
+        if not correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.set_password(password)
+            user.save(update_fields=["password"])
+        return user
@@ -0,0 +1,64 @@
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404
+
+# Identity map of the current request, None outside IdentityMapMixin views
+identity_map = ContextVar("identity_map", default=None)
+
+
+class IdentityMap:
+    """Rows the current request already loaded, by model and primary key.
+
+    Views and serializers resolve parents through it, so a request loads
+    each one once. Keys ignore the queryset, so every lookup of a model
+    within a request must use equally scoped querysets.
+    """
+
+    def __init__(self):
+        self.objetos = {}
+
+    def chave(self, model, pk):
+        try:
+            return model, model._meta.pk.to_python(pk)
+        except ValidationError:
+            return None
+
+    def get(self, queryset, pk):
+        chave = self.chave(queryset.model, pk)
+        if chave is None:
+            return get_object_or_404(queryset, pk=pk)
+        if chave not in self.objetos:
+            self.objetos[chave] = get_object_or_404(queryset, pk=pk)
+        return self.objetos[chave]
+
+    def add(self, obj):
+        self.objetos[self.chave(type(obj), obj.pk)] = obj
+        return obj
+
+
+def get_or_404(queryset, pk):
+    """get_object_or_404(queryset, pk=pk), once per request."""
+    mapa = identity_map.get()
+    if mapa is None:
+        return get_object_or_404(queryset, pk=pk)
+    return mapa.get(queryset, pk)
+
+
+def register(obj):
+    """Makes `obj` the request's copy of its row, e.g. one read locked."""
+    mapa = identity_map.get()
+    if mapa is not None:
+        mapa.add(obj)
+    return obj
+
+
+class IdentityMapMixin:
+    """Gives each request its own identity map."""
+
+    def dispatch(self, request, *args, **kwargs):
+        token = identity_map.set(IdentityMap())
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            identity_map.reset(token)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination without COUNT(*); the cursor is opaque to clients.
+
+    The first ordering field is the keyset position, the remaining ones only
+    break ties, so every subclass must end its ordering on a unique column.
+    """
+
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class PedidoPagination(KeysetPagination):
+    ordering = ("-feito", "-id")
+
+
+class ProdutoPagination(KeysetPagination):
+    ordering = ("nome", "id")
+
+
+class UsuarioPagination(KeysetPagination):
+    ordering = ("date_joined", "id")
+
+
+class BuscaPagination(LimitOffsetPagination):
+    """Offset pages for ranked search results, without COUNT(*).
+
+    Fetching one row past the page tells whether there is a next one.
+    """
+
+    default_limit = settings.API_PAGE_SIZE
+    limit_query_param = "page_size"
+    max_limit = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        offset = self.offset + self.limit
+        return replace_query_param(url, self.offset_query_param, offset)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
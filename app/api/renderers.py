@@ -0,0 +1,59 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON object per line; stream() encodes rows as they come."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def encode(self, value):
+        return json.dumps(value, cls=DjangoJSONEncoder) + "\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return self.encode(data).encode(self.charset)
+
+    def stream(self, colunas, rows):
+        for row in rows:
+            yield self.encode(dict(zip(colunas, row)))
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma-separated rows under a header; errors as field, message."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = [
+                (campo, " ".join(map(str, erros)))
+                if isinstance(erros, list)
+                else (campo, erros)
+                for campo, erros in data.items()
+            ]
+        rows = self.stream(["campo", "mensagem"], data)
+        return "".join(rows).encode(self.charset)
+
+    def stream(self, colunas, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(colunas)
+        for row in rows:
+            yield writer.writerow(row)
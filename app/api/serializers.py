@@ -1,8 +1,62 @@
+from datetime import timedelta
+
+from app.db.shards import shard_for
 from app.models import Pedido, PedidoProduto, Produto, Usuario
+from app.vendas import dia_da_venda, registrar_com, somar
 from django.core.validators import RegexValidator
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from .compiled import CompiledReadMixin
+from .identity import get_or_404
+
+
+class ExpandableSerializerMixin:
+    """Adds the nested fields listed in `expandable_fields` on demand.
+
+    The paths to expand come from the `expand` kwarg or, for the root
+    serializer, from `context["expand"]`, e.g. {"itens", "itens.produto"}.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, expand=None, **kwargs):
+        self._expand = expand
+        super().__init__(*args, **kwargs)
+
+    @property
+    def expand(self):
+        if self._expand is not None:
+            return self._expand
+        return self.context.get("expand", frozenset())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, factory in self.expandable_fields.items():
+            if name in self.expand:
+                prefix = name + "."
+                children = frozenset(
+                    path[len(prefix) :]
+                    for path in self.expand
+                    if path.startswith(prefix)
+                )
+                fields[name] = factory(children)
+        return fields
+
+
+def parse_expand(request):
+    value = request.query_params.get("expand", "")
+    paths = set()
+    for path in value.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        # "itens.produto" implies "itens"
+        for i in range(1, len(parts) + 1):
+            paths.add(".".join(parts[:i]))
+    return frozenset(paths)
+
 
 class TokenSerializer(TokenObtainPairSerializer):
     username_field = Usuario.EMAIL_FIELD
@@ -45,13 +99,24 @@ class UsuarioSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProdutoSerializer(serializers.ModelSerializer):
+class ProdutoSerializer(CompiledReadMixin, serializers.ModelSerializer):
     class Meta:
         model = Produto
         exclude = ["deleted"]
 
 
-class PedidoSerializer(serializers.ModelSerializer):
+class PedidoSerializer(
+    ExpandableSerializerMixin, CompiledReadMixin, serializers.ModelSerializer
+):
+    expandable_fields = {
+        "itens": lambda expand: PedidoProdutoSerializer(
+            source="pedidoproduto_set",
+            many=True,
+            read_only=True,
+            expand=expand,
+        ),
+    }
+
     class Meta:
         model = Pedido
         exclude = ["deleted"]
@@ -69,21 +134,174 @@ class PedidoSerializer(serializers.ModelSerializer):
         return instance
 
 
-class PedidoProdutoSerializer(serializers.ModelSerializer):
+class PedidoProdutoSerializer(
+    ExpandableSerializerMixin, CompiledReadMixin, serializers.ModelSerializer
+):
+    expandable_fields = {
+        "produto": lambda expand: ProdutoSerializer(read_only=True),
+    }
+
     class Meta:
         model = PedidoProduto
         exclude = ["deleted", "pedido"]
 
     def create(self, validated_data):
         pedido_pk = self.context["pedidos_pk"]
-        pedido = Pedido.objects.get(pk=pedido_pk)
+        pedido = get_or_404(Pedido.objects.all(), pedido_pk)
         validated_data["pedido"] = pedido
         instance = super().create(validated_data)
         return instance
 
     def update(self, instance, validated_data):
         pedido_pk = self.context["pedidos_pk"]
-        pedido = Pedido.objects.get(pk=pedido_pk)
+        pedido = get_or_404(Pedido.objects.all(), pedido_pk)
         validated_data["pedido"] = pedido
         instance = super().update(instance, validated_data)
         return instance
+
+
+class ItemPedidoListSerializer(serializers.ListSerializer):
+    """Validates (produto, quantidade) lines with a single query.
+
+    Used as a multiple update, it syncs the lines of `context["pedido"]`:
+    inserts new lines, updates or revives existing ones and soft-deletes
+    every line missing from the payload.
+    """
+
+    def validate(self, attrs):
+        ids = [item["produto"] for item in attrs]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Produto repetido.")
+        produtos = Produto.objects.in_bulk(ids)
+        inexistentes = [str(pk) for pk in ids if pk not in produtos]
+        if inexistentes:
+            raise serializers.ValidationError(
+                f"Produtos inexistentes: {', '.join(inexistentes)}"
+            )
+        for item in attrs:
+            item["produto"] = produtos[item["produto"]]
+        return attrs
+
+    def update(self, instance, validated_data):
+        pedido = self.context["pedido"]
+        existentes = {item.produto_id: item for item in instance}
+        dia = dia_da_venda(pedido)
+        variacoes = somar(
+            {},
+            (
+                (item.produto_id, dia, item.quantidade)
+                for item in instance
+                if item.deleted is None
+            ),
+            -1,
+        )
+        novos, alterados, itens = [], [], []
+
+        for item in validated_data:
+            atual = existentes.pop(item["produto"].pk, None)
+            if atual is None:
+                atual = PedidoProduto(pedido=pedido, **item)
+                novos.append(atual)
+            elif atual.deleted or atual.quantidade != item["quantidade"]:
+                atual.quantidade = item["quantidade"]
+                atual.deleted = None
+                alterados.append(atual)
+            itens.append(atual)
+        removidos = [
+            item.pk for item in existentes.values() if item.deleted is None
+        ]
+
+        # The lines live on the database of their pedido
+        db = pedido._state.db
+        with transaction.atomic(using=db):
+            itens_db = PedidoProduto.all_objects.using(db)
+            if removidos:
+                itens_db.filter(pk__in=removidos).update(deleted=timezone.now())
+            if alterados:
+                itens_db.bulk_update(alterados, ["quantidade", "deleted"])
+            itens_db.bulk_create(novos)
+            if novos or alterados or removidos:
+                Pedido.all_objects.using(db).filter(pk=pedido.pk).update(
+                    versao=F("versao") + 1
+                )
+            # Bulk writes send no signals, the sales totals are kept here
+            somar(
+                variacoes,
+                ((item.produto_id, dia, item.quantidade) for item in itens),
+            )
+            registrar_com(variacoes, db)
+        return itens
+
+
+class ItemPedidoSerializer(serializers.Serializer):
+    produto = serializers.UUIDField()
+    quantidade = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        list_serializer_class = ItemPedidoListSerializer
+
+
+class CheckoutSerializer(serializers.Serializer):
+    endereco = serializers.CharField(max_length=200)
+    itens = ItemPedidoSerializer(many=True, allow_empty=False)
+
+    def create(self, validated_data):
+        usuario = self.context["request"].user
+        db = shard_for(usuario.pk)
+        with transaction.atomic(using=db):
+            pedido = Pedido.objects.using(db).create(
+                usuario=usuario, endereco=validated_data["endereco"]
+            )
+            itens = PedidoProduto.objects.using(db).bulk_create(
+                PedidoProduto(pedido=pedido, **item)
+                for item in validated_data["itens"]
+            )
+            dia = dia_da_venda(pedido)
+            variacoes = somar(
+                {},
+                ((item.produto_id, dia, item.quantidade) for item in itens),
+            )
+            registrar_com(variacoes, db)
+        return pedido
+
+    def to_representation(self, instance):
+        serializer = PedidoSerializer(
+            instance, context=self.context, expand=frozenset({"itens"})
+        )
+        return serializer.data
+
+
+class FiltroPedidoSerializer(serializers.Serializer):
+    """Query parameters filtering the pedido list."""
+
+    feito__gte = serializers.DateTimeField(
+        required=False, input_formats=["iso-8601", "%Y-%m-%d"]
+    )
+    feito__lt = serializers.DateTimeField(
+        required=False, input_formats=["iso-8601", "%Y-%m-%d"]
+    )
+    produto = serializers.UUIDField(required=False)
+
+
+class RelatorioVendasSerializer(serializers.Serializer):
+    """Query parameters of the sales reports; the last 7 days by default."""
+
+    MAX_DIAS = 366
+
+    inicio = serializers.DateField(required=False)
+    fim = serializers.DateField(required=False)
+    produto = serializers.UUIDField(required=False)
+    limite = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        fim = attrs.setdefault("fim", timezone.localdate())
+        inicio = attrs.setdefault("inicio", fim - timedelta(days=6))
+        if inicio > fim:
+            raise serializers.ValidationError(
+                "O início deve ser anterior ao fim."
+            )
+        if (fim - inicio).days >= self.MAX_DIAS:
+            raise serializers.ValidationError(
+                f"O período máximo é de {self.MAX_DIAS} dias."
+            )
+        return attrs
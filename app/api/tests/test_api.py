@@ -1,3 +1,4 @@
+from app.metrics import registry
 from app.models import Usuario
 from app.tests.test_models import (
     mock_pedido,
@@ -6,6 +7,8 @@ from app.tests.test_models import (
     mock_superusuario,
     mock_usuario,
 )
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APILiveServerTestCase
 
 
@@ -101,7 +104,7 @@ class UsuarioTestCase(AuthenticatedTestCase):
         self.authenticate_superuser()
         request = self.client.get(self.usuario_url, format="json")
         self.assertEqual(request.status_code, 200)
-        self.assertTrue(request.json())
+        self.assertTrue(request.json()["results"])
 
     def test_post_list(self):
         """POST at api/usuarios/ must allow any"""
@@ -163,7 +166,7 @@ class ProdutoTestCase(AuthenticatedTestCase):
         """GET at api/produtos/ must allow any"""
         request = self.client.get(self.produto_url, format="json")
         self.assertEqual(request.status_code, 200)
-        self.assertTrue(request.json())
+        self.assertTrue(request.json()["results"])
 
         request = self.client.get(self.produto_detail_url, format="json")
         self.assertEqual(request.status_code, 200)
@@ -226,17 +229,57 @@ class PedidoTestCase(AuthenticatedTestCase):
         self.authenticate_superuser()
         request = self.client.get(self.pedido_url, format="json")
         self.assertEqual(request.status_code, 200)
-        self.assertEqual(request.json(), [])
+        self.assertEqual(request.json()["results"], [])
 
         self.authenticate_user()
         request = self.client.get(self.pedido_url, format="json")
         self.assertEqual(request.status_code, 200)
-        self.assertTrue(request.json())
+        self.assertTrue(request.json()["results"])
 
         request = self.client.get(self.pedido_detail_url, format="json")
         self.assertEqual(request.status_code, 200)
         self.assertTrue(request.json())
 
+    def test_pagination(self):
+        """Cursor pages must cover every pedido exactly once"""
+        for _ in range(4):
+            mock_pedido()
+        self.authenticate_user()
+
+        ids = []
+        url = self.pedido_url + "?page_size=2"
+        while url:
+            request = self.client.get(url, format="json")
+            self.assertEqual(request.status_code, 200)
+            result_json = request.json()
+            self.assertNotIn("count", result_json)
+            self.assertLessEqual(len(result_json["results"]), 2)
+            ids += [pedido["id"] for pedido in result_json["results"]]
+            url = result_json["next"]
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_checkout(self):
+        """User-restricted"""
+        checkout_url = self.pedido_url + "checkout/"
+        checkout_data = {
+            "endereco": "test",
+            "itens": [
+                {"produto": str(mock_produto()["produto"].pk), "quantidade": 3}
+            ],
+        }
+
+        request = self.client.post(checkout_url, checkout_data, format="json")
+        self.assertEqual(request.status_code, 401)
+
+        self.authenticate_user()
+        request = self.client.post(checkout_url, checkout_data, format="json")
+        self.assertEqual(request.status_code, 201)
+        result_json = request.json()
+        self.assertEqual(result_json["usuario"], str(self.usuario.pk))
+        self.assertEqual(result_json["itens"][0]["quantidade"], 3)
+
     def test_non_safe_pedido(self):
         """User-restricted"""
         pedido_data = {"usuario": self.usuario.pk, "endereco": "test"}
@@ -333,3 +376,93 @@ class PedidoProdutosTestCase(AuthenticatedTestCase):
             self.pedProduto_url, self.pedProduto_data, format="json"
         )
         self.assertEqual(request.status_code, 201)
+
+    def test_bulk_pedidoProduto(self):
+        """User-restricted"""
+        bulk_url = self.pedProduto_url + "bulk/"
+        outro_produto = mock_produto()["produto"]
+        bulk_data = [
+            {"produto": str(self.produto.pk), "quantidade": 4},
+            {"produto": str(outro_produto.pk), "quantidade": 1},
+        ]
+
+        request = self.client.put(bulk_url, bulk_data, format="json")
+        self.assertEqual(request.status_code, 401)
+
+        self.authenticate_superuser()
+        request = self.client.put(bulk_url, bulk_data, format="json")
+        self.assertEqual(request.status_code, 404)
+
+        self.authenticate_user()
+        request = self.client.put(bulk_url, bulk_data, format="json")
+        self.assertEqual(request.status_code, 200)
+        quantidades = {
+            item["produto"]: item["quantidade"] for item in request.json()
+        }
+        self.assertEqual(
+            quantidades, {str(self.produto.pk): 4, str(outro_produto.pk): 1}
+        )
+
+        request = self.client.put(bulk_url, {"produto": 1}, format="json")
+        self.assertEqual(request.status_code, 400)
+
+
+class MetricsTestCase(AuthenticatedTestCase):
+    def test_metrics(self):
+        """Superuser-restricted"""
+        metrics_url = self.live_server_url + "/api/_metrics"
+        request = self.client.get(metrics_url)
+        self.assertEqual(request.status_code, 401)
+
+        self.authenticate_user()
+        request = self.client.get(metrics_url)
+        self.assertEqual(request.status_code, 403)
+
+        self.authenticate_superuser()
+        request = self.client.get(metrics_url)
+        self.assertEqual(request.status_code, 200)
+        self.assertIn(b"db_connections_opened_total", request.content)
+
+    def test_request_metrics(self):
+        labels = {"view": "pedido-list", "method": "GET"}
+
+        def count(name, **labels):
+            value = registry.get(name, **labels)
+            return getattr(value, "count", value)
+
+        requests = count("http_request_duration_seconds", **labels)
+        sql = count("http_request_sql_queries_total", **labels)
+        unmatched = count(
+            "http_request_duration_seconds", view="unmatched", method="GET"
+        )
+
+        self.authenticate_user()
+        with CaptureQueriesContext(connection) as queries:
+            request = self.client.get(self.live_server_url + "/api/pedidos/")
+        self.assertEqual(request.status_code, 200)
+        self.assertEqual(
+            count("http_request_duration_seconds", **labels), requests + 1
+        )
+        self.assertEqual(
+            count("http_request_sql_queries_total", **labels),
+            sql + len(queries),
+        )
+        self.assertGreater(
+            registry.get("http_request_sql_seconds_total", **labels), 0
+        )
+
+        self.client.get(self.live_server_url + "/api/nada/")
+        self.assertEqual(
+            count(
+                "http_request_duration_seconds", view="unmatched", method="GET"
+            ),
+            unmatched + 1,
+        )
+
+        self.authenticate_superuser()
+        request = self.client.get(self.live_server_url + "/api/_metrics")
+        self.assertIn(
+            b'http_request_duration_seconds_count{method="GET",'
+            b'view="pedido-list"}',
+            request.content,
+        )
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from app.api.async_views import ASYNC_READ_ROUTES, async_read_urls
+from app.api.views import PedidoViewSet
+from app.metrics import registry
+from app.tests.test_models import mock_pedidoProduto
+from app.urls import router
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, override_settings
+from django.urls import include, path
+from rest_framework.response import Response
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+urlpatterns = [path("api/", include(async_read_urls(router.urls)))]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestAsyncReadViews(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        mock_dict = mock_pedidoProduto()
+        self.pedido = mock_dict["data"]["pedido"]
+        self.produto = mock_dict["data"]["produto"]
+        token = AccessToken.for_user(mock_dict["usuario"])
+        self.authorization = f"Bearer {token}"
+
+    def test_routes(self):
+        patterns = async_read_urls(router.urls)
+        async_names = {
+            pattern.name
+            for pattern in patterns
+            if asyncio.iscoroutinefunction(pattern.callback)
+        }
+        self.assertEqual(async_names, ASYNC_READ_ROUTES)
+
+    def headers(self):
+        return [
+            (b"host", b"testserver"),
+            (b"authorization", self.authorization.encode()),
+        ]
+
+    async def get_all(self, urls):
+        client = AsyncClient()
+        return await asyncio.gather(
+            *(client.get(url, headers=self.headers()) for url in urls)
+        )
+
+    def test_same_json(self):
+        urls = [
+            "/api/produtos/",
+            f"/api/produtos/{self.produto.pk}/",
+            "/api/pedidos/",
+            f"/api/pedidos/{self.pedido.pk}/produtos/",
+        ]
+        responses = async_to_sync(self.get_all)(urls)
+
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+        for url, response in zip(urls, responses):
+            with self.subTest(url=url):
+                self.assertEqual(response.status_code, 200)
+                expected = self.client.get(url)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_sql_metrics(self):
+        # The queries run on pool threads, they still count for the request
+        labels = {"view": "pedido-list", "method": "GET"}
+        before = registry.get("http_request_sql_queries_total", **labels)
+        (response,) = async_to_sync(self.get_all)(["/api/pedidos/"])
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(
+            registry.get("http_request_sql_queries_total", **labels), before
+        )
+
+    async def test_writes_off_pool(self):
+        threads = []
+
+        def create(view, request, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return Response(status=201)
+
+        with patch.object(PedidoViewSet, "create", create):
+            response = await AsyncClient().post(
+                "/api/pedidos/", {}, headers=self.headers()
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(threads[0].startswith("async-read"))
+
+    async def test_unauthenticated(self):
+        response = await AsyncClient().get("/api/pedidos/")
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+from app.api.authentication import (
+    CachedJWTAuthentication,
+    LazyUser,
+    UserCache,
+    user_cache,
+)
+from app.api.views import PedidoViewSet
+from app.models import Usuario
+from app.tests.test_models import mock_pedido, mock_usuario
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, APITransactionTestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class TestUserCache(APITransactionTestCase):
+    def test_lru(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_ttl(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        with patch("app.api.authentication.time.monotonic", return_value=0):
+            cache.set("a", 1)
+        with patch("app.api.authentication.time.monotonic", return_value=59):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("app.api.authentication.time.monotonic", return_value=60):
+            self.assertIsNone(cache.get("a"))
+
+
+class TestCachedJWTAuthentication(APITransactionTestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        token = AccessToken.for_user(self.usuario)
+        self.authorization = f"Bearer {token}"
+
+    def authenticate(self):
+        request = self.factory.get("/", HTTP_AUTHORIZATION=self.authorization)
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def test_cached(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.usuario)
+        self.assertIsNot(user, self.authenticate())
+
+    def test_password_change(self):
+        self.authenticate()
+        self.usuario.set_password("y")
+        self.usuario.save()
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertTrue(user.check_password("y"))
+
+    def test_deactivation(self):
+        self.authenticate()
+        self.usuario.is_active = False
+        self.usuario.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_soft_delete(self):
+        self.authenticate()
+        Usuario.objects.filter(pk=self.usuario.pk).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(AUTH_USER_LAZY=True)
+    def test_lazy(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertIsInstance(user, LazyUser)
+            self.assertEqual(user.pk, self.usuario.pk)
+            self.assertTrue(user and user.is_authenticated)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.usuario.email)
+        with self.assertNumQueries(0):
+            self.assertNotIsInstance(self.authenticate(), LazyUser)
+
+    @override_settings(AUTH_USER_LAZY=True)
+    def test_lazy_inactive(self):
+        self.usuario.is_active = False
+        self.usuario.save()
+        user = self.authenticate()
+        with self.assertRaises(AuthenticationFailed):
+            user.email
+
+    @override_settings(AUTH_USER_LAZY=True)
+    def test_pedido_list(self):
+        mock_pedido()
+        view = PedidoViewSet.as_view({"get": "list"})
+        request = self.factory.get(
+            "/api/pedidos/", HTTP_AUTHORIZATION=self.authorization
+        )
+        # Only the page of pedidos, the user is never loaded
+        with self.assertNumQueries(1):
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
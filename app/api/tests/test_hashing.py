@@ -0,0 +1,64 @@
+import threading
+
+from app.api.hashing import BoundedExecutor, password_executor
+from app.api.views import TokenObtainPairView
+from app.tests.test_models import mock_usuario
+from django.contrib.auth import authenticate
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIRequestFactory, APITransactionTestCase
+
+
+class TestBoundedExecutor(APITransactionTestCase):
+    def test_rejects_when_full(self):
+        executor = BoundedExecutor(1, 1, 7, "test")
+        release = threading.Event()
+        running = executor.submit(release.wait)
+        queued = executor.submit(release.wait)
+
+        with self.assertRaises(Throttled) as context:
+            executor.submit(release.wait)
+        self.assertEqual(context.exception.wait, 7)
+
+        release.set()
+        running.result()
+        queued.result()
+        self.assertTrue(executor.run(lambda: True))
+
+
+class TestPooledPasswordBackend(APITransactionTestCase):
+    def setUp(self):
+        self.data = mock_usuario()["data"]
+        self.view = TokenObtainPairView.as_view()
+        self.factory = APIRequestFactory()
+
+    def obtain(self, password=None):
+        data = {
+            "email": self.data["email"],
+            "password": password or self.data["password"],
+        }
+        request = self.factory.post("/api/token/", data, format="json")
+        return self.view(request)
+
+    def fill_executor(self):
+        slots = password_executor.slots
+        acquired = 0
+        while slots.acquire(blocking=False):
+            acquired += 1
+        self.addCleanup(lambda: [slots.release() for _ in range(acquired)])
+
+    def test_token(self):
+        self.assertEqual(self.obtain().status_code, 200)
+        self.assertEqual(self.obtain("wrong").status_code, 401)
+
+    def test_overloaded(self):
+        self.fill_executor()
+        response = self.obtain()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_non_api_login_inline(self):
+        self.fill_executor()
+        usuario = authenticate(
+            None, email=self.data["email"], password=self.data["password"]
+        )
+        self.assertEqual(usuario.email, self.data["email"])
@@ -1,4 +1,6 @@
 from app.api.serializers import (
+    CheckoutSerializer,
+    ItemPedidoSerializer,
     PedidoProdutoSerializer,
     PedidoSerializer,
     ProdutoSerializer,
@@ -6,7 +8,7 @@ from app.api.serializers import (
     UsuarioSerializer,
 )
 from app.api.tests.test_views import mock_request
-from app.models import Usuario
+from app.models import PedidoProduto, Usuario
 from app.tests.test_models import (
     mock_pedido,
     mock_pedidoProduto,
@@ -158,3 +160,87 @@ class TestPedidoProdutoSerializer(APITransactionTestCase):
         pedidoProduto = serializer.save()
         self.assertEqual(pedidoProduto.pedido, self.pedido)
         self.assertEqual(pedidoProduto.produto, self.produto)
+
+
+class TestCheckoutSerializer(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.produtos = [mock_produto()["produto"] for _ in range(3)]
+        self.checkout_data = {
+            "endereco": "x",
+            "itens": [
+                {"produto": produto.pk, "quantidade": 2}
+                for produto in self.produtos
+            ],
+        }
+
+    def test_create(self):
+        request = mock_request(self.usuario)
+        serializer = CheckoutSerializer(
+            data=self.checkout_data, context={"request": request}
+        )
+        self.assertTrue(serializer.is_valid())
+        pedido = serializer.save()
+        self.assertEqual(pedido.usuario, self.usuario)
+        self.assertEqual(pedido.pedidoproduto_set.count(), 3)
+        self.assertEqual(len(serializer.data["itens"]), 3)
+
+    def test_repeated_produto(self):
+        self.checkout_data["itens"].append(self.checkout_data["itens"][0])
+        serializer = CheckoutSerializer(data=self.checkout_data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("itens", serializer.errors)
+
+    def test_missing_produto(self):
+        self.produtos[0].delete()
+        serializer = CheckoutSerializer(data=self.checkout_data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("itens", serializer.errors)
+
+    def test_empty_itens(self):
+        self.checkout_data["itens"] = []
+        serializer = CheckoutSerializer(data=self.checkout_data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("itens", serializer.errors)
+
+
+class TestItemPedidoListSerializer(APITransactionTestCase):
+    def setUp(self):
+        mock_dict = mock_pedidoProduto()
+        self.pedido = mock_dict["data"]["pedido"]
+        self.produto = mock_dict["data"]["produto"]
+        self.outros = [mock_produto()["produto"] for _ in range(2)]
+
+    def sync(self, itens_data):
+        itens = PedidoProduto.all_objects.filter(pedido=self.pedido)
+        serializer = ItemPedidoSerializer(
+            itens, data=itens_data, many=True, context={"pedido": self.pedido}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        return dict(
+            PedidoProduto.objects.filter(pedido=self.pedido).values_list(
+                "produto", "quantidade"
+            )
+        )
+
+    def test_upsert(self):
+        result = self.sync(
+            [
+                {"produto": self.produto.pk, "quantidade": 5},
+                {"produto": self.outros[0].pk, "quantidade": 1},
+            ]
+        )
+        self.assertEqual(result, {self.produto.pk: 5, self.outros[0].pk: 1})
+
+        result = self.sync([{"produto": self.outros[1].pk, "quantidade": 2}])
+        self.assertEqual(result, {self.outros[1].pk: 2})
+        self.assertEqual(
+            PedidoProduto.deleted_objects.filter(pedido=self.pedido).count(), 2
+        )
+
+        result = self.sync([{"produto": self.produto.pk, "quantidade": 3}])
+        self.assertEqual(result, {self.produto.pk: 3})
+
+    def test_empty(self):
+        self.assertEqual(self.sync([]), {})
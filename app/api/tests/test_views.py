@@ -1,19 +1,47 @@
-from unittest.mock import Mock
+import csv
+import json
+import tracemalloc
+from datetime import timedelta
+from unittest.mock import Mock, patch
 
+from app import busca
+from app.api.identity import identity_map
 from app.api.views import (
     PedidoProdutoViewSet,
     PedidoViewSet,
     PermissionsModelViewSet,
+    ProdutoViewSet,
     UsuarioViewSet,
+    VendasViewSet,
 )
-from app.tests.test_models import mock_pedido, mock_pedidoProduto, mock_usuario
+from app.db.routers import ReplicaRouter, replica_alias
+from app.db.shards import shard_alias
+from app.models import Pedido, PedidoProduto, Produto
+from app.tests.test_models import (
+    mock_pedido,
+    mock_pedidoProduto,
+    mock_produto,
+    mock_superusuario,
+    mock_usuario,
+)
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.permissions import IsAdminUser
-from rest_framework.test import APITransactionTestCase
+from rest_framework.test import (
+    APIRequestFactory,
+    APITransactionTestCase,
+    force_authenticate,
+)
 
 
 def mock_request(usuario):
     request = Mock()
     request.user = usuario
+    request.query_params = {}
+    request.META = {}
     return request
 
 
@@ -72,6 +100,17 @@ class TestPedidoViewSet(APITransactionTestCase):
         response = self.view.list(self.request)
         self.assertEqual(response.status_code, 200)
 
+    def test_shard_reset_after_error(self):
+        request = APIRequestFactory().get("/api/pedidos/")
+        force_authenticate(request, user=self.usuario)
+        view = PedidoViewSet.as_view({"get": "list"})
+        with patch.object(
+            PedidoViewSet, "list", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                view(request)
+        self.assertIsNone(shard_alias.get())
+
 
 class TestPedidoProdutoViewSet(APITransactionTestCase):
     def setUp(self):
@@ -87,6 +126,7 @@ class TestPedidoProdutoViewSet(APITransactionTestCase):
         )
 
     def test_retrieve(self):
+        self.view.kwargs["pk"] = self.produto.pk
         response = self.view.retrieve(
             self.request, pk=self.produto.pk, pedidos_pk=self.pedido.pk
         )
@@ -99,3 +139,740 @@ class TestPedidoProdutoViewSet(APITransactionTestCase):
     def test_get_serializer_context(self):
         context = self.view.get_serializer_context()
         self.assertIn("pedidos_pk", context)
+
+    def test_identity_map_reset_after_error(self):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=self.usuario)
+        view = PedidoProdutoViewSet.as_view({"get": "list"})
+        with patch.object(
+            PedidoProdutoViewSet, "list", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                view(request, pedidos_pk=self.pedido.pk)
+        self.assertIsNone(identity_map.get())
+
+
+class TestPedidoExpand(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        self.view = PedidoViewSet.as_view({"get": "list"})
+
+    def add_pedidos(self, count, itens=2):
+        for _ in range(count):
+            pedido = Pedido.objects.create(usuario=self.usuario, endereco="x")
+            for _ in range(itens):
+                PedidoProduto.objects.create(
+                    pedido=pedido,
+                    produto=mock_produto()["produto"],
+                    quantidade=1,
+                )
+
+    def get(self, expand):
+        request = self.factory.get("/api/pedidos/", {"expand": expand})
+        force_authenticate(request, user=self.usuario)
+        response = self.view(request)
+        response.render()
+        return response
+
+    def test_without_expand(self):
+        self.add_pedidos(1)
+        response = self.get("")
+        self.assertNotIn("itens", response.data["results"][0])
+
+    def test_expand_itens(self):
+        self.add_pedidos(1)
+        response = self.get("itens")
+        itens = response.data["results"][0]["itens"]
+        self.assertEqual(len(itens), 2)
+        self.assertNotIsInstance(itens[0]["produto"], dict)
+
+    def test_expand_itens_produto(self):
+        self.add_pedidos(1)
+        response = self.get("itens.produto")
+        itens = response.data["results"][0]["itens"]
+        self.assertEqual(itens[0]["produto"]["nome"], "x")
+
+    def test_query_count_constant(self):
+        self.add_pedidos(1)
+        with self.assertNumQueries(2):
+            self.get("itens.produto")
+
+        self.add_pedidos(5, itens=3)
+        with self.assertNumQueries(2):
+            response = self.get("itens.produto")
+        self.assertEqual(len(response.data["results"]), 6)
+
+
+class TestPedidoProdutoQueryBudget(APITransactionTestCase):
+    """Queries per item endpoint; the pedido is loaded once per request."""
+
+    def setUp(self):
+        mock_dict = mock_pedidoProduto()
+        self.usuario = mock_dict["usuario"]
+        self.pedido = mock_dict["data"]["pedido"]
+        self.produto = mock_dict["data"]["produto"]
+        self.outro = mock_produto()["produto"]
+        PedidoProduto.objects.create(
+            pedido=self.pedido, produto=self.outro, quantidade=1
+        )
+        self.factory = APIRequestFactory()
+
+    def request(self, actions, method="get", path="", data=None, **kwargs):
+        url = f"/api/pedidos/{self.pedido.pk}/produtos/{path}"
+        if method == "get":
+            request = self.factory.get(url, data)
+        else:
+            request = getattr(self.factory, method)(url, data, format="json")
+        force_authenticate(request, user=self.usuario)
+        view = PedidoProdutoViewSet.as_view(actions)
+        return view(request, pedidos_pk=self.pedido.pk, **kwargs)
+
+    def test_list(self):
+        for expand in ["", "produto"]:
+            # pedido, items (joined with their produtos)
+            with self.assertNumQueries(2):
+                response = self.request(
+                    {"get": "list"}, data={"expand": expand}
+                )
+            self.assertEqual(len(response.data), 2)
+
+    def test_retrieve(self):
+        # pedido, item
+        with self.assertNumQueries(2):
+            response = self.request({"get": "retrieve"}, pk=self.outro.pk)
+        self.assertEqual(response.data["produto"], self.outro.pk)
+
+    def test_create(self):
+        produto = mock_produto()["produto"]
+        data = {"produto": str(produto.pk), "quantidade": 2}
+        # pedido, produto, item, versao bump, BEGIN and sales totals
+        with self.assertNumQueries(6):
+            response = self.request({"post": "create"}, "post", data=data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        data = {"produto": str(self.outro.pk), "quantidade": 5}
+        # pedido, item, produto, BEGIN, pedido locked, sales of the item
+        # before the change, item, versao bump, sales totals
+        with self.assertNumQueries(9):
+            response = self.request(
+                {"put": "update"}, "put", data=data, pk=self.outro.pk
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            PedidoProduto.objects.get(produto=self.outro).quantidade, 5
+        )
+
+    def test_destroy(self):
+        # pedido, item, its sales, soft delete, versao bump, BEGIN and
+        # sales totals
+        with self.assertNumQueries(7):
+            response = self.request(
+                {"delete": "destroy"}, "delete", pk=self.outro.pk
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(PedidoProduto.objects.filter(pedido=self.pedido))
+
+    def test_bulk(self):
+        data = [{"produto": str(self.produto.pk), "quantidade": 3}]
+        # BEGIN, pedido locked, produtos, items, SAVEPOINT, removal,
+        # update, versao bump, sales totals, RELEASE, versao for the ETag
+        with self.assertNumQueries(11):
+            response = self.request({"put": "bulk"}, "put", "bulk/", data)
+        self.assertEqual(response.status_code, 200)
+
+
+class TestPedidoCheckout(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        self.view = PedidoViewSet.as_view({"post": "checkout"})
+
+    def test_query_count(self):
+        produtos = [mock_produto()["produto"] for _ in range(50)]
+        checkout_data = {
+            "endereco": "x",
+            "itens": [
+                {"produto": str(produto.pk), "quantidade": 1}
+                for produto in produtos
+            ],
+        }
+        request = self.factory.post(
+            "/api/pedidos/checkout/", checkout_data, format="json"
+        )
+        force_authenticate(request, user=self.usuario)
+
+        # produtos, BEGIN, pedido, itens, sales totals upsert, itens for
+        # the response
+        with self.assertNumQueries(6):
+            response = self.view(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["itens"]), 50)
+        self.assertEqual(
+            PedidoProduto.objects.filter(pedido__usuario=self.usuario).count(),
+            50,
+        )
+
+
+class TestPedidoFiltros(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        self.view = PedidoViewSet.as_view({"get": "list"})
+        self.cafe = mock_produto()["produto"]
+        self.leite = mock_produto()["produto"]
+        agora = timezone.now()
+        self.pedidos = []
+        for dias, produtos in [
+            (40, [self.cafe]),
+            (10, [self.cafe, self.leite]),
+            (5, [self.leite]),
+        ]:
+            pedido = Pedido.objects.create(usuario=self.usuario, endereco="x")
+            Pedido.objects.filter(pk=pedido.pk).update(
+                feito=agora - timedelta(days=dias)
+            )
+            for produto in produtos:
+                PedidoProduto.objects.create(
+                    pedido=pedido, produto=produto, quantidade=1
+                )
+            self.pedidos.append(pedido)
+
+    def get(self, **params):
+        request = self.factory.get("/api/pedidos/", params)
+        force_authenticate(request, user=self.usuario)
+        return self.view(request)
+
+    def ids(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        return [pedido["id"] for pedido in response.data["results"]]
+
+    def test_feito(self):
+        inicio = timezone.localdate() - timedelta(days=30)
+        self.assertEqual(
+            self.ids(feito__gte=inicio.isoformat()),
+            [str(self.pedidos[2].pk), str(self.pedidos[1].pk)],
+        )
+        fim = timezone.now() - timedelta(days=7)
+        self.assertEqual(
+            self.ids(feito__lt=fim.isoformat()),
+            [str(self.pedidos[1].pk), str(self.pedidos[0].pk)],
+        )
+
+    def test_produto(self):
+        self.assertEqual(
+            self.ids(produto=str(self.cafe.pk)),
+            [str(self.pedidos[1].pk), str(self.pedidos[0].pk)],
+        )
+        inicio = timezone.now() - timedelta(days=30)
+        with CaptureQueriesContext(connection) as queries:
+            ids = self.ids(
+                produto=str(self.cafe.pk), feito__gte=inicio.isoformat()
+            )
+        self.assertEqual(ids, [str(self.pedidos[1].pk)])
+        # A single query, with no join on the items
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_invalid(self):
+        self.assertEqual(self.get(feito__gte="ontem").status_code, 400)
+        self.assertEqual(self.get(produto="x").status_code, 400)
+
+
+class TestPedidoExport(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        # The renderers come with the action, as the router passes them
+        self.view = PedidoViewSet.as_view(
+            {"get": "export"}, **PedidoViewSet.export.kwargs
+        )
+        self.produto = mock_produto()["produto"]
+
+    def add_itens(self, usuario, count):
+        produtos = Produto.objects.bulk_create(
+            Produto(nome=f"p{i}", descricao="x") for i in range(count)
+        )
+        pedido = Pedido.objects.create(usuario=usuario, endereco="x")
+        PedidoProduto.objects.bulk_create(
+            PedidoProduto(pedido=pedido, produto=produto, quantidade=1)
+            for produto in produtos
+        )
+        return pedido
+
+    def export(self, usuario, **params):
+        request = self.factory.get("/api/pedidos/export/", params)
+        force_authenticate(request, user=usuario)
+        return self.view(request)
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        pedido = self.add_itens(self.usuario, 2)
+        self.add_itens(mock_superusuario()["usuario"], 1)
+        response = self.export(self.usuario, format="ndjson")
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(row) for row in self.content(response).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["pedido"], str(pedido.pk))
+        self.assertEqual(rows[0]["usuario"], str(self.usuario.pk))
+        self.assertEqual({row["nome"] for row in rows}, {"p0", "p1"})
+
+    def test_csv(self):
+        self.add_itens(self.usuario, 2)
+        admin = mock_superusuario()["usuario"]
+        self.add_itens(admin, 1)
+        response = self.export(admin, format="csv")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="pedidos.csv"',
+        )
+        rows = list(csv.reader(self.content(response).splitlines()))
+        self.assertEqual(rows[0][-2:], ["nome", "quantidade"])
+        # Admins export everyone's pedidos
+        self.assertEqual(len(rows), 4)
+
+    def test_filters(self):
+        self.add_itens(self.usuario, 2)
+        pedido = Pedido.objects.create(usuario=self.usuario, endereco="x")
+        PedidoProduto.objects.create(
+            pedido=pedido, produto=self.produto, quantidade=1
+        )
+        response = self.export(self.usuario, produto=str(self.produto.pk))
+        rows = self.content(response).splitlines()
+        self.assertEqual(len(rows), 1)
+
+        response = self.export(self.usuario, format="csv", produto="x")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.render().content.splitlines()[0], b"campo,mensagem"
+        )
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=100)
+    def test_constant_memory(self):
+        def peak(count):
+            self.add_itens(self.usuario, count)
+            response = self.export(self.usuario, format="csv")
+            tracemalloc.start()
+            try:
+                rows = sum(1 for _ in response.streaming_content)
+                return rows, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        rows, small = peak(200)
+        self.assertEqual(rows, 201)
+        rows, large = peak(3800)
+        self.assertEqual(rows, 4001)
+        # 20x the rows, about the same peak: only a chunk is held at once
+        self.assertLess(large, small * 2)
+
+
+class TestCompiledSerializers(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.factory = APIRequestFactory()
+        produtos = [
+            Produto.objects.create(nome=f"Café {i}", descricao="Torrado")
+            for i in range(3)
+        ]
+        for i in range(3):
+            pedido = Pedido.objects.create(usuario=self.usuario, endereco="x")
+            for produto in produtos[i:]:
+                PedidoProduto.objects.create(
+                    pedido=pedido, produto=produto, quantidade=i + 1
+                )
+        self.pedido = pedido
+        # A soft-deleted produto is still shown in the items that have it
+        Produto.objects.filter(pk=produtos[2].pk).update(deleted=timezone.now())
+
+    def content(self, viewset, path, params, **kwargs):
+        """Rendered body with the compiled path and without it."""
+        view = viewset.as_view({"get": "list"})
+        bodies = []
+        for compiled in (True, False):
+            cache.clear()
+            with override_settings(API_COMPILED_SERIALIZERS=compiled):
+                request = self.factory.get(path, params)
+                force_authenticate(request, user=self.usuario)
+                response = view(request, **kwargs)
+                bodies.append(response.render().content)
+        self.assertEqual(response.status_code, 200)
+        return bodies
+
+    def test_produtos(self):
+        for params in [{}, {"page_size": 2}, {"search": "cafe"}]:
+            compiled, drf = self.content(
+                ProdutoViewSet, "/api/produtos/", params
+            )
+            self.assertEqual(compiled, drf)
+
+    def test_pedidos(self):
+        for expand in ["", "itens", "itens.produto"]:
+            compiled, drf = self.content(
+                PedidoViewSet, "/api/pedidos/", {"expand": expand}
+            )
+            self.assertEqual(compiled, drf)
+        self.assertIn(b'"descricao":"Torrado"', compiled)
+
+    def test_itens(self):
+        for expand in ["", "produto"]:
+            compiled, drf = self.content(
+                PedidoProdutoViewSet,
+                f"/api/pedidos/{self.pedido.pk}/produtos/",
+                {"expand": expand},
+                pedidos_pk=self.pedido.pk,
+            )
+            self.assertEqual(compiled, drf)
+
+    def test_query_count(self):
+        view = PedidoViewSet.as_view({"get": "list"})
+        request = self.factory.get("/api/pedidos/", {"expand": "itens.produto"})
+        force_authenticate(request, user=self.usuario)
+        # pedidos, then their items joined with the produtos
+        with self.assertNumQueries(2):
+            view(request)
+
+
+class TestProdutoCache(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.produto = mock_produto()["produto"]
+        self.factory = APIRequestFactory()
+        self.view = ProdutoViewSet.as_view({"get": "list"})
+
+    def get(self, **extra):
+        response = self.view(self.factory.get("/api/produtos/", **extra))
+        response.render()
+        return response
+
+    def test_cached(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("max-age", response["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            cached = self.get()
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_not_modified(self):
+        etag = self.get()["ETag"]
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidation(self):
+        response = self.get()
+
+        self.produto.nome = "y"
+        self.produto.save()
+        changed = self.get()
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+        self.assertEqual(changed.data["results"][0]["nome"], "y")
+        response = self.get(HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+        Produto.objects.filter(pk=self.produto.pk).delete()
+        self.assertEqual(self.get().data["results"], [])
+
+    def test_query_params(self):
+        response = self.get()
+        other = self.view(self.factory.get("/api/produtos/", {"page_size": 1}))
+        self.assertNotEqual(other["ETag"], response["ETag"])
+
+
+class TestProdutoBusca(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = ProdutoViewSet.as_view({"get": "list"})
+        self.cafe = Produto.objects.create(
+            nome="Café torrado", descricao="Grãos selecionados"
+        )
+        self.cafeteira = Produto.objects.create(
+            nome="Cafeteira elétrica", descricao="Prepara café e chá"
+        )
+        Produto.objects.create(nome="Açúcar", descricao="Refinado")
+        Produto.objects.create(nome="Xícara", descricao="Para café")
+
+    def search(self, busca, **params):
+        request = self.factory.get(
+            "/api/produtos/", {"search": busca, **params}
+        )
+        return self.view(request).data
+
+    def nomes(self, busca):
+        return [produto["nome"] for produto in self.search(busca)["results"]]
+
+    def test_ranked_accent_insensitive(self):
+        self.assertEqual(self.nomes("acucar"), ["Açúcar"])
+        self.assertEqual(self.nomes("CAFÉ torrado"), ["Café torrado"])
+        nomes = self.nomes("cafe")
+        self.assertEqual(
+            set(nomes), {"Café torrado", "Cafeteira elétrica", "Xícara"}
+        )
+        # Matches in the nome rank first
+        self.assertEqual(nomes[-1], "Xícara")
+        self.assertEqual(self.nomes("cha"), ["Cafeteira elétrica"])
+        self.assertEqual(self.nomes('"*) OR'), [])
+
+    def test_index_in_sync(self):
+        self.cafe.nome = "Chá verde"
+        self.cafe.save()
+        self.assertEqual(self.nomes("torrado"), [])
+        self.assertEqual(len(self.nomes("cha")), 2)
+
+        self.cafeteira.delete()
+        self.assertEqual(self.nomes("cha"), ["Chá verde"])
+        Produto.objects.filter(pk=self.cafe.pk).delete()
+        self.assertEqual(self.nomes("cha"), [])
+        Produto.all_objects.filter(pk=self.cafe.pk).undelete()
+        self.assertEqual(self.nomes("cha"), ["Chá verde"])
+
+    def test_pagination(self):
+        page = self.search("caf", page_size=1)
+        self.assertEqual(len(page["results"]), 1)
+        self.assertIn("offset=1", page["next"])
+        self.assertNotIn("count", page)
+        page = self.search("caf", page_size=2, offset=1)
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIsNone(page["next"])
+
+    def test_other_databases(self):
+        # Unranked substring search, accents and all
+        with patch.object(connection, "vendor", "mysql"):
+            self.assertEqual(
+                self.nomes("café"),
+                ["Cafeteira elétrica", "Café torrado", "Xícara"],
+            )
+
+    def test_repair(self):
+        busca.remover(connection)
+        busca.instalar(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER app_produto_busca_au")
+        busca.reparar(connection)
+        Produto.objects.filter(pk=self.cafe.pk).update(nome="Chá")
+        self.assertEqual(len(self.nomes("cha")), 2)
+
+
+class TestPedidoVersao(APITransactionTestCase):
+    def setUp(self):
+        mock_dict = mock_pedidoProduto()
+        self.usuario = mock_dict["usuario"]
+        self.pedido = mock_dict["data"]["pedido"]
+        self.produto = mock_dict["data"]["produto"]
+        self.factory = APIRequestFactory()
+
+    def request(self, method, path, actions, data=None, **kwargs):
+        url = f"/api/pedidos/{self.pedido.pk}/{path}"
+        request = getattr(self.factory, method)(
+            url, data, format="json", **kwargs
+        )
+        force_authenticate(request, user=self.usuario)
+        viewset = PedidoViewSet if not path else PedidoProdutoViewSet
+        view_kwargs = (
+            {"pk": self.pedido.pk}
+            if not path
+            else {"pedidos_pk": self.pedido.pk}
+        )
+        response = viewset.as_view(actions)(request, **view_kwargs)
+        response.render()
+        return response
+
+    def retrieve(self, **kwargs):
+        return self.request("get", "", {"get": "retrieve"}, **kwargs)
+
+    def test_not_modified(self):
+        # Loading the pedido is the only query without a validator
+        with self.assertNumQueries(1):
+            etag = self.retrieve()["ETag"]
+        with self.assertNumQueries(1):
+            response = self.retrieve(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        etag = self.request("get", "produtos/", {"get": "list"})["ETag"]
+        response = self.request(
+            "get", "produtos/", {"get": "list"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def versao(self):
+        return Pedido.objects.get(pk=self.pedido.pk).versao
+
+    def test_item_change_bumps_versao(self):
+        etag = self.retrieve()["ETag"]
+        versao = self.versao()
+        PedidoProduto.objects.filter(pedido=self.pedido).get().delete()
+        self.assertEqual(self.versao(), versao + 1)
+        response = self.retrieve(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_if_match(self):
+        etag = self.retrieve()["ETag"]
+        versao = self.versao()
+        data = {"usuario": self.usuario.pk, "endereco": "y"}
+        put = {"put": "update"}
+
+        response = self.request("put", "", put, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.request("put", "", put, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.versao(), versao + 1)
+
+        bulk = [{"produto": str(self.produto.pk), "quantidade": 3}]
+        response = self.request(
+            "put", "produtos/bulk/", {"put": "bulk"}, bulk, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 412)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_test"])
+class TestReplicaRouting(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = mock_usuario()["usuario"]
+        self.produto = mock_produto()["produto"]
+        self.factory = APIRequestFactory()
+        self.aliases = []
+
+        # Record where reads would go but still run them on the test DB
+        def db_for_read(router, model, **hints):
+            self.aliases.append(replica_alias.get())
+            return "default"
+
+        patcher = patch.object(ReplicaRouter, "db_for_read", db_for_read)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method, view, url, data=None):
+        request = getattr(self.factory, method)(url, data, format="json")
+        force_authenticate(request, user=self.usuario)
+        self.aliases = []
+        response = view(request)
+        response.render()
+        return response
+
+    def list_pedidos(self):
+        view = PedidoViewSet.as_view({"get": "list", "post": "checkout"})
+        return self.request("get", view, "/api/pedidos/")
+
+    def test_reads_use_replica(self):
+        self.list_pedidos()
+        self.assertEqual(set(self.aliases), {"replica_test"})
+        self.assertIsNone(replica_alias.get())
+
+        # Catalog cache misses read the primary
+        view = ProdutoViewSet.as_view({"get": "list"})
+        self.request("get", view, "/api/produtos/")
+        self.assertEqual(set(self.aliases), {None})
+
+    def test_reset_after_error(self):
+        with patch.object(
+            PedidoViewSet, "list", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.list_pedidos()
+        self.assertIsNone(replica_alias.get())
+
+    def test_sticky_after_write(self):
+        view = PedidoViewSet.as_view({"post": "checkout"})
+        data = {
+            "endereco": "x",
+            "itens": [{"produto": str(self.produto.pk), "quantidade": 1}],
+        }
+        response = self.request("post", view, "/api/pedidos/checkout/", data)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("replica_test", self.aliases)
+
+        response = self.list_pedidos()
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(set(self.aliases), {None})
+
+        cache.clear()
+        self.list_pedidos()
+        self.assertEqual(set(self.aliases), {"replica_test"})
+
+
+class TestRelatorioVendas(APITransactionTestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.admin = mock_superusuario()["usuario"]
+        self.produtos = [mock_produto()["produto"] for _ in range(3)]
+        self.factory = APIRequestFactory()
+
+    def request(self, method, path, actions, user, data=None, **kwargs):
+        request = getattr(self.factory, method)(path, data, format="json")
+        force_authenticate(request, user=user)
+        view = actions[0].as_view(actions[1])
+        return view(request, **kwargs)
+
+    def checkout(self, quantidades):
+        itens = [
+            {"produto": str(produto.pk), "quantidade": quantidade}
+            for produto, quantidade in zip(self.produtos, quantidades)
+        ]
+        response = self.request(
+            "post",
+            "/api/pedidos/checkout/",
+            (PedidoViewSet, {"post": "checkout"}),
+            self.usuario,
+            {"endereco": "x", "itens": itens},
+        )
+        return response.data["id"]
+
+    def report(self, action, user=None, **params):
+        return self.request(
+            "get",
+            f"/api/relatorios/vendas/{action}/",
+            (VendasViewSet, {"get": action.replace("-", "_")}),
+            user or self.admin,
+            params,
+        )
+
+    def test_mais_vendidos(self):
+        self.checkout([1, 6, 3])
+        pedido_pk = self.checkout([1, 1])
+        self.request(
+            "put",
+            f"/api/pedidos/{pedido_pk}/produtos/bulk/",
+            (PedidoProdutoViewSet, {"put": "bulk"}),
+            self.usuario,
+            [{"produto": str(self.produtos[0].pk), "quantidade": 4}],
+            pedidos_pk=pedido_pk,
+        )
+
+        response = self.report("mais-vendidos", limite=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (venda["produto"], venda["quantidade"])
+                for venda in response.data
+            ],
+            [(self.produtos[1].pk, 6), (self.produtos[0].pk, 5)],
+        )
+
+    def test_diarias(self):
+        self.checkout([2, 1])
+        response = self.report("diarias", produto=str(self.produtos[0].pk))
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["quantidade"], 2)
+
+    def test_validation_and_permissions(self):
+        response = self.report("diarias", inicio="2020-01-02", fim="2020-01-01")
+        self.assertEqual(response.status_code, 400)
+        response = self.report("diarias", user=self.usuario)
+        self.assertEqual(response.status_code, 403)
@@ -1,20 +1,70 @@
-from app.models import Pedido, PedidoProduto, Produto, Usuario
+from app.busca import buscar
+from app.db.routers import (
+    choose_replica,
+    is_sticky,
+    replica_alias,
+    stick_to_primary,
+)
+from app.db.shards import (
+    is_sharded,
+    shard_alias,
+    shard_databases,
+    shard_for,
+)
+from app.exportacao import COLUNAS, linhas
+from app.metrics import registry
+from app.models import Pedido, PedidoProduto, Produto, Usuario, VendaDiaria
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import IsAdminUser
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenViewBase
 
+from .cache import (
+    CatalogCacheMixin,
+    check_if_match,
+    not_modified,
+    pedido_etag,
+    versao_catalogo,
+)
+from .compiled import CompiledReadMixin
+from .identity import IdentityMapMixin, get_or_404, register
+from .pagination import (
+    BuscaPagination,
+    PedidoPagination,
+    ProdutoPagination,
+    UsuarioPagination,
+)
+from .renderers import CSVRenderer, NDJSONRenderer
 from .serializers import (
+    CheckoutSerializer,
+    FiltroPedidoSerializer,
+    ItemPedidoSerializer,
     PedidoProdutoSerializer,
     PedidoSerializer,
     ProdutoSerializer,
+    RelatorioVendasSerializer,
     TokenSerializer,
     UsuarioSerializer,
+    parse_expand,
 )
 
 
+def with_produto(queryset):
+    """Loads the produto of each item along with `queryset`."""
+    if is_sharded(queryset.model):
+        # Produtos stay on the primary, out of reach of a join on the shard
+        return queryset.prefetch_related("produto")
+    return queryset.select_related("produto")
+
+
 class PermissionsModelViewSet(viewsets.ModelViewSet):
     permission_dict = {}
 
@@ -27,9 +77,123 @@ class PermissionsModelViewSet(viewsets.ModelViewSet):
             return [permission() for permission in self.permission_classes]
 
 
-class UsuarioViewSet(PermissionsModelViewSet):
+class ExpandMixin:
+    """Passes `?expand=` on safe requests down to the serializers."""
+
+    def get_expand(self):
+        if self.request.method not in SAFE_METHODS:
+            return frozenset()
+        return parse_expand(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand"] = self.get_expand()
+        return context
+
+    def get_expand_etag_parts(self, produto_path):
+        """ETag parts for the expanded representation.
+
+        Expanded produtos are versioned by the catalog, not by the pedido.
+        """
+        expand = self.get_expand()
+        partes = sorted(expand)
+        if produto_path in expand:
+            partes.append(versao_catalogo())
+        return partes
+
+
+class ReplicaReadMixin:
+    """Runs list/retrieve on one read replica for the whole request.
+
+    With `sticky_writes`, a successful write keeps the user on the primary
+    for a while, so the next reads see it before the replicas catch up.
+    """
+
+    read_actions = ("list", "retrieve")
+    sticky_writes = False
+    replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.read_actions and not is_sticky(request.user.pk):
+            self.replica_token = replica_alias.set(choose_replica())
+
+    def dispatch(self, request, *args, **kwargs):
+        # Not in finalize_response, which an unhandled exception skips
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.replica_token is not None:
+                replica_alias.reset(self.replica_token)
+                self.replica_token = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            self.sticky_writes
+            and request.method not in SAFE_METHODS
+            and status.is_success(response.status_code)
+        ):
+            stick_to_primary(request.user.pk)
+        return response
+
+
+class ShardMixin:
+    """Routes the request's pedido queries to the shard of its usuario."""
+
+    shard_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            self.shard_token = shard_alias.set(shard_for(request.user.pk))
+
+    def dispatch(self, request, *args, **kwargs):
+        # Not in finalize_response, which an unhandled exception skips
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.shard_token is not None:
+                shard_alias.reset(self.shard_token)
+                self.shard_token = None
+
+
+class CompiledListMixin:
+    """Lists through the compiled read path of serializers that opt in."""
+
+    def list_data(self, queryset, paginate=True):
+        """Serialized rows of `queryset`, or of its page when `paginate`."""
+        serializer = self.get_serializer()
+        if settings.API_COMPILED_SERIALIZERS and isinstance(
+            serializer, CompiledReadMixin
+        ):
+            compiled = serializer.compiled()
+            # Nested lists are read from the database of the rows
+            db = queryset.db
+            rows = compiled.values(queryset)
+            if paginate:
+                rows = self.paginate_queryset(rows)
+            return compiled.represent(rows, db)
+        if paginate:
+            queryset = self.paginate_queryset(queryset)
+        return self.get_serializer(queryset, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_paginated_response(self.list_data(queryset))
+
+
+class BulkDestroyMixin:
+    """Destroys through the queryset, i.e. the set-based soft-delete cascade."""
+
+    def perform_destroy(self, instance):
+        type(instance).objects.filter(pk=instance.pk).delete()
+
+
+class UsuarioViewSet(BulkDestroyMixin, PermissionsModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
+    pagination_class = UsuarioPagination
     permission_dict = {"create": [], "list": [IsAdminUser]}
 
     def get_object(self):
@@ -42,7 +206,14 @@ class UsuarioViewSet(PermissionsModelViewSet):
         return obj
 
 
-class ProdutoViewSet(PermissionsModelViewSet):
+# Not on replicas: a cache miss just after a catalog write would store a
+# lagging replica's rows under the new version
+class ProdutoViewSet(
+    CatalogCacheMixin,
+    CompiledListMixin,
+    BulkDestroyMixin,
+    PermissionsModelViewSet,
+):
     queryset = Produto.objects.all()
     serializer_class = ProdutoSerializer
     permission_dict = {
@@ -54,48 +225,313 @@ class ProdutoViewSet(PermissionsModelViewSet):
         "retrieve": [],
     }
 
+    def get_busca(self):
+        if self.action != "list":
+            return ""
+        return self.request.query_params.get("search", "").strip()
+
+    @property
+    def pagination_class(self):
+        # Search results are ordered by relevance, not by the cursor keys
+        return BuscaPagination if self.get_busca() else ProdutoPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        busca = self.get_busca()
+        if busca:
+            queryset = buscar(queryset, busca)
+        return queryset
+
 
-class PedidoViewSet(PermissionsModelViewSet):
+class PedidoViewSet(
+    CompiledListMixin,
+    ExpandMixin,
+    ShardMixin,
+    ReplicaReadMixin,
+    BulkDestroyMixin,
+    PermissionsModelViewSet,
+):
     queryset = Pedido.objects.all()
     serializer_class = PedidoSerializer
+    pagination_class = PedidoPagination
+    read_actions = ("list", "retrieve", "export")
+    sticky_writes = True
+
+    def get_user_queryset(self):
+        queryset = Pedido.objects.filter(usuario_id=self.request.user.pk)
+        expand = self.get_expand()
+        if "itens" in expand:
+            itens = PedidoProduto.objects.all()
+            if "itens.produto" in expand:
+                itens = with_produto(itens)
+            queryset = queryset.prefetch_related(
+                Prefetch("pedidoproduto_set", queryset=itens)
+            )
+        return queryset
+
+    def filter_queryset(self, queryset):
+        serializer = FiltroPedidoSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filtros = dict(serializer.validated_data)
+        # The export filters items by their pedido
+        pedido = "pedido" if queryset.model is PedidoProduto else "pk"
+        produto = filtros.pop("produto", None)
+        if produto:
+            # EXISTS keeps one row per pedido, unlike a join on the items
+            queryset = queryset.filter(
+                Exists(
+                    PedidoProduto.objects.filter(
+                        pedido=OuterRef(pedido), produto=produto
+                    )
+                )
+            )
+        if queryset.model is PedidoProduto:
+            filtros = {
+                f"pedido__{nome}": valor for nome, valor in filtros.items()
+            }
+        return queryset.filter(**filtros)
 
     def list(self, request):
-        queryset = Pedido.objects.filter(usuario=request.user)
-        serializer = PedidoSerializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_user_queryset())
+        return self.get_paginated_response(self.list_data(queryset))
 
     def get_object(self):
-        queryset = Pedido.objects.filter(usuario=self.request.user)
+        queryset = self.get_user_queryset()
         obj = get_object_or_404(queryset, pk=self.kwargs.get("pk"))
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def get_etag(self, pk, versao):
+        return pedido_etag(
+            pk, versao, *self.get_expand_etag_parts("itens.produto")
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # A revalidation is answered from the version alone, without
+        # loading the pedido and its expansions
+        if "HTTP_IF_NONE_MATCH" in request.META:
+            queryset = Pedido.objects.filter(usuario_id=request.user.pk)
+            pk, versao = get_object_or_404(
+                queryset.values_list("pk", "versao"), pk=kwargs.get("pk")
+            )
+            etag = self.get_etag(pk, versao)
+            if not_modified(request, etag):
+                return Response(
+                    status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+                )
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response(
+            serializer.data,
+            headers={"ETag": self.get_etag(instance.pk, instance.versao)},
+        )
+
+    def perform_update(self, serializer):
+        with transaction.atomic(using=router.db_for_write(Pedido)):
+            versao = (
+                Pedido.objects.select_for_update()
+                .values_list("versao", flat=True)
+                .get(pk=serializer.instance.pk)
+            )
+            check_if_match(self.request, serializer.instance.pk, versao)
+            self.updated = serializer.save(versao=versao + 1)
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        # perform_update saved the bumped version on the instance
+        pedido = self.updated
+        response["ETag"] = self.get_etag(pedido.pk, pedido.versao)
+        return response
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Streams the items of the user's pedidos, or of all for admins.
+
+        The databases are picked now: the shard and replica routing of the
+        request is gone by the time the response body is read.
+        """
+        itens = PedidoProduto.objects.all()
+        if request.user.is_staff and is_sharded(PedidoProduto):
+            databases = shard_databases()
+        else:
+            databases = [router.db_for_read(PedidoProduto)]
+        if not request.user.is_staff:
+            itens = itens.filter(pedido__usuario_id=request.user.pk)
+        itens = self.filter_queryset(itens)
+        produtos_db = router.db_for_read(Produto)
+        chunk_size = settings.API_EXPORT_CHUNK_SIZE
+
+        def rows():
+            for db in databases:
+                yield from linhas(itens.using(db), produtos_db, chunk_size)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(COLUNAS, rows()),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="pedidos.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        serializer = CheckoutSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
-class PedidoProdutoViewSet(PermissionsModelViewSet):
+class PedidoProdutoViewSet(
+    CompiledListMixin,
+    IdentityMapMixin,
+    ExpandMixin,
+    ShardMixin,
+    ReplicaReadMixin,
+    PermissionsModelViewSet,
+):
     serializer_class = PedidoProdutoSerializer
     queryset = PedidoProduto.objects.all()
+    sticky_writes = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if "produto" in self.get_expand():
+            queryset = with_produto(queryset)
+        return queryset
+
+    def get_etag(self, pedido):
+        return pedido_etag(
+            pedido.pk,
+            pedido.versao,
+            "itens",
+            *self.get_expand_etag_parts("produto"),
+        )
+
+    def get_pedido(self):
+        """The pedido of the route, loaded once per request."""
+        queryset = Pedido.objects.filter(usuario_id=self.request.user.pk)
+        return get_or_404(queryset, self.kwargs["pedidos_pk"])
+
+    def lock_pedido(self, pedidos_pk):
+        """Locks the pedido row and checks If-Match against its version."""
+        queryset = Pedido.objects.filter(usuario_id=self.request.user.pk)
+        pedido = get_object_or_404(queryset.select_for_update(), pk=pedidos_pk)
+        check_if_match(self.request, pedido.pk, pedido.versao)
+        return register(pedido)
 
     def list(self, request, pedidos_pk=None):
-        queryset = Pedido.objects.filter(usuario=request.user)
-        pedido = get_object_or_404(queryset, pk=pedidos_pk)
-        queryset = PedidoProduto.objects.filter(pedido=pedido)
-        serializer = PedidoProdutoSerializer(queryset, many=True)
-        return Response(serializer.data)
+        pedido = self.get_pedido()
+        etag = self.get_etag(pedido)
+        if not_modified(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        queryset = self.get_queryset().filter(pedido=pedido)
+        data = self.list_data(queryset, paginate=False)
+        return Response(data, headers={"ETag": etag})
+
+    def perform_update(self, serializer):
+        with transaction.atomic(using=router.db_for_write(Pedido)):
+            self.lock_pedido(self.kwargs["pedidos_pk"])
+            serializer.save()
+
+    @action(detail=False, methods=["put"])
+    def bulk(self, request, pedidos_pk=None):
+        with transaction.atomic(using=router.db_for_write(Pedido)):
+            pedido = self.lock_pedido(pedidos_pk)
+            itens = PedidoProduto.all_objects.filter(
+                pedido=pedido
+            ).select_for_update()
+            serializer = ItemPedidoSerializer(
+                itens,
+                data=request.data,
+                many=True,
+                context={"pedido": pedido},
+            )
+            serializer.is_valid(raise_exception=True)
+            itens = serializer.save()
+            pedido.refresh_from_db(fields=["versao"])
+        serializer = PedidoProdutoSerializer(itens, many=True)
+        return Response(
+            serializer.data, headers={"ETag": self.get_etag(pedido)}
+        )
 
     def get_object(self):
+        # Items are addressed by their produto, unique within the pedido
         queryset = self.filter_queryset(self.get_queryset())
-        obj = get_object_or_404(queryset, pedido__pk=self.kwargs["pedidos_pk"])
+        obj = get_object_or_404(
+            queryset, pedido=self.get_pedido(), produto_id=self.kwargs["pk"]
+        )
         self.check_object_permissions(self.request, obj)
         return obj
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        pedidos_pk = self.kwargs["pedidos_pk"]
-        queryset = Pedido.objects.filter(usuario=self.request.user)
-        get_object_or_404(queryset, pk=pedidos_pk)
-        context.update({"pedidos_pk": pedidos_pk})
+        self.get_pedido()
+        context.update({"pedidos_pk": self.kwargs["pedidos_pk"]})
         return context
 
 
+class VendasViewSet(viewsets.ViewSet):
+    """Sales reports, read from the daily totals kept by app.vendas."""
+
+    permission_classes = [IsAdminUser]
+
+    def get_vendas(self, request):
+        serializer = RelatorioVendasSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        queryset = VendaDiaria.objects.filter(
+            dia__range=(params["inicio"], params["fim"]), quantidade__gt=0
+        )
+        if "produto" in params:
+            queryset = queryset.filter(produto_id=params["produto"])
+        return queryset, params
+
+    @action(detail=False)
+    def diarias(self, request):
+        queryset, _ = self.get_vendas(request)
+        vendas = queryset.order_by("dia", "produto").values(
+            "produto", "dia", "quantidade"
+        )
+        return Response(list(vendas))
+
+    @action(detail=False, url_path="mais-vendidos")
+    def mais_vendidos(self, request):
+        queryset, params = self.get_vendas(request)
+        vendas = (
+            queryset.values("produto", nome=F("produto__nome"))
+            .annotate(total=Sum("quantidade"))
+            .order_by("-total", "produto")[: params["limite"]]
+        )
+        return Response(
+            [
+                {
+                    "produto": venda["produto"],
+                    "nome": venda["nome"],
+                    "quantidade": venda["total"],
+                }
+                for venda in vendas
+            ]
+        )
+
+
 class TokenObtainPairView(TokenViewBase):
     serializer_class = TokenSerializer
+
+
+class MetricsView(APIView):
+    """This process' metrics in the Prometheus text format."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4"
+        )
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class Config(AppConfig):
     name = "app"
+
+    def ready(self):
+        from app import receivers  # noqa: F401
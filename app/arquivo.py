@@ -0,0 +1,196 @@
+from contextlib import ExitStack
+
+from app.db.shards import is_sharded, run_on_shards, shard_databases, shard_of
+from app.models import Pedido, PedidoProduto, RegistroArquivado, Usuario
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from safedelete.config import HARD_DELETE
+
+# (model, FK to its parent in the archive), children before parents so a
+# parent is only archived once none of its rows remain in the hot tables.
+ARQUIVAVEIS = [
+    (PedidoProduto, "pedido"),
+    (Pedido, "usuario"),
+    (Usuario, None),
+]
+
+
+def filhos(model):
+    return [
+        (filho, campo)
+        for filho, campo in ARQUIVAVEIS
+        if campo and filho._meta.get_field(campo).related_model is model
+    ]
+
+
+def em_outro_banco(filho, model):
+    """Whether `filho` rows live on the shards and `model` rows don't."""
+    return is_sharded(filho) and not is_sharded(model)
+
+
+def candidatos(model, limite, db="default"):
+    queryset = model.deleted_objects.using(db).filter(deleted__lt=limite)
+    for filho, campo in filhos(model):
+        if em_outro_banco(filho, model):
+            # No subquery across databases, see com_filhos_nos_shards
+            continue
+        queryset = queryset.filter(
+            ~Exists(filho.all_objects.filter(**{campo: OuterRef("pk")}))
+        )
+    return queryset.order_by("pk")
+
+
+def com_filhos_nos_shards(model, chaves):
+    """Keys among `chaves` whose rows still have children on a shard."""
+    encontradas = set()
+    for filho, campo in filhos(model):
+        if not em_outro_banco(filho, model):
+            continue
+        por_shard = run_on_shards(
+            lambda alias: list(
+                filho.all_objects.using(alias)
+                .filter(**{f"{campo}__in": chaves})
+                .values_list(campo, flat=True)
+                .distinct()
+            )
+        )
+        for encontradas_shard in por_shard.values():
+            encontradas.update(encontradas_shard)
+    return encontradas
+
+
+def arquivar_lote(model, campo, limite, tamanho, db="default", depois=None):
+    """Moves one batch of `model` rows out of `db`.
+
+    Returns the number of rows moved and the last key examined, None when
+    there was nothing left after `depois`. Each batch commits on its own,
+    so an interrupted run simply resumes from whatever is still in the hot
+    table. Rows on a shard are archived on the primary: the archive commits
+    first and bulk_create ignores rows archived by an interrupted batch.
+    """
+    with transaction.atomic(using=db), transaction.atomic():
+        candidatas = candidatos(model, limite, db)
+        if depois is not None:
+            candidatas = candidatas.filter(pk__gt=depois)
+        lote = list(candidatas[:tamanho])
+        if not lote:
+            return 0, None
+        ultima = lote[-1].pk
+        ocupadas = com_filhos_nos_shards(model, [obj.pk for obj in lote])
+        lote = [obj for obj in lote if obj.pk not in ocupadas]
+        registros = serializers.serialize("python", lote)
+        RegistroArquivado.objects.bulk_create(
+            (
+                RegistroArquivado(
+                    modelo=model._meta.label,
+                    chave=obj.pk,
+                    pai=getattr(obj, f"{campo}_id") if campo else None,
+                    dados=registro["fields"],
+                    removido=obj.deleted,
+                )
+                for obj, registro in zip(lote, registros)
+            ),
+            ignore_conflicts=True,
+        )
+        model.all_objects.using(db).filter(
+            pk__in=[obj.pk for obj in lote]
+        ).delete(force_policy=HARD_DELETE)
+    return len(lote), ultima
+
+
+def arquivar(limite, tamanho=1000):
+    """Yields (model, moved rows) for each batch archived."""
+    for model, campo in ARQUIVAVEIS:
+        bancos = shard_databases() if is_sharded(model) else ["default"]
+        for db in bancos:
+            depois = None
+            while True:
+                movidos, depois = arquivar_lote(
+                    model, campo, limite, tamanho, db, depois
+                )
+                if depois is None:
+                    break
+                if movidos:
+                    yield model, movidos
+
+
+def restaurar(model, chave):
+    """Moves an archived row and its archived subtree back, still deleted.
+
+    Returns the number of restored rows. The shards commit before the
+    archive does, so a failure in between leaves rows that restoring again
+    simply saves over.
+    """
+    with ExitStack() as transacoes:
+        transacoes.enter_context(transaction.atomic())
+        if any(is_sharded(model) for model, _ in ARQUIVAVEIS):
+            for db in shard_databases():
+                transacoes.enter_context(transaction.atomic(using=db))
+        return restaurar_arvore(model, chave)
+
+
+def restaurar_arvore(model, chave):
+    raiz = RegistroArquivado.objects.get(modelo=model._meta.label, chave=chave)
+    campo = dict(ARQUIVAVEIS)[model]
+    db = None
+    if campo:
+        pai = model._meta.get_field(campo).related_model
+        if is_sharded(model) and is_sharded(pai):
+            # The row goes back to the shard its parent is on
+            db = shard_of(pai, raiz.pai)
+            existe = db is not None
+        else:
+            existe = pai.all_objects.filter(pk=raiz.pai).exists()
+        if not existe:
+            raise ValueError(
+                f"{pai._meta.label} {raiz.pai} também está arquivado."
+            )
+
+    total = 0
+    # (model, database or None to let the router pick, records)
+    nivel = [(model, db, [raiz])]
+    while nivel:
+        proximo = []
+        for model, db, registros in nivel:
+            objetos = serializers.deserialize(
+                "python",
+                (
+                    {
+                        "model": registro.modelo,
+                        "pk": str(registro.chave),
+                        "fields": registro.dados,
+                    }
+                    for registro in registros
+                ),
+            )
+            bancos = {}
+            for objeto in objetos:
+                objeto.save(using=db)
+                bancos[objeto.object.pk] = objeto.object._state.db
+            RegistroArquivado.objects.filter(
+                pk__in=[registro.pk for registro in registros]
+            ).delete()
+            total += len(registros)
+
+            chaves = [registro.chave for registro in registros]
+            for filho, _ in filhos(model):
+                registros_filho = list(
+                    RegistroArquivado.objects.filter(
+                        modelo=filho._meta.label, pai__in=chaves
+                    )
+                )
+                # Sharded children follow their parent, others the router
+                por_banco = {}
+                for registro in registros_filho:
+                    banco = (
+                        bancos[registro.pai]
+                        if is_sharded(filho) and is_sharded(model)
+                        else None
+                    )
+                    por_banco.setdefault(banco, []).append(registro)
+                proximo.extend(
+                    (filho, banco, grupo) for banco, grupo in por_banco.items()
+                )
+        nivel = proximo
+    return total
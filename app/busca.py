@@ -0,0 +1,189 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# SQLite: FTS5 index over the live produtos, kept by triggers on the table
+# so bulk updates (e.g. the soft-delete cascade) keep it in sync too. It
+# is keyed by the implicit rowid of app_produto, which a table rebuild or
+# VACUUM renumbers; instalar() rebuilds it.
+SQLITE_TABELA = "app_produto_busca"
+SQLITE_GATILHOS = {
+    "app_produto_busca_ai": """
+        CREATE TRIGGER app_produto_busca_ai AFTER INSERT ON app_produto
+        WHEN new.deleted IS NULL BEGIN
+            INSERT INTO app_produto_busca(rowid, nome, descricao)
+            VALUES (new.rowid, new.nome, new.descricao);
+        END
+    """,
+    "app_produto_busca_ad": """
+        CREATE TRIGGER app_produto_busca_ad AFTER DELETE ON app_produto
+        WHEN old.deleted IS NULL BEGIN
+            INSERT INTO app_produto_busca(app_produto_busca, rowid, nome,
+                descricao)
+            VALUES ('delete', old.rowid, old.nome, old.descricao);
+        END
+    """,
+    "app_produto_busca_au": """
+        CREATE TRIGGER app_produto_busca_au
+        AFTER UPDATE OF nome, descricao, deleted ON app_produto BEGIN
+            INSERT INTO app_produto_busca(app_produto_busca, rowid, nome,
+                descricao)
+            SELECT 'delete', old.rowid, old.nome, old.descricao
+            WHERE old.deleted IS NULL;
+            INSERT INTO app_produto_busca(rowid, nome, descricao)
+            SELECT new.rowid, new.nome, new.descricao
+            WHERE new.deleted IS NULL;
+        END
+    """,
+}
+
+# PostgreSQL: expression GIN index, maintained by the database itself.
+# unaccent() is only STABLE, the wrapper lets an index use it.
+POSTGRESQL_DOCUMENTO = (
+    "setweight(to_tsvector('portuguese'::regconfig, "
+    "app_unaccent(app_produto.nome)), 'A') || "
+    "setweight(to_tsvector('portuguese'::regconfig, "
+    "app_unaccent(app_produto.descricao)), 'B')"
+)
+POSTGRESQL_CONSULTA = (
+    "websearch_to_tsquery('portuguese'::regconfig, app_unaccent(%s))"
+)
+POSTGRESQL_INSTALAR = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION app_unaccent(text) RETURNS text AS
+    $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS produto_busca_idx ON app_produto
+    USING gin ({POSTGRESQL_DOCUMENTO}) WHERE deleted IS NULL
+    """,
+]
+POSTGRESQL_REMOVER = [
+    "DROP INDEX IF EXISTS produto_busca_idx",
+    "DROP FUNCTION IF EXISTS app_unaccent(text)",
+]
+
+
+def gatilhos_sqlite(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+        "AND tbl_name = 'app_produto'"
+    )
+    return {nome for nome, in cursor.fetchall()} & set(SQLITE_GATILHOS)
+
+
+def instalar(connection):
+    """Creates, or on SQLite rebuilds from scratch, the search index."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for sql in POSTGRESQL_INSTALAR:
+                cursor.execute(sql)
+        elif connection.vendor == "sqlite":
+            for nome in gatilhos_sqlite(cursor):
+                cursor.execute(f"DROP TRIGGER {nome}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABELA}")
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {SQLITE_TABELA} USING fts5(nome, "
+                "descricao, content='app_produto', content_rowid='rowid', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABELA}(rowid, nome, descricao) "
+                "SELECT rowid, nome, descricao FROM app_produto "
+                "WHERE deleted IS NULL"
+            )
+            for sql in SQLITE_GATILHOS.values():
+                cursor.execute(sql)
+
+
+def reparar(connection):
+    """Rebuilds the SQLite index when app_produto lost its triggers.
+
+    Migrations that alter app_produto on SQLite copy it into a new table,
+    which drops the triggers and renumbers the rows.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        tabelas = connection.introspection.table_names(cursor)
+        if SQLITE_TABELA not in tabelas:
+            return
+        if gatilhos_sqlite(cursor) == set(SQLITE_GATILHOS):
+            return
+    instalar(connection)
+
+
+def remover(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for sql in POSTGRESQL_REMOVER:
+                cursor.execute(sql)
+        elif connection.vendor == "sqlite":
+            for nome in SQLITE_GATILHOS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABELA}")
+
+
+def termos_fts(busca):
+    """FTS5 query matching every word of `busca`, as a prefix.
+
+    Words are quoted, so the FTS5 query syntax never reaches the index.
+    """
+    palavras = re.findall(r"\w+", busca)
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar(queryset, busca):
+    """Produtos of `queryset` matching `busca`, most relevant first.
+
+    Accents and case are ignored. The relevance is in `relevancia`; its
+    scale depends on the database. Databases without a search index get
+    an unranked, substring search instead.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        termos = termos_fts(busca)
+        if not termos:
+            return queryset.none()
+        encontrados = RawSQL(
+            f"app_produto.rowid IN (SELECT rowid FROM {SQLITE_TABELA} "
+            f"WHERE {SQLITE_TABELA} MATCH %s)",
+            [termos],
+            output_field=BooleanField(),
+        )
+        # bm25() is lower for better matches; nome weighs more
+        relevancia = RawSQL(
+            f"SELECT bm25({SQLITE_TABELA}, 4.0, 1.0) FROM {SQLITE_TABELA} "
+            f"WHERE {SQLITE_TABELA} MATCH %s "
+            f"AND {SQLITE_TABELA}.rowid = app_produto.rowid",
+            [termos],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(encontrados)
+            .annotate(relevancia=relevancia)
+            .order_by("relevancia", "id")
+        )
+    if vendor == "postgresql":
+        encontrados = RawSQL(
+            f"{POSTGRESQL_DOCUMENTO} @@ {POSTGRESQL_CONSULTA}",
+            [busca],
+            output_field=BooleanField(),
+        )
+        relevancia = RawSQL(
+            f"ts_rank({POSTGRESQL_DOCUMENTO}, {POSTGRESQL_CONSULTA})",
+            [busca],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(encontrados)
+            .annotate(relevancia=relevancia)
+            .order_by("-relevancia", "id")
+        )
+    return queryset.filter(
+        Q(nome__icontains=busca) | Q(descricao__icontains=busca)
+    ).order_by("nome", "id")
@@ -0,0 +1,71 @@
+"""PostgreSQL backend that borrows connections from a ConnectionPool.
+
+Django closes the connection at the end of every request when
+CONN_MAX_AGE is 0; with this backend closing returns it to the pool, so
+requests skip the TCP and authentication handshake. Configure it with the
+"POOL" entry of the database settings: SIZE, TIMEOUT and MAX_AGE.
+"""
+import threading
+
+from app.db.pool import ConnectionPool
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pooled = True
+
+    def get_pool(self):
+        # The test runner renames the database under the same alias
+        key = tuple(
+            self.settings_dict[name]
+            for name in ("NAME", "USER", "HOST", "PORT")
+        )
+        with pools_lock:
+            pool = pools.get((self.alias, key))
+            if pool is None:
+                options = self.settings_dict.get("POOL", {})
+                health_checks = self.settings_dict.get("CONN_HEALTH_CHECKS")
+                pool = pools[self.alias, key] = ConnectionPool(
+                    self.alias,
+                    size=options.get("SIZE", 10),
+                    timeout=options.get("TIMEOUT", 5),
+                    max_age=options.get("MAX_AGE"),
+                    check=self.check_pooled if health_checks else None,
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool()
+        return self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+
+    @staticmethod
+    def check_pooled(conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except base.Database.Error:
+            return False
+
+    def _close(self):
+        if self.connection is None:
+            return
+        conn = self.connection
+        discard = bool(conn.closed)
+        if not discard and (
+            conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+        ):
+            # Never hand out a connection in the middle of a transaction
+            try:
+                conn.rollback()
+            except base.Database.Error:
+                discard = True
+        self.pool.release(conn, discard=discard)
@@ -0,0 +1,22 @@
+from app.metrics import registry
+from django.db import connections
+
+
+def check_connections():
+    """Counts and, with CONN_HEALTH_CHECKS, checks reused connections.
+
+    Meant to run right after close_old_connections, when only connections
+    kept by CONN_MAX_AGE are still open.
+    """
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        registry.incr("db_connections_reused_total", alias=connection.alias)
+        if (
+            connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            and not connection.is_usable()
+        ):
+            registry.incr(
+                "db_health_check_failures_total", alias=connection.alias
+            )
+            connection.close()
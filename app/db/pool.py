@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+
+from app.metrics import registry
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections shared by the threads of a process.
+
+    `acquire(connect)` hands out an idle connection or opens one with
+    `connect`; `check`, if given, tells whether an idle one still works
+    before it is handed out again. At most `size` connections are open;
+    `acquire` waits up to `timeout` seconds for one
+    to be released and then raises PoolTimeout. Connections older than
+    `max_age` seconds are closed on release instead of going back idle.
+    """
+
+    def __init__(self, alias, size, timeout, max_age=None, check=None):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check = check
+        self.idle = deque()
+        self.born = {}
+        self.pending = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, connect):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self.checkout(deadline)
+            if conn is None:
+                return self.open(connect)
+            if self.check is None or self.check(conn):
+                registry.incr("db_connections_reused_total", alias=self.alias)
+                return conn
+            registry.incr("db_health_check_failures_total", alias=self.alias)
+            self.release(conn, discard=True)
+
+    def checkout(self, deadline):
+        """Returns an idle connection, or None after reserving a new slot."""
+        with self.condition:
+            if not self.idle and self.full():
+                registry.incr("db_pool_waits_total", alias=self.alias)
+            while not self.idle and self.full():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    registry.incr("db_pool_timeouts_total", alias=self.alias)
+                    raise PoolTimeout(
+                        f"No connection to '{self.alias}' became available "
+                        f"within {self.timeout} seconds."
+                    )
+                self.condition.wait(remaining)
+            if self.idle:
+                return self.idle.pop()
+            # Reserve the slot, the connection is opened outside the lock
+            self.pending += 1
+            return None
+
+    def full(self):
+        return len(self.born) + self.pending >= self.size
+
+    def open(self, connect):
+        try:
+            conn = connect()
+        except BaseException:
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.pending -= 1
+            self.born[id(conn)] = time.monotonic()
+            self.update_gauges()
+        registry.incr("db_connections_opened_total", alias=self.alias)
+        return conn
+
+    def release(self, conn, discard=False):
+        with self.condition:
+            born = self.born.get(id(conn))
+            expired = (
+                self.max_age is not None
+                and born is not None
+                and time.monotonic() - born >= self.max_age
+            )
+            if discard or expired or born is None:
+                self.born.pop(id(conn), None)
+            else:
+                self.idle.append(conn)
+                conn = None
+            self.update_gauges()
+            self.condition.notify()
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            for conn in idle:
+                self.born.pop(id(conn), None)
+            self.update_gauges()
+            self.condition.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def update_gauges(self):
+        registry.set(
+            "db_pool_connections",
+            len(self.born),
+            alias=self.alias,
+            state="open",
+        )
+        registry.set(
+            "db_pool_connections",
+            len(self.idle),
+            alias=self.alias,
+            state="idle",
+        )
@@ -0,0 +1,96 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .shards import ShardRoutingError, is_sharded, shard_alias, shard_for
+
+# Replica chosen for the current request, None sends reads to the primary
+replica_alias = ContextVar("replica_alias", default=None)
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+def sticky_key(user_pk):
+    return f"replica:sticky:{user_pk}"
+
+
+def stick_to_primary(user_pk):
+    """Sends the user's reads to the primary for a configurable window.
+
+    Kept in the cache so every process sees it; with the default local
+    memory cache only the process that handled the write does.
+    """
+    cache.set(
+        sticky_key(user_pk), True, settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+
+
+def is_sticky(user_pk):
+    return user_pk is not None and cache.get(sticky_key(user_pk), False)
+
+
+class ReplicaRouter:
+    """Reads go to `replica_alias` when set, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return replica_alias.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ShardRouter:
+    """Sends pedidos and their items to the shard of their usuario.
+
+    The shard comes from the instance when there is one and otherwise
+    from `shard_alias`, which the API sets for the authenticated usuario.
+    Other models are left to the next router.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and is_sharded(type(instance)):
+            alias = self.shard_of_instance(instance)
+            if alias:
+                return alias
+        alias = shard_alias.get()
+        if alias is None:
+            raise ShardRoutingError(
+                f"{model._meta.label} queries must run inside using_shard() "
+                "or through fanout()."
+            )
+        return alias
+
+    db_for_write = db_for_read
+
+    @staticmethod
+    def shard_of_instance(instance):
+        if instance._state.db:
+            return instance._state.db
+        if getattr(instance, "usuario_id", None):
+            return shard_for(instance.usuario_id)
+        pedido = instance._state.fields_cache.get("pedido")
+        if pedido is not None:
+            return pedido._state.db or shard_for(pedido.usuario_id)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            # Pedidos point to usuarios and produtos on the primary
+            return True
+        return None
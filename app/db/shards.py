@@ -0,0 +1,154 @@
+import hashlib
+import heapq
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import total_ordering
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.constants import LOOKUP_SEP
+
+# Models whose rows live on the shard of their usuario
+SHARDED_MODELS = {"app.pedido", "app.pedidoproduto"}
+
+# Shard of the usuario the current request or block works for
+shard_alias = ContextVar("shard_alias", default=None)
+
+
+class ShardRoutingError(Exception):
+    pass
+
+
+def is_sharded(model):
+    return (
+        bool(settings.DATABASE_SHARDS)
+        and model._meta.label_lower in SHARDED_MODELS
+    )
+
+
+def shard_databases():
+    """Databases holding pedidos: the shards, or the primary without them."""
+    return settings.DATABASE_SHARDS or ["default"]
+
+
+def shard_for(usuario_id):
+    """Stable shard of a usuario, by hashing its id."""
+    shards = shard_databases()
+    digest = hashlib.md5(uuid.UUID(str(usuario_id)).bytes).digest()
+    return shards[int.from_bytes(digest[:8], "big") % len(shards)]
+
+
+@contextmanager
+def using_shard(alias):
+    token = shard_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        shard_alias.reset(token)
+
+
+def run_on_shards(fn, databases=None):
+    """Calls fn(alias) on every shard in parallel; returns {alias: result}."""
+    databases = databases or shard_databases()
+    if len(databases) == 1:
+        return {databases[0]: fn(databases[0])}
+
+    def call(alias):
+        try:
+            return fn(alias)
+        finally:
+            # Pool threads are not request threads, nothing else closes them
+            connections[alias].close()
+
+    with ThreadPoolExecutor(len(databases)) as executor:
+        return dict(zip(databases, executor.map(call, databases)))
+
+
+def fanout(queryset, key=None, reverse=False, limit=None):
+    """Evaluates `queryset` on every shard and merges the rows.
+
+    With `key`, each shard must already return its rows sorted by it (e.g.
+    through the queryset's order_by) and the result is a merged sorted
+    list, cut at `limit`.
+    """
+
+    def fetch(alias):
+        shard_queryset = queryset.using(alias)
+        if limit is not None:
+            shard_queryset = shard_queryset[:limit]
+        return list(shard_queryset)
+
+    results = run_on_shards(fetch).values()
+    if key is None:
+        rows = [row for result in results for row in result]
+    else:
+        rows = list(heapq.merge(*results, key=key, reverse=reverse))
+    return rows if limit is None else rows[:limit]
+
+
+@total_ordering
+class Descending:
+    """Sorts a value in reverse, for keys mixing both directions."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def ordering_key(queryset):
+    """A fanout() key sorting rows the way `queryset`'s order_by does.
+
+    Only field names are supported, relations sorting by their key. NULLs
+    go where the shards' database puts them.
+    """
+    features = connections[shard_databases()[0]].features
+    fields = []
+    for name in queryset.query.order_by:
+        if not isinstance(name, str):
+            raise ValueError(f"Cannot merge shards ordered by {name!r}.")
+        fields.append((name.lstrip("-").split(LOOKUP_SEP), name[0] == "-"))
+
+    def value(obj, path):
+        for attr in path[:-1]:
+            obj = getattr(obj, attr)
+            if obj is None:
+                return None
+        if path[-1] == "pk":
+            return obj.pk
+        return getattr(obj, obj._meta.get_field(path[-1]).attname)
+
+    def key(obj):
+        parts = []
+        for path, descending in fields:
+            field_value = value(obj, path)
+            part = (
+                (field_value is None) == features.nulls_order_largest,
+                field_value,
+            )
+            parts.append(Descending(part) if descending else part)
+        return tuple(parts)
+
+    return key
+
+
+def fanout_count(queryset):
+    return sum(
+        run_on_shards(lambda alias: queryset.using(alias).count()).values()
+    )
+
+
+def shard_of(model, pk):
+    """Shard holding the `model` row with `pk`, or None."""
+    found = run_on_shards(
+        lambda alias: model.all_objects.using(alias).filter(pk=pk).exists()
+    )
+    return next((alias for alias, exists in found.items() if exists), None)
@@ -0,0 +1,44 @@
+from itertools import islice
+
+from app.db.shards import is_sharded
+from app.models import Produto
+
+COLUNAS = [
+    "pedido",
+    "usuario",
+    "feito",
+    "endereco",
+    "produto",
+    "nome",
+    "quantidade",
+]
+
+
+def linhas(queryset, produtos_db, chunk_size):
+    """COLUNAS rows of a PedidoProduto queryset, oldest pedido first.
+
+    Rows are read through a cursor, `chunk_size` at a time, so memory use
+    does not grow with the size of the export. Produtos on another
+    database than the items get their names looked up once per chunk.
+    """
+    queryset = queryset.order_by("pedido__feito", "pedido_id", "produto_id")
+    campos = ["pedido_id", "pedido__usuario_id", "pedido__feito"]
+    campos += ["pedido__endereco", "produto_id"]
+    if not is_sharded(queryset.model):
+        yield from queryset.values_list(
+            *campos, "produto__nome", "quantidade"
+        ).iterator(chunk_size)
+        return
+
+    rows = queryset.values_list(*campos, "quantidade").iterator(chunk_size)
+    while True:
+        lote = list(islice(rows, chunk_size))
+        if not lote:
+            return
+        nomes = dict(
+            Produto.all_objects.using(produtos_db)
+            .filter(pk__in={row[4] for row in lote})
+            .values_list("pk", "nome")
+        )
+        for *pedido, produto, quantidade in lote:
+            yield (*pedido, produto, nomes.get(produto), quantidade)
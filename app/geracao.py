@@ -0,0 +1,252 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import accumulate
+
+import django
+from app.api.cache import invalidar_catalogo
+from app.db.shards import shard_for
+from app.models import Pedido, PedidoProduto, Produto, Usuario
+from app.vendas import registrar_itens
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+# Same data for the same seed, e.g. what the search benchmark looks up
+SEMENTE = 2020
+
+# Generated usuarios are usuario<n>@DOMINIO, n counting from 0
+DOMINIO = "seed.example.com"
+
+# Usuarios generated per task; a range's data depends only on the seed
+# and its first usuario, not on how many processes write
+USUARIOS_POR_FAIXA = 10_000
+
+SILABAS = """
+    ca fé ba na lu ma ra to ção ão mi ne so ti de la ro ce pa gui
+    ju be ré do mo vi zo á ê ô ri go fa te qua lhe nho ga
+""".split()
+PALAVRAS = """
+    café açúcar feijão arroz pão leite queijo maçã limão orgânico
+    integral torrado moído elétrica cafeteira chaleira panela frigideira
+    garrafa térmica caneca xícara azeite pimenta orégano chocolate
+    baunilha canela
+""".split()
+NOMES = """
+    Ana Maria Francisca Antônia Adriana Juliana Márcia Fernanda Patrícia
+    Aline José João Antônio Francisco Carlos Paulo Pedro Lucas Luiz Marcos
+    Gabriel Rafael Daniel Marcelo Bruno Eduardo Felipe Raimundo Rodrigo
+""".split()
+SOBRENOMES = """
+    Silva Santos Oliveira Souza Rodrigues Ferreira Alves Pereira Lima Gomes
+    Costa Ribeiro Martins Carvalho Almeida Lopes Soares Fernandes Vieira
+    Barbosa Rocha Dias Nascimento Andrade Moreira Nunes Marques Machado
+""".split()
+LOGRADOUROS = """
+    Rua Avenida Travessa Alameda Praça Estrada
+""".split()
+
+
+def vocabulario(rng, tamanho):
+    """Real words first, then made-up ones, from most to least frequent."""
+    palavras = list(PALAVRAS)
+    vistas = set(palavras)
+    while len(palavras) < tamanho:
+        palavra = "".join(rng.choices(SILABAS, k=rng.randint(2, 4)))
+        if palavra not in vistas:
+            vistas.add(palavra)
+            palavras.append(palavra)
+    return palavras
+
+
+def pesos_zipf(total):
+    """Cumulative weights of `total` choices, the n-th as likely as 1/n."""
+    return list(accumulate(1 / posicao for posicao in range(1, total + 1)))
+
+
+def gerar_produtos(total, rng, tamanho_vocabulario=50_000):
+    """Produto fields with word frequencies following Zipf's law."""
+    palavras = vocabulario(rng, tamanho_vocabulario)
+    pesos = pesos_zipf(len(palavras))
+    for _ in range(total):
+        yield {
+            "nome": " ".join(
+                rng.choices(palavras, cum_weights=pesos, k=rng.randint(2, 4))
+            ),
+            "descricao": " ".join(
+                rng.choices(palavras, cum_weights=pesos, k=12)
+            ),
+        }
+
+
+def digito_cpf(digitos):
+    soma = sum(
+        digito * peso
+        for digito, peso in zip(digitos, range(len(digitos) + 1, 1, -1))
+    )
+    return soma * 10 % 11 % 10
+
+
+def cpf(numero):
+    """The CPF of base `numero`, with valid check digits: 999.999.999-99."""
+    digitos = [int(digito) for digito in f"{numero:09}"]
+    digitos.append(digito_cpf(digitos))
+    digitos.append(digito_cpf(digitos))
+    texto = "".join(map(str, digitos))
+    return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+
+
+def digito_rg(base):
+    soma = sum(int(d) * peso for d, peso in zip(f"{base:08}", range(2, 10)))
+    digito = 11 - soma % 11
+    return {10: "X", 11: "0"}.get(digito, str(digito))
+
+
+def rg(numero):
+    """The `numero`-th RG in São Paulo's format, 99.999.999-9.
+
+    The API only takes digits, so of each pair of numbers the one whose
+    check digit would be X is skipped.
+    """
+    base = 10_000_000 + 2 * numero
+    if digito_rg(base) == "X":
+        base += 1
+    texto = f"{base:08}"
+    return f"{texto[:2]}.{texto[2:5]}.{texto[5:]}-{digito_rg(base)}"
+
+
+def gerar_usuario(numero, rng, senha, agora):
+    nome, sobrenome = rng.choice(NOMES), rng.choice(SOBRENOMES)
+    return Usuario(
+        username=f"usuario{numero}",
+        email=f"usuario{numero}@{DOMINIO}",
+        password=senha,
+        first_name=nome,
+        last_name=sobrenome,
+        endereco=(
+            f"{rng.choice(LOGRADOUROS)} {rng.choice(SOBRENOMES)}, "
+            f"{rng.randint(1, 3000)}"
+        ),
+        cpf=cpf(100_000_000 + numero),
+        rg=rg(numero),
+        date_joined=agora - timedelta(seconds=rng.randrange(3 * 365 * 86400)),
+    )
+
+
+def gravar(usuarios, por_banco):
+    """Writes usuarios, then each shard's pedidos and items with the sales."""
+    principal = router.db_for_write(Usuario)
+    with transaction.atomic(using=principal):
+        Usuario.all_objects.using(principal).bulk_create(usuarios)
+        for db, (pedidos, itens) in por_banco.items():
+            with transaction.atomic(using=db):
+                Pedido.all_objects.using(db).bulk_create(pedidos)
+                registrar_itens(itens, db)
+
+
+def semear_faixa(inicio, fim, senha, pedidos_por_usuario, semente, batch_size):
+    """Usuarios `inicio` to `fim` - 1 with their pedidos and items.
+
+    Each usuario gets 0 to twice `pedidos_por_usuario` pedidos of 1 to 9
+    produtos, the same few produtos being the most popular everywhere.
+    Returns the (usuarios, pedidos, itens) written.
+    """
+    produtos = list(Produto.objects.order_by("pk").values_list("pk", flat=True))
+    random.Random(semente).shuffle(produtos)
+    pesos = pesos_zipf(len(produtos))
+    rng = random.Random(f"{semente}:{inicio}")
+    agora = timezone.now()
+    maximo = 2 * pedidos_por_usuario if produtos else 0
+
+    usuarios, por_banco, pendentes = [], {}, 0
+    total_pedidos = total_itens = 0
+    for numero in range(inicio, fim):
+        usuario = gerar_usuario(numero, rng, senha, agora)
+        usuarios.append(usuario)
+        pedidos, itens = por_banco.setdefault(shard_for(usuario.pk), ([], []))
+        for _ in range(rng.randint(0, maximo)):
+            pedido = Pedido(
+                usuario_id=usuario.pk,
+                endereco=usuario.endereco,
+                feito=usuario.date_joined
+                + (agora - usuario.date_joined) * rng.random(),
+            )
+            pedidos.append(pedido)
+            escolhidos = set(
+                rng.choices(produtos, cum_weights=pesos, k=rng.randint(1, 9))
+            )
+            itens.extend(
+                PedidoProduto(
+                    pedido=pedido,
+                    produto_id=produto_id,
+                    quantidade=rng.randint(1, 5),
+                )
+                for produto_id in escolhidos
+            )
+            total_pedidos += 1
+            pendentes += len(escolhidos)
+        if pendentes >= batch_size or len(usuarios) >= batch_size:
+            gravar(usuarios, por_banco)
+            total_itens += pendentes
+            usuarios, por_banco, pendentes = [], {}, 0
+    gravar(usuarios, por_banco)
+    return fim - inicio, total_pedidos, total_itens + pendentes
+
+
+def semear(
+    usuarios,
+    produtos,
+    pedidos_por_usuario,
+    senha,
+    workers=1,
+    batch_size=5000,
+    semente=SEMENTE,
+):
+    """Adds synthetic produtos, then usuarios with their pedidos.
+
+    Usuarios continue the numbering of earlier runs and share `senha`, a
+    password hash. With several workers the usuario ranges are written by
+    that many processes. Yields (usuarios, pedidos, itens) written so far
+    after every range.
+    """
+    existentes = Produto.all_objects.count()
+    rng = random.Random(f"{semente}:{existentes}")
+    lote = []
+    for dados in gerar_produtos(produtos, rng):
+        lote.append(Produto(**dados))
+        if len(lote) == batch_size:
+            Produto.objects.bulk_create(lote)
+            lote = []
+    Produto.objects.bulk_create(lote)
+    # Bulk inserts send no post_save
+    invalidar_catalogo()
+
+    inicio = Usuario.all_objects.filter(email__endswith=f"@{DOMINIO}").count()
+    faixas = [
+        (
+            primeiro,
+            min(primeiro + USUARIOS_POR_FAIXA, inicio + usuarios),
+            senha,
+            pedidos_por_usuario,
+            semente,
+            batch_size,
+        )
+        for primeiro in range(inicio, inicio + usuarios, USUARIOS_POR_FAIXA)
+    ]
+    if not faixas:
+        return
+    if workers > 1:
+        # Forked processes must not share the parent's connections; under
+        # spawn they set Django up before taking a range
+        connections.close_all()
+        pool = ProcessPoolExecutor(workers, initializer=django.setup)
+        mapa = pool.map
+    else:
+        pool, mapa = None, map
+    totais = (0, 0, 0)
+    try:
+        for parcial in mapa(semear_faixa, *zip(*faixas)):
+            totais = tuple(a + b for a, b in zip(totais, parcial))
+            yield totais
+    finally:
+        if pool is not None:
+            pool.shutdown()
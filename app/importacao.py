@@ -0,0 +1,363 @@
+import csv
+import hashlib
+import json
+import os
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from app.api.cache import invalidar_catalogo
+from app.api.serializers import (
+    ItemPedidoSerializer,
+    ProdutoSerializer,
+    UsuarioSerializer,
+)
+from app.db.shards import shard_for
+from app.models import Pedido, PedidoProduto, Produto, Usuario
+from app.vendas import registrar_itens
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+# Imported rows get ids derived from the file digest and their line, so
+# importing a file again skips the rows an earlier run already wrote
+NAMESPACE = uuid.UUID("0f5f3b6e-4a8e-4c43-9a55-8d1d8c8e2a51")
+
+
+class UsuarioImportSerializer(UsuarioSerializer):
+    """UsuarioSerializer rules, with uniqueness checked once per batch.
+
+    `password` may also be a hash in Django's format, e.g. from a legacy
+    Django database, which is kept as is.
+    """
+
+    password = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta(UsuarioSerializer.Meta):
+        exclude = None
+        fields = [
+            "username",
+            "email",
+            "password",
+            "first_name",
+            "last_name",
+            "endereco",
+            "cpf",
+            "rg",
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [
+                validator
+                for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
+
+
+class LinhaPedidoSerializer(ItemPedidoSerializer):
+    """One item of a pedido; lines with the same `pedido` key share it."""
+
+    pedido = serializers.CharField(max_length=100)
+    usuario = serializers.EmailField()
+    endereco = serializers.CharField(max_length=200)
+    feito = serializers.DateTimeField(required=False)
+
+
+def chave(digest, *partes):
+    return uuid.uuid5(NAMESPACE, ":".join([digest, *map(str, partes)]))
+
+
+def resumo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def registros(caminho):
+    """(número, registro) of a CSV file or of a JSON lines file.
+
+    CSV records are numbered from 1 after the header, JSON lines by line.
+    Lines that are not valid JSON come as text, which validation rejects.
+    """
+    with open(caminho, newline="", encoding="utf-8") as arquivo:
+        if caminho.endswith(".csv"):
+            yield from enumerate(csv.DictReader(arquivo), 1)
+            return
+        for numero, linha in enumerate(arquivo, 1):
+            if not linha.strip():
+                continue
+            try:
+                yield numero, json.loads(linha)
+            except ValueError:
+                yield numero, linha.rstrip("\n")
+
+
+def erro(campo, mensagem):
+    return {campo: [mensagem]}
+
+
+USUARIO_INEXISTENTE = erro("usuario", "Usuário inexistente.")
+PRODUTO_INEXISTENTE = erro("produto", "Produto inexistente.")
+OUTRO_USUARIO = erro("usuario", "Pedido de outro usuário.")
+PRODUTO_REPETIDO = erro("produto", "Produto repetido no pedido.")
+
+
+def senha(valor):
+    if not valor:
+        return make_password(None)
+    try:
+        identify_hasher(valor)
+    except ValueError:
+        return make_password(valor)
+    return valor
+
+
+def importar_produtos(lote, digest, executor):
+    produtos = [
+        Produto(id=chave(digest, numero), **dados) for numero, dados in lote
+    ]
+    db = router.db_for_write(Produto)
+    with transaction.atomic(using=db):
+        existentes = set(
+            Produto.all_objects.using(db)
+            .filter(pk__in=[produto.pk for produto in produtos])
+            .values_list("pk", flat=True)
+        )
+        inseridos = Produto.all_objects.using(db).bulk_create(
+            produto for produto in produtos if produto.pk not in existentes
+        )
+    # Bulk inserts send no post_save
+    invalidar_catalogo()
+    return len(inseridos), []
+
+
+def importar_usuarios(lote, digest, executor):
+    rejeitados, novos, emails, usernames = [], [], set(), set()
+    for numero, dados in lote:
+        usuario = Usuario(id=chave(digest, numero), **dados)
+        if usuario.email in emails:
+            rejeitados.append((numero, erro("email", "E-mail repetido.")))
+        elif usuario.username in usernames:
+            rejeitados.append((numero, erro("username", "Username repetido.")))
+        else:
+            emails.add(usuario.email)
+            usernames.add(usuario.username)
+            novos.append((numero, usuario))
+
+    db = router.db_for_write(Usuario)
+    with transaction.atomic(using=db):
+        ocupados = {}
+        for pk, email, username in (
+            Usuario.all_objects.using(db)
+            .filter(Q(email__in=emails) | Q(username__in=usernames))
+            .values_list("pk", "email", "username")
+        ):
+            ocupados[("email", email)] = pk
+            ocupados[("username", username)] = pk
+        usuarios = []
+        for numero, usuario in novos:
+            if ocupados.get(("email", usuario.email)) == usuario.pk:
+                continue
+            if ("email", usuario.email) in ocupados:
+                rejeitados.append((numero, erro("email", "E-mail já usado.")))
+            elif ("username", usuario.username) in ocupados:
+                rejeitados.append(
+                    (numero, erro("username", "Username já usado."))
+                )
+            else:
+                usuarios.append(usuario)
+        # Hashing dominates, hashlib releases the GIL while it runs
+        senhas = executor.map(senha, [usuario.password for usuario in usuarios])
+        for usuario, encoded in zip(usuarios, senhas):
+            usuario.password = encoded
+        Usuario.all_objects.using(db).bulk_create(usuarios)
+    return len(usuarios), rejeitados
+
+
+def importar_pedidos(lote, digest, executor):
+    usuarios = dict(
+        Usuario.objects.filter(
+            email__in={dados["usuario"] for _, dados in lote}
+        ).values_list("email", "pk")
+    )
+    produtos = set(
+        Produto.objects.filter(
+            pk__in={dados["produto"] for _, dados in lote}
+        ).values_list("pk", flat=True)
+    )
+    agora = timezone.now()
+    inseridos, rejeitados, pedidos, vistos = 0, [], {}, set()
+    por_banco = defaultdict(list)
+    for numero, dados in lote:
+        usuario_id = usuarios.get(dados["usuario"])
+        pedido_id = chave(digest, "pedido", dados["pedido"])
+        pedido = pedidos.get(pedido_id)
+        if usuario_id is None:
+            rejeitados.append((numero, USUARIO_INEXISTENTE))
+        elif dados["produto"] not in produtos:
+            rejeitados.append((numero, PRODUTO_INEXISTENTE))
+        elif pedido is not None and pedido.usuario_id != usuario_id:
+            rejeitados.append((numero, OUTRO_USUARIO))
+        elif (pedido_id, dados["produto"]) in vistos:
+            rejeitados.append((numero, PRODUTO_REPETIDO))
+        else:
+            if pedido is None:
+                pedido = pedidos[pedido_id] = Pedido(
+                    id=pedido_id,
+                    usuario_id=usuario_id,
+                    endereco=dados["endereco"],
+                    feito=dados.get("feito", agora),
+                )
+            vistos.add((pedido_id, dados["produto"]))
+            item = PedidoProduto(
+                id=chave(digest, numero),
+                pedido=pedido,
+                produto_id=dados["produto"],
+                quantidade=dados["quantidade"],
+            )
+            por_banco[shard_for(usuario_id)].append((numero, item))
+
+    for db, itens in por_banco.items():
+        pedidos_db = Pedido.all_objects.using(db)
+        itens_db = PedidoProduto.all_objects.using(db)
+        ids = {item.pedido_id for _, item in itens}
+        with transaction.atomic(using=db):
+            # Pedidos and items written by earlier batches or runs
+            existentes = dict(
+                pedidos_db.filter(pk__in=ids).values_list("pk", "usuario_id")
+            )
+            gravados = {
+                (pedido_id, produto_id): pk
+                for pk, pedido_id, produto_id in itens_db.filter(
+                    pedido_id__in=ids
+                ).values_list("pk", "pedido_id", "produto_id")
+            }
+            novos = []
+            for numero, item in itens:
+                pedido = item.pedido
+                gravado = gravados.get((pedido.pk, item.produto_id))
+                if existentes.get(pedido.pk, pedido.usuario_id) != (
+                    pedido.usuario_id
+                ):
+                    rejeitados.append((numero, OUTRO_USUARIO))
+                elif gravado is not None and gravado != item.pk:
+                    rejeitados.append((numero, PRODUTO_REPETIDO))
+                elif gravado is None:
+                    novos.append(item)
+            pedidos_db.bulk_create(
+                {
+                    item.pedido_id: item.pedido
+                    for item in novos
+                    if item.pedido_id not in existentes
+                }.values()
+            )
+            registrar_itens(novos, db)
+        inseridos += len(novos)
+    return inseridos, rejeitados
+
+
+TIPOS = {
+    "produtos": (ProdutoSerializer, importar_produtos),
+    "usuarios": (UsuarioImportSerializer, importar_usuarios),
+    "pedidos": (LinhaPedidoSerializer, importar_pedidos),
+}
+
+
+def ler_progresso(caminho, digest):
+    """Last line committed by an earlier import of the same file, or 0."""
+    try:
+        with open(caminho) as arquivo:
+            progresso = json.load(arquivo)
+    except FileNotFoundError:
+        return 0
+    if progresso.get("arquivo") != digest:
+        return 0
+    return progresso["linha"]
+
+
+def gravar_progresso(caminho, digest, linha):
+    # Written aside and renamed, a crash never leaves half a file
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w") as arquivo:
+        json.dump({"arquivo": digest, "linha": linha}, arquivo)
+    os.replace(temporario, caminho)
+
+
+def importar(
+    tipo,
+    caminho,
+    progresso,
+    rejeitados,
+    batch_size=5000,
+    workers=None,
+    recomecar=False,
+):
+    """Imports a CSV or JSON lines file of `tipo` in batches.
+
+    Every batch is validated with the API serializer rules, checked
+    against the database with a few queries and written by bulk_create in
+    its own transaction. Invalid rows go to the `rejeitados` JSON lines
+    file and the last committed line to the `progresso` file, from which
+    a new run resumes. Yields (linhas, importadas, rejeitadas) so far
+    after every batch, rows already in the database not counting as
+    imported.
+    """
+    validador, importar_lote = TIPOS[tipo]
+    serializer = validador()
+    digest = resumo(caminho)
+    inicio = 0 if recomecar else ler_progresso(progresso, digest)
+    linhas = importadas = rejeitadas = 0
+
+    fila = registros(caminho)
+    with ThreadPoolExecutor(workers) as executor, open(
+        rejeitados, "a" if inicio else "w", encoding="utf-8"
+    ) as saida:
+        while True:
+            lote = list(islice(fila, batch_size))
+            if not lote:
+                return
+            originais = dict(lote)
+            validos, erros = [], []
+            for numero, registro in lote:
+                if numero <= inicio:
+                    continue
+                try:
+                    validos.append(
+                        (numero, serializer.run_validation(registro))
+                    )
+                except serializers.ValidationError as exc:
+                    erros.append((numero, exc.detail))
+            if validos:
+                inseridas, rejeitados_lote = importar_lote(
+                    validos, digest, executor
+                )
+                importadas += inseridas
+                erros += rejeitados_lote
+            for numero, detalhe in sorted(erros, key=lambda erro: erro[0]):
+                saida.write(
+                    json.dumps(
+                        {
+                            "linha": numero,
+                            "registro": originais[numero],
+                            "erros": detalhe,
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+            saida.flush()
+            ultima = lote[-1][0]
+            if ultima > inicio:
+                gravar_progresso(progresso, digest, ultima)
+            linhas += len(lote)
+            rejeitadas += len(erros)
+            yield linhas, importadas, rejeitadas
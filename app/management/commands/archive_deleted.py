@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from app.arquivo import arquivar
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Move soft-deleted usuarios, pedidos and their items older than the "
+        "retention period to the archive table, in bounded batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ARCHIVE_RETENTION_DAYS,
+            help="Retention in days (default: ARCHIVE_RETENTION_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options["days"])
+        totais = {}
+        for model, movidos in arquivar(limite, options["batch_size"]):
+            label = model._meta.label
+            totais[label] = totais.get(label, 0) + movidos
+            self.stdout.write(f"{label}: {totais[label]} archived")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        for label, total in totais.items():
+            self.stdout.write(self.style.SUCCESS(f"{label}: {total} archived"))
+        if not totais:
+            self.stdout.write("Nothing to archive.")
@@ -0,0 +1,62 @@
+import os
+import time
+
+from app.importacao import TIPOS, importar
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Import produtos, usuarios or pedido items from a CSV or JSON lines "
+        "file in bulk batches. Rejected rows go to a side file, and running "
+        "the same command again resumes an interrupted import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=sorted(TIPOS))
+        parser.add_argument("arquivo", help="A .csv or .jsonl file.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--rejects",
+            help="Rejected rows, as JSON lines (default: <arquivo>.rejects).",
+        )
+        parser.add_argument(
+            "--progress",
+            help="Last committed line (default: <arquivo>.progress).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Threads hashing usuario passwords.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the progress file; rows already imported are "
+            "still skipped.",
+        )
+
+    def handle(self, *args, **options):
+        arquivo = options["arquivo"]
+        start = time.perf_counter()
+        linhas = importadas = rejeitadas = 0
+        for linhas, importadas, rejeitadas in importar(
+            options["tipo"],
+            arquivo,
+            progresso=options["progress"] or f"{arquivo}.progress",
+            rejeitados=options["rejects"] or f"{arquivo}.rejects",
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            recomecar=options["restart"],
+        ):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{linhas} lines read, {importadas} imported, "
+                f"{rejeitadas} rejected ({linhas / elapsed:.0f} lines/s)"
+            )
+
+        style = self.style.WARNING if rejeitadas else self.style.SUCCESS
+        self.stdout.write(
+            style(f"{importadas} imported, {rejeitadas} rejected.")
+        )
@@ -0,0 +1,13 @@
+from app.vendas import reconstruir
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily sales totals from the live pedido items of "
+        "every shard. Pause writes to pedidos while it runs."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"{total} daily totals rebuilt."))
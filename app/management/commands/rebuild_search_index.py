@@ -0,0 +1,17 @@
+from app.busca import instalar
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the produto search index from scratch. On SQLite, run it "
+        "after a VACUUM, which may renumber the rows the index points to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        instalar(connections[options["database"]])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
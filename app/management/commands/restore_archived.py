@@ -0,0 +1,33 @@
+from app.arquivo import ARQUIVAVEIS, restaurar
+from app.models import RegistroArquivado
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Move an archived row and its archived subtree back to the hot "
+        "tables. Rows come back soft-deleted; undelete them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "model",
+            choices=[model._meta.label for model, _ in ARQUIVAVEIS],
+        )
+        parser.add_argument("pk")
+
+    def handle(self, *args, **options):
+        model = next(
+            model
+            for model, _ in ARQUIVAVEIS
+            if model._meta.label == options["model"]
+        )
+        try:
+            total = restaurar(model, options["pk"])
+        except RegistroArquivado.DoesNotExist:
+            raise CommandError(
+                f"{options['model']} {options['pk']} is not archived."
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"{total} rows restored."))
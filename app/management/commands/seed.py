@@ -0,0 +1,67 @@
+import time
+
+from app.geracao import SEMENTE, semear
+from app.models import Usuario
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+
+class Command(BaseCommand):
+    help = (
+        "Add synthetic produtos and usuarios with pedidos for load tests: "
+        "valid CPFs and RGs, a few produtos far more popular than the rest "
+        "and one shared password, written by bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--produtos", type=int, default=1000)
+        parser.add_argument(
+            "--pedidos-per-user",
+            type=int,
+            default=5,
+            help="Average; each usuario gets 0 to twice as many.",
+        )
+        parser.add_argument(
+            "--password",
+            default="senha",
+            help="Password of every usuario, hashed once.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes writing usuario ranges in parallel.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--random-seed", type=int, default=SEMENTE)
+
+    def handle(self, *args, **options):
+        db = router.db_for_write(Usuario)
+        if options["workers"] > 1 and connections[db].vendor == "sqlite":
+            raise CommandError("SQLite takes one writer at a time.")
+        start = time.perf_counter()
+        usuarios = pedidos = itens = 0
+        for usuarios, pedidos, itens in semear(
+            options["users"],
+            options["produtos"],
+            options["pedidos_per_user"],
+            make_password(options["password"]),
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            semente=options["random_seed"],
+        ):
+            elapsed = time.perf_counter() - start
+            linhas = usuarios + pedidos + itens
+            self.stdout.write(
+                f"{usuarios} usuarios, {pedidos} pedidos, {itens} items "
+                f"({linhas / elapsed:.0f} rows/s)"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{options['produtos']} produtos, {usuarios} usuarios, "
+                f"{pedidos} pedidos and {itens} items added."
+            )
+        )
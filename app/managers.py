@@ -1,6 +1,152 @@
+from app.db.shards import is_sharded, shard_databases
+from app.signals import pre_bulk_softdelete, pre_bulk_undelete
 from django.contrib.auth.models import UserManager
+from django.db import models, router, transaction
+from django.utils import timezone
+from safedelete.config import (
+    DELETED_ONLY_VISIBLE,
+    DELETED_VISIBLE,
+    HARD_DELETE,
+    SOFT_DELETE_CASCADE,
+)
 from safedelete.managers import SafeDeleteManager
+from safedelete.models import is_safedelete_cls
+from safedelete.queryset import SafeDeleteQueryset
 
 
-class UsuarioManager(SafeDeleteManager, UserManager):
+def cascade_relations(model):
+    """(related model, FK name) pairs reached by a soft-delete cascade."""
+    for relation in model._meta.related_objects:
+        related_model = relation.related_model
+        if (
+            relation.one_to_many
+            and relation.on_delete is models.CASCADE
+            and is_safedelete_cls(related_model)
+            and related_model._safedelete_policy == SOFT_DELETE_CASCADE
+        ):
+            yield related_model, relation.field.name
+
+
+def cascade_children(queryset, related_model, field_name, undelete=False):
+    """Yields the children of `queryset` rows, one queryset per database.
+
+    Children on the same database are selected through a subquery on their
+    parents. Sharded children of primary rows can't be, so the parents are
+    fetched first and every shard is updated on its own, outside the
+    primary's transaction; children go first, so a failed cascade is
+    completed by running it again.
+    """
+    lookup = f"{field_name}__in"
+    if not is_sharded(related_model) or is_sharded(queryset.model):
+        filters = {lookup: queryset.values("pk")}
+        if undelete:
+            filters["deleted"] = models.F(f"{field_name}__deleted")
+        else:
+            filters["deleted__isnull"] = True
+        yield related_model.all_objects.using(queryset.db).filter(**filters)
+        return
+
+    if undelete:
+        # Restore only the children deleted together with their parent
+        groups = {}
+        for pk, deleted in queryset.values_list("pk", "deleted"):
+            groups.setdefault(deleted, []).append(pk)
+        filters = [
+            {lookup: pks, "deleted": deleted} for deleted, pks in groups.items()
+        ]
+    else:
+        pks = list(queryset.values_list("pk", flat=True))
+        filters = [{lookup: pks, "deleted__isnull": True}] if pks else []
+    for alias in shard_databases():
+        for shard_filters in filters:
+            yield related_model.all_objects.using(alias).filter(**shard_filters)
+
+
+def bulk_soft_delete(queryset, deleted, counter):
+    """Marks `queryset` and its cascade subtree, children first.
+
+    Each level costs one UPDATE per database whatever the subtree size.
+    """
+    for related_model, field_name in cascade_relations(queryset.model):
+        for children in cascade_children(queryset, related_model, field_name):
+            bulk_soft_delete(children, deleted, counter)
+
+    pre_bulk_softdelete.send(sender=queryset.model, queryset=queryset)
+    count = queryset.update(deleted=deleted)
+    if count:
+        counter[queryset.model._meta.label] = (
+            counter.get(queryset.model._meta.label, 0) + count
+        )
+
+
+def bulk_undelete(queryset, counter):
+    """Restores `queryset` and the children deleted together with it."""
+    for related_model, field_name in cascade_relations(queryset.model):
+        for children in cascade_children(
+            queryset, related_model, field_name, undelete=True
+        ):
+            bulk_undelete(children, counter)
+
+    pre_bulk_undelete.send(sender=queryset.model, queryset=queryset)
+    count = queryset.update(deleted=None)
+    if count:
+        counter[queryset.model._meta.label] = (
+            counter.get(queryset.model._meta.label, 0) + count
+        )
+
+
+class SafeDeleteCascadeQueryset(SafeDeleteQueryset):
+    """Soft-deletes and undeletes with a few UPDATEs instead of row by row."""
+
+    def delete(self, force_policy=None):
+        if force_policy == HARD_DELETE:
+            # Django's collector deletes in bulk, unlike safedelete's loop
+            return models.QuerySet.delete(self)
+        if force_policy not in (None, SOFT_DELETE_CASCADE):
+            return super().delete(force_policy=force_policy)
+        assert self.query.can_filter(), "Cannot delete a sliced queryset."
+
+        counter = {}
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            queryset = self.model.all_objects.using(db).filter(
+                pk__in=self.values("pk"), deleted__isnull=True
+            )
+            bulk_soft_delete(queryset, timezone.now(), counter)
+        self._result_cache = None
+        return sum(counter.values()), counter
+
+    delete.alters_data = True
+
+    def undelete(self, force_policy=None):
+        if force_policy not in (None, SOFT_DELETE_CASCADE):
+            return super().undelete(force_policy=force_policy)
+        assert self.query.can_filter(), "Cannot undelete a sliced queryset."
+
+        counter = {}
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            queryset = self.model.all_objects.using(db).filter(
+                pk__in=self.values("pk"), deleted__isnull=False
+            )
+            bulk_undelete(queryset, counter)
+        self._result_cache = None
+        return sum(counter.values()), counter
+
+    undelete.alters_data = True
+
+
+class SafeDeleteCascadeManager(SafeDeleteManager):
+    _queryset_class = SafeDeleteCascadeQueryset
+
+
+class SafeDeleteCascadeAllManager(SafeDeleteCascadeManager):
+    _safedelete_visibility = DELETED_VISIBLE
+
+
+class SafeDeleteCascadeDeletedManager(SafeDeleteCascadeManager):
+    _safedelete_visibility = DELETED_ONLY_VISIBLE
+
+
+class UsuarioManager(SafeDeleteCascadeManager, UserManager):
     pass
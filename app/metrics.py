@@ -0,0 +1,107 @@
+import bisect
+import threading
+
+
+def format_labels(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+class Histogram:
+    """Observations counted in buckets, as Prometheus histograms are."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+    def lines(self, name, labels):
+        lines, total = [], 0
+        bounds = [*map(str, self.buckets), "+Inf"]
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            label_text = format_labels([*labels, ("le", bound)])
+            lines.append(f"{name}_bucket{{{label_text}}} {total}")
+        suffix = f"{{{format_labels(labels)}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class Registry:
+    """In-process metrics, rendered in the Prometheus text format.
+
+    Values live in the memory of each process, so a scrape only sees the
+    process that served it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.types = {}
+        self.values = {}
+
+    def key(self, name, kind, labels):
+        self.types.setdefault(name, kind)
+        return name, tuple(sorted(labels.items()))
+
+    def incr(self, name, value=1, **labels):
+        with self.lock:
+            key = self.key(name, "counter", labels)
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[self.key(name, "gauge", labels)] = value
+
+    def observe(self, name, value, buckets, **labels):
+        """Adds `value` to the histogram `name` with upper bounds `buckets`."""
+        with self.lock:
+            key = self.key(name, "histogram", labels)
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get(self, name, **labels):
+        with self.lock:
+            return self.values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def clear(self):
+        with self.lock:
+            self.types.clear()
+            self.values.clear()
+
+    def render(self):
+        with self.lock:
+            values = sorted(
+                (key, value.copy() if isinstance(value, Histogram) else value)
+                for key, value in self.values.items()
+            )
+            types = dict(self.types)
+        lines, previous = [], None
+        for (name, labels), value in values:
+            if name != previous:
+                lines.append(f"# TYPE {name} {types[name]}")
+                previous = name
+            if isinstance(value, Histogram):
+                lines += value.lines(name, labels)
+            elif labels:
+                lines.append(f"{name}{{{format_labels(labels)}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
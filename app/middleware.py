@@ -0,0 +1,103 @@
+import asyncio
+import time
+from contextvars import ContextVar
+
+from app.metrics import registry
+
+# SQL stats of the current request, None outside MetricsMiddleware
+request_sql = ContextVar("request_sql", default=None)
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Anything else is labelled "other", clients choose the method
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class SQLStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+def count_sql(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the request's SQL stats."""
+    stats = request_sql.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.seconds += time.perf_counter() - start
+        stats.queries += 1
+
+
+def install_sql_counter(connection):
+    if count_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_sql)
+
+
+class MetricsMiddleware:
+    """Latency, SQL queries and SQL time of each request, by view and method.
+
+    Queries are counted on whatever thread runs them, as long as it sees
+    the request's context: app.receivers installs count_sql on every
+    connection. The body of a streaming response is not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django to await it under ASGI instead of using a thread
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = SQLStats()
+        token = request_sql.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_sql.reset(token)
+        if asyncio.iscoroutine(response):
+            # Under ASGI, Django 3.1.0 middleware with its own __init__
+            # looks sync but hands back the coroutine of the async chain
+            return self.finish(request, response, start, stats)
+        self.record(request, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = SQLStats()
+        return await self.finish(
+            request, self.get_response(request), time.perf_counter(), stats
+        )
+
+    async def finish(self, request, response, start, stats):
+        token = request_sql.set(stats)
+        try:
+            response = await response
+        finally:
+            request_sql.reset(token)
+        self.record(request, time.perf_counter() - start, stats)
+        return response
+
+    def record(self, request, elapsed, stats):
+        match = request.resolver_match
+        labels = {
+            "view": match.view_name if match else "unmatched",
+            "method": request.method if request.method in METHODS else "other",
+        }
+        registry.observe(
+            "http_request_duration_seconds", elapsed, LATENCY_BUCKETS, **labels
+        )
+        registry.incr("http_request_sql_queries_total", stats.queries, **labels)
+        registry.incr("http_request_sql_seconds_total", stats.seconds, **labels)
@@ -0,0 +1,29 @@
+# Generated by Django 3.1 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(condition=models.Q(deleted__isnull=True), fields=['usuario', 'feito', 'id'], name='pedido_usuario_feito_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedidoproduto',
+            index=models.Index(condition=models.Q(deleted__isnull=True), fields=['produto', 'pedido'], name='pedidoproduto_produto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(deleted__isnull=True), fields=['nome', 'id'], name='produto_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(condition=models.Q(deleted__isnull=True), fields=['date_joined', 'id'], name='usuario_date_joined_idx'),
+        ),
+    ]
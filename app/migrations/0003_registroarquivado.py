@@ -0,0 +1,34 @@
+# Generated by Django 3.1 on 2026-10-18 08:55
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroArquivado',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('chave', models.UUIDField(verbose_name='Chave')),
+                ('pai', models.UUIDField(null=True, verbose_name='Pai')),
+                ('dados', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Dados')),
+                ('removido', models.DateTimeField(verbose_name='Removido em')),
+                ('arquivado', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='registroarquivado',
+            index=models.Index(fields=['modelo', 'pai'], name='arquivado_pai_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='registroarquivado',
+            unique_together={('modelo', 'chave')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_registroarquivado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1 on 2026-10-18 09:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_pedido_versao'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pedido',
+            name='usuario',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AlterField(
+            model_name='pedidoproduto',
+            name='produto',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='app.produto', verbose_name='Produto'),
+        ),
+    ]
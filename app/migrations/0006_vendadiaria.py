@@ -0,0 +1,31 @@
+# Generated by Django 3.1 on 2026-10-18 09:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_shard_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaDiaria',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.produto', verbose_name='Produto')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='vendadiaria',
+            index=models.Index(fields=['dia', 'produto', 'quantidade'], name='venda_dia_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='vendadiaria',
+            unique_together={('produto', 'dia')},
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from app import busca
+
+
+def instalar(apps, schema_editor):
+    busca.instalar(schema_editor.connection)
+
+
+def remover(apps, schema_editor):
+    busca.remover(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_vendadiaria'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar, remover),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1 on 2026-10-18 10:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_produto_busca'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pedido',
+            name='feito',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Feito em'),
+        ),
+    ]
@@ -1,15 +1,31 @@
 import uuid
 
-from app.managers import UsuarioManager
+from app.managers import (
+    SafeDeleteCascadeAllManager,
+    SafeDeleteCascadeDeletedManager,
+    SafeDeleteCascadeManager,
+    UsuarioManager,
+)
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from safedelete.models import SOFT_DELETE_CASCADE, SafeDeleteModel
 
 
-class Usuario(SafeDeleteModel, AbstractUser):
+class SafeDeleteCascadeModel(SafeDeleteModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
-    id = models.UUIDField(primary_key=True, deft=uuid.uuid4, editabsle=False)
+    objects = SafeDeleteCascadeManager()
+    all_objects = SafeDeleteCascadeAllManager()
+    deleted_objects = SafeDeleteCascadeDeletedManager()
+
+    class Meta:
+        abstract = True
+
+
+class Usuario(SafeDeleteCascadeModel, AbstractUser):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     email = models.EmailField(unique=True)
     endereco = models.CharField("Endereço", max_length=200)
@@ -29,10 +45,17 @@ class Usuario(SafeDeleteModel, AbstractUser):
     def __str__(self):
         return self.email
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["date_joined", "id"],
+                name="usuario_date_joined_idx",
+                condition=models.Q(deleted__isnull=True),
+            ),
+        ]
 
-class Produto(SafeDeleteModel):
-    _safedelete_policy = SOFT_DELETE_CASCADE
 
+class Produto(SafeDeleteCascadeModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     nome = models.CharField(
         "Nome",
@@ -43,27 +66,53 @@ class Produto(SafeDeleteModel):
     def __str__(self):
         return str(self.nome)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["nome", "id"],
+                name="produto_nome_idx",
+                condition=models.Q(deleted__isnull=True),
+            ),
+        ]
 
-class Pedido(SafeDeleteModel):
-    _safedelete_policy = SOFT_DELETE_CASCADE
 
+class Pedido(SafeDeleteCascadeModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Pedidos may live on a shard while usuarios stay on the primary
     usuario = models.ForeignKey(
-        "Usuario", verbose_name="Usuário", on_delete=models.CASCADE
+        "Usuario",
+        verbose_name="Usuário",
+        on_delete=models.CASCADE,
+        db_constraint=False,
     )
     endereco = models.CharField("Endereço", max_length=200)
-    feito = models.DateTimeField("Feito em", auto_now_add=True)
+    # Not auto_now_add, so bulk inserts can keep an imported date
+    feito = models.DateTimeField(
+        "Feito em", default=timezone.now, editable=False
+    )
+    # Bumped on every change to the pedido or to any of its items
+    versao = models.PositiveIntegerField("Versão", default=1, editable=False)
 
     def __str__(self):
         return str(self.feito)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["usuario", "feito", "id"],
+                name="pedido_usuario_feito_idx",
+                condition=models.Q(deleted__isnull=True),
+            ),
+        ]
 
-class PedidoProduto(SafeDeleteModel):
-    _safedelete_policy = SOFT_DELETE_CASCADE
 
+class PedidoProduto(SafeDeleteCascadeModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     produto = models.ForeignKey(
-        "Produto", verbose_name="Produto", on_delete=models.CASCADE
+        "Produto",
+        verbose_name="Produto",
+        on_delete=models.CASCADE,
+        db_constraint=False,
     )
     pedido = models.ForeignKey(
         "Pedido", verbose_name="Pedido", on_delete=models.CASCADE
@@ -77,3 +126,56 @@ class PedidoProduto(SafeDeleteModel):
         unique_together = [
             ["pedido", "produto"],
         ]
+        # The unique index on (pedido, produto) serves lookups by pedido
+        indexes = [
+            models.Index(
+                fields=["produto", "pedido"],
+                name="pedidoproduto_produto_idx",
+                condition=models.Q(deleted__isnull=True),
+            ),
+        ]
+
+
+class VendaDiaria(models.Model):
+    """Units of a produto sold on a day, kept up to date by app.vendas."""
+
+    produto = models.ForeignKey(
+        "Produto", verbose_name="Produto", on_delete=models.CASCADE
+    )
+    dia = models.DateField("Dia")
+    quantidade = models.IntegerField("Quantidade", default=0)
+
+    def __str__(self):
+        return f"{self.produto} {self.dia} x{self.quantidade}"
+
+    class Meta:
+        unique_together = [
+            ["produto", "dia"],
+        ]
+        indexes = [
+            models.Index(
+                fields=["dia", "produto", "quantidade"], name="venda_dia_idx"
+            ),
+        ]
+
+
+class RegistroArquivado(models.Model):
+    """A soft-deleted row moved out of its hot table by the archiver."""
+
+    modelo = models.CharField("Modelo", max_length=100)
+    chave = models.UUIDField("Chave")
+    pai = models.UUIDField("Pai", null=True)
+    dados = models.JSONField("Dados", encoder=DjangoJSONEncoder)
+    removido = models.DateTimeField("Removido em")
+    arquivado = models.DateTimeField("Arquivado em", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.modelo} {self.chave}"
+
+    class Meta:
+        unique_together = [
+            ["modelo", "chave"],
+        ]
+        indexes = [
+            models.Index(fields=["modelo", "pai"], name="arquivado_pai_idx"),
+        ]
@@ -0,0 +1,129 @@
+from app.api.authentication import user_cache
+from app.api.cache import invalidar_catalogo
+from app.busca import reparar
+from app.db.connections import check_connections
+from app.metrics import registry
+from app.middleware import install_sql_counter
+from app.models import Pedido, PedidoProduto, Produto, Usuario
+from app.signals import pre_bulk_softdelete, pre_bulk_undelete
+from app.vendas import dia_da_venda, registrar_com, somar, vendas_por_dia
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from safedelete.signals import post_softdelete, post_undelete
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_softdelete, sender=Produto)
+@receiver(post_undelete, sender=Produto)
+@receiver(pre_bulk_softdelete, sender=Produto)
+@receiver(pre_bulk_undelete, sender=Produto)
+def produto_changed(sender, **kwargs):
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver(post_save, sender=PedidoProduto)
+def pedido_produto_changed(sender, instance, raw=False, **kwargs):
+    # Soft deletes and undeletes are saves, so post_save covers them too
+    if raw:
+        return
+    Pedido.all_objects.using(instance._state.db).filter(
+        pk=instance.pedido_id
+    ).update(versao=F("versao") + 1)
+
+
+@receiver(pre_bulk_softdelete, sender=PedidoProduto)
+@receiver(pre_bulk_undelete, sender=PedidoProduto)
+def pedido_produtos_changed(sender, queryset, **kwargs):
+    Pedido.all_objects.using(queryset.db).filter(
+        pk__in=queryset.values("pedido")
+    ).update(versao=F("versao") + 1)
+
+
+@receiver(pre_save, sender=PedidoProduto)
+def pedido_produto_saving(sender, instance, raw=False, **kwargs):
+    # Compares with the stored row now, the totals change once it is saved
+    if raw:
+        return
+    variacoes = {}
+    if not instance._state.adding:
+        anterior = PedidoProduto.all_objects.using(instance._state.db).filter(
+            pk=instance.pk, deleted__isnull=True
+        )
+        somar(variacoes, vendas_por_dia(anterior), -1)
+    if instance.deleted is None:
+        dia = dia_da_venda(instance.pedido)
+        somar(variacoes, [(instance.produto_id, dia, instance.quantidade)])
+    instance._variacoes_venda = variacoes
+
+
+@receiver(post_save, sender=PedidoProduto)
+def pedido_produto_saved(sender, instance, raw=False, **kwargs):
+    variacoes = instance.__dict__.pop("_variacoes_venda", None)
+    if variacoes and not raw:
+        registrar_com(variacoes, instance._state.db)
+
+
+@receiver(post_delete, sender=PedidoProduto)
+def pedido_produto_deleted(sender, instance, **kwargs):
+    # Soft deleted items, e.g. archived ones, were already accounted for
+    if instance.deleted is not None:
+        return
+    pedido_produto_changed(sender, instance)
+    dia = dia_da_venda(instance.pedido)
+    variacoes = {(instance.produto_id, dia): -instance.quantidade}
+    registrar_com(variacoes, instance._state.db)
+
+
+@receiver(pre_bulk_softdelete, sender=PedidoProduto)
+def pedido_produtos_softdeleted(sender, queryset, **kwargs):
+    variacoes = somar({}, vendas_por_dia(queryset), -1)
+    registrar_com(variacoes, queryset.db)
+
+
+@receiver(pre_bulk_undelete, sender=PedidoProduto)
+def pedido_produtos_undeleted(sender, queryset, **kwargs):
+    registrar_com(somar({}, vendas_por_dia(queryset)), queryset.db)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_changed(sender, instance, **kwargs):
+    # Password changes, deactivation and soft deletes are all saves
+    user_cache.discard(str(instance.pk))
+
+
+@receiver(pre_bulk_softdelete, sender=Usuario)
+@receiver(pre_bulk_undelete, sender=Usuario)
+def usuarios_changed(sender, **kwargs):
+    # Bulk changes are rare, dropping everything saves a query for the pks
+    user_cache.clear()
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    if sender.label == "app":
+        reparar(connections[using])
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_sql_counter(connection)
+    # Pooled backends count their own opens, this fires on every checkout
+    if not getattr(connection, "pooled", False):
+        registry.incr("db_connections_opened_total", alias=connection.alias)
+
+
+@receiver(request_started)
+def request_started_connections(sender, **kwargs):
+    # Django connects close_old_connections first, so this runs after it
+    check_connections()
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent once per model by the set-based cascade, before the UPDATE runs and
+# inside its transaction, with `queryset` matching exactly the rows about to
+# change. Row-level safedelete signals are not sent on that path.
+pre_bulk_softdelete = Signal()
+pre_bulk_undelete = Signal()
@@ -0,0 +1,13 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ShardAwareRunner(DiscoverRunner):
+    """Runs the suite on the primary alone, even with shards configured.
+
+    The tests that cover sharding turn the configured shards back on.
+    """
+
+    def run_suite(self, suite, **kwargs):
+        with override_settings(DATABASE_SHARDS=[]):
+            return super().run_suite(suite, **kwargs)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+
+from app.models import Pedido, PedidoProduto, RegistroArquivado, Usuario
+from app.tests.test_models import mock_pedidoProduto, mock_produto
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        mock_dict = mock_pedidoProduto()
+        self.usuario = mock_dict["usuario"]
+        self.pedido = mock_dict["data"]["pedido"]
+        PedidoProduto.objects.create(
+            pedido=self.pedido, produto=mock_produto()["produto"], quantidade=2
+        )
+
+    def delete_usuario(self, days_ago):
+        Usuario.objects.filter(pk=self.usuario.pk).delete()
+        deleted = timezone.now() - timedelta(days=days_ago)
+        for model in (Usuario, Pedido, PedidoProduto):
+            model.all_objects.update(deleted=deleted)
+
+    def archive(self, **options):
+        call_command("archive_deleted", stdout=StringIO(), **options)
+
+    def test_archive(self):
+        self.delete_usuario(days_ago=100)
+        self.archive(days=30, batch_size=1)
+
+        self.assertFalse(Usuario.all_objects.filter(pk=self.usuario.pk))
+        self.assertFalse(Pedido.all_objects.all())
+        self.assertFalse(PedidoProduto.all_objects.all())
+        self.assertEqual(RegistroArquivado.objects.count(), 4)
+        self.assertEqual(
+            RegistroArquivado.objects.filter(pai=self.pedido.pk).count(), 2
+        )
+
+    def test_no_pedido_updates(self):
+        self.delete_usuario(days_ago=100)
+        with CaptureQueriesContext(connection) as queries:
+            self.archive(days=30)
+        self.assertFalse(
+            [q for q in queries if q["sql"].startswith('UPDATE "app_pedido"')]
+        )
+
+    def test_retention(self):
+        self.delete_usuario(days_ago=10)
+        self.archive(days=30)
+        self.assertFalse(RegistroArquivado.objects.all())
+        self.assertTrue(Pedido.all_objects.all())
+
+    def test_keeps_parent_with_live_children(self):
+        Pedido.objects.filter(pk=self.pedido.pk).delete()
+        Pedido.all_objects.update(deleted=timezone.now() - timedelta(days=100))
+        PedidoProduto.all_objects.update(deleted=None)
+
+        self.archive(days=30)
+        self.assertFalse(RegistroArquivado.objects.all())
+
+    def test_restore(self):
+        self.delete_usuario(days_ago=100)
+        self.archive(days=30)
+
+        call_command(
+            "restore_archived",
+            "app.Usuario",
+            str(self.usuario.pk),
+            stdout=StringIO(),
+        )
+        self.assertFalse(RegistroArquivado.objects.all())
+        usuario = Usuario.all_objects.get(pk=self.usuario.pk)
+        self.assertTrue(usuario.check_password("x"))
+        self.assertEqual(PedidoProduto.deleted_objects.count(), 2)
+
+        Usuario.all_objects.filter(pk=self.usuario.pk).undelete()
+        self.assertEqual(PedidoProduto.objects.count(), 2)
+
+    def test_restore_orphan(self):
+        self.delete_usuario(days_ago=100)
+        self.archive(days=30)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "restore_archived",
+                "app.Pedido",
+                str(self.pedido.pk),
+                stdout=StringIO(),
+            )
@@ -0,0 +1,166 @@
+import threading
+from unittest.mock import patch
+
+from app.db.connections import check_connections
+from app.db.pool import ConnectionPool, PoolTimeout
+from app.db.routers import (
+    ReplicaRouter,
+    choose_replica,
+    is_sticky,
+    replica_alias,
+    stick_to_primary,
+)
+from app.metrics import Registry, registry
+from app.models import Pedido
+from django.db import connection
+from django.test import TestCase, override_settings
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class PoolTestCase(TestCase):
+    def setUp(self):
+        registry.clear()
+
+    def test_reuse(self):
+        pool = ConnectionPool("test", size=2, timeout=1)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual(
+            registry.get("db_connections_opened_total", alias="test"), 1
+        )
+        self.assertEqual(
+            registry.get("db_connections_reused_total", alias="test"), 1
+        )
+
+    def test_size_and_timeout(self):
+        pool = ConnectionPool("test", size=1, timeout=0.05)
+        conn = pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(
+            registry.get("db_pool_timeouts_total", alias="test"), 1
+        )
+
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        timer.join()
+        self.assertEqual(registry.get("db_pool_waits_total", alias="test"), 2)
+
+    def test_health_check(self):
+        pool = ConnectionPool(
+            "test", size=1, timeout=1, check=lambda conn: not conn.closed
+        )
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        conn.closed = True
+        self.assertIsNot(pool.acquire(FakeConnection), conn)
+        self.assertEqual(
+            registry.get("db_health_check_failures_total", alias="test"), 1
+        )
+
+    def test_discard_and_max_age(self):
+        pool = ConnectionPool("test", size=2, timeout=1, max_age=60)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn, discard=True)
+        self.assertTrue(conn.closed)
+
+        conn = pool.acquire(FakeConnection)
+        with patch("app.db.pool.time.monotonic", return_value=10**9):
+            pool.release(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(
+            registry.get("db_pool_connections", alias="test", state="open"), 0
+        )
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool("test", size=1, timeout=0.05)
+
+        def fail():
+            raise OSError
+
+        with self.assertRaises(OSError):
+            pool.acquire(fail)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+
+class ConnectionsTestCase(TestCase):
+    def setUp(self):
+        registry.clear()
+        connection.ensure_connection()
+
+    def test_reused_counted(self):
+        check_connections()
+        self.assertEqual(
+            registry.get("db_connections_reused_total", alias="default"), 1
+        )
+
+    def test_health_check(self):
+        settings_dict = {**connection.settings_dict, "CONN_HEALTH_CHECKS": True}
+        with patch.object(connection, "settings_dict", settings_dict):
+            with patch.object(connection, "is_usable", return_value=False):
+                with patch.object(connection, "close") as close:
+                    check_connections()
+        close.assert_called_once()
+        self.assertEqual(
+            registry.get("db_health_check_failures_total", alias="default"), 1
+        )
+
+
+class RegistryTestCase(TestCase):
+    def test_render(self):
+        metrics = Registry()
+        metrics.incr("requests_total", view="a")
+        metrics.incr("requests_total", 2, view="b")
+        metrics.set("pool", 3)
+        self.assertEqual(
+            metrics.render(),
+            "# TYPE pool gauge\n"
+            "pool 3\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{view="a"} 1\n'
+            'requests_total{view="b"} 2\n',
+        )
+
+    def test_histogram(self):
+        metrics = Registry()
+        for value in [0.05, 0.2, 3]:
+            metrics.observe("latency", value, (0.1, 1), view="a")
+        self.assertEqual(
+            metrics.render(),
+            "# TYPE latency histogram\n"
+            'latency_bucket{view="a",le="0.1"} 1\n'
+            'latency_bucket{view="a",le="1"} 2\n'
+            'latency_bucket{view="a",le="+Inf"} 3\n'
+            'latency_sum{view="a"} 3.25\n'
+            'latency_count{view="a"} 3\n',
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReplicaRouterTestCase(TestCase):
+    def test_routing(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Pedido), "default")
+        token = replica_alias.set(choose_replica())
+        try:
+            self.assertEqual(router.db_for_read(Pedido), "replica_1")
+            self.assertEqual(router.db_for_write(Pedido), "default")
+        finally:
+            replica_alias.reset(token)
+        self.assertFalse(router.allow_migrate("replica_1", "app"))
+        self.assertTrue(router.allow_migrate("default", "app"))
+
+    def test_sticky(self):
+        self.assertFalse(is_sticky(None))
+        self.assertFalse(is_sticky("x"))
+        stick_to_primary("x")
+        self.assertTrue(is_sticky("x"))
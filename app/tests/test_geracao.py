@@ -0,0 +1,82 @@
+from collections import Counter
+from io import StringIO
+
+from app.api.serializers import UsuarioSerializer
+from app.geracao import DOMINIO, cpf, rg, semear
+from app.models import Pedido, PedidoProduto, Produto, Usuario, VendaDiaria
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+
+class GeracaoTestCase(TestCase):
+    def test_cpf(self):
+        self.assertEqual(cpf(111444777), "111.444.777-35")
+        self.assertEqual(cpf(100_000_000), "100.000.000-19")
+
+    def test_rg(self):
+        # Check digit 9: 2*1 + 3*0 + ... = 2, 11 - 2
+        self.assertEqual(rg(0), "10.000.000-9")
+        numeros = {rg(numero) for numero in range(1000)}
+        self.assertEqual(len(numeros), 1000)
+        campo = UsuarioSerializer().fields["rg"]
+        for numero in numeros:
+            campo.run_validation(numero)
+
+    def test_semear(self):
+        senha = make_password("senha")
+        *_, totais = semear(30, 50, 3, senha, batch_size=20, semente=1)
+        usuarios, pedidos, itens = totais
+        self.assertEqual(usuarios, 30)
+        self.assertEqual(Produto.objects.count(), 50)
+        self.assertEqual(Pedido.objects.count(), pedidos)
+        self.assertEqual(PedidoProduto.objects.count(), itens)
+
+        gerados = Usuario.objects.filter(email__endswith=f"@{DOMINIO}")
+        self.assertEqual(gerados.count(), 30)
+        self.assertTrue(gerados.first().check_password("senha"))
+        for usuario in gerados:
+            UsuarioSerializer().fields["cpf"].run_validation(usuario.cpf)
+            for pedido in usuario.pedido_set.all():
+                self.assertGreaterEqual(pedido.feito, usuario.date_joined)
+
+        # Bulk inserts kept the sales totals
+        self.assertEqual(
+            VendaDiaria.objects.aggregate(Sum("quantidade")),
+            {
+                "quantidade__sum": PedidoProduto.objects.aggregate(
+                    Sum("quantidade")
+                )["quantidade__sum"]
+            },
+        )
+
+    def test_popularidade(self):
+        list(semear(50, 100, 10, make_password(None), semente=1))
+        vendas = Counter(
+            PedidoProduto.objects.values_list("produto_id", flat=True)
+        )
+        (_, primeiro), *_, (_, ultimo) = vendas.most_common()
+        self.assertGreater(primeiro, 10 * ultimo)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "seed",
+            "--users=5",
+            "--produtos=10",
+            "--pedidos-per-user=2",
+            stdout=out,
+        )
+        self.assertIn("10 produtos, 5 usuarios", out.getvalue())
+
+        # Another run continues the numbering
+        call_command("seed", "--users=5", "--produtos=0", stdout=StringIO())
+        self.assertEqual(
+            set(
+                Usuario.objects.filter(
+                    email__endswith=f"@{DOMINIO}"
+                ).values_list("username", flat=True)
+            ),
+            {f"usuario{numero}" for numero in range(10)},
+        )
@@ -0,0 +1,173 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from app.importacao import importar
+from app.models import Pedido, PedidoProduto, Produto, Usuario, VendaDiaria
+from app.tests.test_models import mock_produto, mock_usuario
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+
+class ImportacaoTestCase(TestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+
+    def arquivo(self, nome, registros):
+        caminho = os.path.join(self.diretorio, nome)
+        with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+            if nome.endswith(".csv"):
+                writer = csv.DictWriter(arquivo, fieldnames=registros[0])
+                writer.writeheader()
+                writer.writerows(registros)
+            else:
+                for registro in registros:
+                    arquivo.write(json.dumps(registro) + "\n")
+        return caminho
+
+    def importar(self, tipo, caminho, **kwargs):
+        *_, (linhas, importadas, rejeitadas) = importar(
+            tipo,
+            caminho,
+            progresso=f"{caminho}.progress",
+            rejeitados=f"{caminho}.rejects",
+            **kwargs,
+        )
+        return importadas, rejeitadas
+
+    def rejeicoes(self, caminho):
+        with open(f"{caminho}.rejects") as arquivo:
+            return [json.loads(linha) for linha in arquivo]
+
+    def test_produtos(self):
+        caminho = self.arquivo(
+            "produtos.csv",
+            [
+                {"nome": f"Produto {i}", "descricao": "x" if i else ""}
+                for i in range(10)
+            ],
+        )
+        self.assertEqual(
+            self.importar("produtos", caminho, batch_size=3), (9, 1)
+        )
+        self.assertEqual(Produto.objects.count(), 9)
+        (rejeicao,) = self.rejeicoes(caminho)
+        self.assertEqual(rejeicao["linha"], 1)
+        self.assertIn("descricao", rejeicao["erros"])
+
+    def test_usuarios(self):
+        existente = mock_usuario()["usuario"]
+        hash_legado = make_password("legado")
+        usuario = {
+            "username": "ana",
+            "email": "ana@x.com",
+            "password": "segredo",
+            "endereco": "x",
+            "cpf": "123.456.789-00",
+            "rg": "12.345.678-9",
+        }
+        caminho = self.arquivo(
+            "usuarios.jsonl",
+            [
+                usuario,
+                dict(usuario, username="bia", email="bia@x.com", password=""),
+                dict(usuario, username="caio", cpf="12345678900"),
+                dict(usuario, username="duda", email=existente.email),
+                dict(
+                    usuario,
+                    username="eva",
+                    email="eva@x.com",
+                    password=hash_legado,
+                ),
+            ],
+        )
+        self.assertEqual(self.importar("usuarios", caminho), (3, 2))
+        self.assertTrue(
+            Usuario.objects.get(username="ana").check_password("segredo")
+        )
+        self.assertFalse(
+            Usuario.objects.get(username="bia").has_usable_password()
+        )
+        self.assertEqual(
+            Usuario.objects.get(username="eva").password, hash_legado
+        )
+        erros = [rejeicao["erros"] for rejeicao in self.rejeicoes(caminho)]
+        self.assertIn("cpf", erros[0])
+        self.assertIn("email", erros[1])
+
+    def test_pedidos(self):
+        usuario = mock_usuario()["usuario"]
+        produtos = [mock_produto()["produto"] for _ in range(3)]
+        feito = timezone.make_aware(datetime(2019, 5, 1, 12))
+        linhas = [
+            {
+                "pedido": "A1",
+                "usuario": usuario.email,
+                "endereco": "Rua x",
+                "feito": feito.isoformat(),
+                "produto": str(produto.pk),
+                "quantidade": 2,
+            }
+            for produto in produtos
+        ]
+        linhas += [
+            dict(linhas[0], pedido="A2"),
+            dict(linhas[0], pedido="A2"),
+            dict(linhas[0], pedido="A3", usuario="ninguem@x.com"),
+            dict(linhas[0], pedido="A3", quantidade=0),
+        ]
+        caminho = self.arquivo("pedidos.csv", linhas)
+        self.assertEqual(
+            self.importar("pedidos", caminho, batch_size=2), (4, 3)
+        )
+
+        pedidos = Pedido.objects.filter(usuario=usuario).order_by("feito")
+        self.assertEqual(pedidos.count(), 2)
+        self.assertEqual(pedidos[0].feito, feito)
+        self.assertEqual(PedidoProduto.objects.count(), 4)
+        self.assertEqual(
+            VendaDiaria.objects.get(
+                produto=produtos[0], dia=feito.date()
+            ).quantidade,
+            4,
+        )
+        erros = [rejeicao["erros"] for rejeicao in self.rejeicoes(caminho)]
+        self.assertEqual(
+            [list(erro) for erro in erros],
+            [["produto"], ["usuario"], ["quantidade"]],
+        )
+
+    def test_resume(self):
+        caminho = self.arquivo(
+            "produtos.jsonl",
+            [{"nome": f"p{i}", "descricao": "x"} for i in range(10)],
+        )
+        # Stopped after its first batch, as if the process had died
+        lotes = importar(
+            "produtos",
+            caminho,
+            progresso=f"{caminho}.progress",
+            rejeitados=f"{caminho}.rejects",
+            batch_size=4,
+        )
+        next(lotes)
+        lotes.close()
+        self.assertEqual(Produto.objects.count(), 4)
+
+        out = StringIO()
+        call_command("import", "produtos", caminho, stdout=out)
+        self.assertIn("6 imported, 0 rejected", out.getvalue())
+        self.assertEqual(Produto.objects.count(), 10)
+
+        # Without the progress file, rows already imported are skipped
+        out = StringIO()
+        call_command("import", "produtos", caminho, "--restart", stdout=out)
+        self.assertIn("0 imported, 0 rejected", out.getvalue())
+        self.assertEqual(Produto.objects.count(), 10)
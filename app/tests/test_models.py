@@ -1,5 +1,5 @@
 from app.models import Pedido, PedidoProduto, Produto, Usuario
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
 from django.test import TestCase
 
@@ -143,3 +143,105 @@ class PedidoProdutoTestCase(TestCase):
     def test_unique(self):
         with self.assertRaises(IntegrityError):
             PedidoProduto.objects.create(**self.data)
+
+
+class BulkCascadeTestCase(TestCase):
+    def setUp(self):
+        self.usuario = mock_usuario()["usuario"]
+        self.produto = mock_produto()["produto"]
+        for _ in range(3):
+            pedido = Pedido.objects.create(usuario=self.usuario, endereco="x")
+            PedidoProduto.objects.create(
+                pedido=pedido, produto=self.produto, quantidade=1
+            )
+
+    def test_delete(self):
+        # one UPDATE per level, the pedido version bump and the sales totals
+        # (items summed, then one upsert)
+        with self.assertNumQueries(8):
+            total, counter = Usuario.objects.filter(pk=self.usuario.pk).delete()
+
+        self.assertEqual(total, 7)
+        self.assertEqual(counter["app.Pedido"], 3)
+        self.assertEqual(counter["app.PedidoProduto"], 3)
+        self.assertFalse(Usuario.objects.filter(pk=self.usuario.pk))
+        self.assertFalse(Pedido.objects.all())
+        self.assertFalse(PedidoProduto.objects.all())
+        self.assertTrue(Produto.objects.filter(pk=self.produto.pk))
+
+        usuario = Usuario.all_objects.get(pk=self.usuario.pk)
+        self.assertEqual(
+            set(Pedido.all_objects.values_list("deleted", flat=True)),
+            {usuario.deleted},
+        )
+
+    def test_undelete(self):
+        PedidoProduto.objects.filter(
+            pk=PedidoProduto.objects.values("pk")[:1]
+        ).delete()
+        Usuario.objects.filter(pk=self.usuario.pk).delete()
+
+        total, _ = Usuario.all_objects.filter(pk=self.usuario.pk).undelete()
+
+        self.assertEqual(total, 6)
+        self.assertTrue(Usuario.objects.filter(pk=self.usuario.pk))
+        self.assertEqual(Pedido.objects.count(), 3)
+        # deleted before the usuario, so it is not part of the cascade
+        self.assertEqual(PedidoProduto.objects.count(), 2)
+
+    def test_delete_produto(self):
+        Produto.objects.filter(pk=self.produto.pk).delete()
+        self.assertFalse(PedidoProduto.objects.all())
+        self.assertEqual(Pedido.objects.count(), 3)
+
+
+class IndexTestCase(TestCase):
+    """List and detail queries must be served by an index scan."""
+
+    def setUp(self):
+        mock_dict = mock_pedidoProduto()
+        self.usuario = mock_dict["usuario"]
+        self.pedido = mock_dict["data"]["pedido"]
+        self.produto = mock_dict["data"]["produto"]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            self.assertIn("Index", plan)
+            self.assertNotIn("Seq Scan", plan)
+        else:
+            self.assertRegex(plan, r"USING (COVERING )?INDEX")
+            self.assertNotRegex(plan, r"(?m)SCAN (TABLE )?app_[a-z]+$")
+            self.assertNotIn("TEMP B-TREE", plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_pedido_list(self):
+        queryset = Pedido.objects.filter(usuario=self.usuario).order_by(
+            "-feito", "-id"
+        )[:51]
+        self.assertIndexScan(queryset, "pedido_usuario_feito_idx")
+
+    def test_pedido_detail(self):
+        queryset = Pedido.objects.filter(
+            usuario=self.usuario, pk=self.pedido.pk
+        )[:21]
+        self.assertIndexScan(queryset)
+
+    def test_pedidoProduto_list(self):
+        queryset = PedidoProduto.objects.filter(pedido=self.pedido)[:1000]
+        self.assertIndexScan(queryset)
+
+    def test_pedidoProduto_detail(self):
+        queryset = PedidoProduto.objects.filter(
+            pedido=self.pedido, produto=self.produto
+        )[:21]
+        # The unique_together index, no separate one on the same columns
+        self.assertIndexScan(queryset, "pedido_id_produto_id")
+
+    def test_produto_list(self):
+        queryset = Produto.objects.order_by("nome", "id")[:51]
+        self.assertIndexScan(queryset, "produto_nome_idx")
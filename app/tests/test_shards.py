@@ -0,0 +1,228 @@
+import json
+import uuid
+from datetime import timedelta
+from operator import attrgetter
+from unittest import skipUnless
+from unittest.mock import patch
+
+from app.admin import PedidoAdmin
+from app.api.views import PedidoViewSet
+from app.arquivo import arquivar, restaurar
+from app.db.routers import ShardRouter
+from app.db.shards import (
+    ShardRoutingError,
+    fanout,
+    fanout_count,
+    shard_for,
+    shard_of,
+    using_shard,
+)
+from app.models import Pedido, PedidoProduto, Produto, Usuario, VendaDiaria
+from app.tests.test_models import mock_produto
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+SHARDS = ["shard_1", "shard_2"]
+
+
+@override_settings(DATABASE_SHARDS=SHARDS)
+class ShardRouterTestCase(SimpleTestCase):
+    def test_shard_for(self):
+        usuario_id = uuid.uuid4()
+        self.assertEqual(shard_for(usuario_id), shard_for(str(usuario_id)))
+        shards = {shard_for(uuid.uuid4()) for _ in range(100)}
+        self.assertEqual(shards, set(SHARDS))
+
+    def test_routing(self):
+        router = ShardRouter()
+        self.assertIsNone(router.db_for_read(Produto))
+        with self.assertRaises(ShardRoutingError):
+            router.db_for_read(Pedido)
+        with using_shard("shard_2"):
+            self.assertEqual(router.db_for_read(PedidoProduto), "shard_2")
+
+        pedido = Pedido(usuario_id=uuid.uuid4())
+        shard = shard_for(pedido.usuario_id)
+        self.assertEqual(router.db_for_write(Pedido, instance=pedido), shard)
+        item = PedidoProduto(pedido=pedido)
+        self.assertEqual(
+            router.db_for_write(PedidoProduto, instance=item), shard
+        )
+
+    @override_settings(DATABASE_SHARDS=[])
+    def test_disabled(self):
+        router = ShardRouter()
+        self.assertIsNone(router.db_for_read(Pedido))
+        self.assertEqual(shard_for(uuid.uuid4()), "default")
+
+
+@skipUnless(
+    len(settings.DATABASE_SHARDS) >= 2,
+    "set DB_SHARD_NAMES to at least two databases",
+)
+@override_settings(DATABASE_SHARDS=settings.DATABASE_SHARDS)
+class ShardsTestCase(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.produto = mock_produto()["produto"]
+        self.usuarios = {}
+        i = 0
+        # One usuario on each of the first two shards
+        while len(self.usuarios) < 2:
+            i += 1
+            usuario = Usuario(
+                username=f"u{i}", email=f"u{i}@x.com", cpf="x", rg="x"
+            )
+            shard = shard_for(usuario.pk)
+            if shard in settings.DATABASE_SHARDS[:2]:
+                usuario.save()
+                self.usuarios.setdefault(shard, usuario)
+
+    def checkout(self, usuario):
+        view = PedidoViewSet.as_view({"post": "checkout"})
+        request = APIRequestFactory().post(
+            "/api/pedidos/checkout/",
+            {
+                "endereco": "x",
+                "itens": [{"produto": str(self.produto.pk), "quantidade": 1}],
+            },
+            format="json",
+        )
+        force_authenticate(request, usuario)
+        return view(request)
+
+    def test_api(self):
+        for usuario in self.usuarios.values():
+            self.assertEqual(self.checkout(usuario).status_code, 201)
+        # Sales totals stay on the primary, updated after each shard commit
+        self.assertEqual(VendaDiaria.objects.get().quantidade, 2)
+        for shard, usuario in self.usuarios.items():
+            pedidos = Pedido.objects.using(shard)
+            self.assertEqual(
+                list(pedidos.values_list("usuario", flat=True)), [usuario.pk]
+            )
+            self.assertEqual(PedidoProduto.objects.using(shard).count(), 1)
+
+            view = PedidoViewSet.as_view({"get": "list"})
+            request = APIRequestFactory().get(
+                "/api/pedidos/?expand=itens.produto"
+            )
+            force_authenticate(request, usuario)
+            response = view(request)
+            self.assertEqual(len(response.data["results"]), 1)
+
+    def test_export(self):
+        for usuario in self.usuarios.values():
+            self.checkout(usuario)
+        admin = Usuario.objects.create_superuser(
+            username="admin", email="admin@x.com", password="x"
+        )
+        view = PedidoViewSet.as_view(
+            {"get": "export"}, **PedidoViewSet.export.kwargs
+        )
+        request = APIRequestFactory().get("/api/pedidos/export/")
+        force_authenticate(request, admin)
+        content = b"".join(view(request).streaming_content).decode()
+        # One item from each shard, named from the primary
+        rows = [json.loads(row) for row in content.splitlines()]
+        self.assertEqual(
+            {row["usuario"] for row in rows},
+            {str(usuario.pk) for usuario in self.usuarios.values()},
+        )
+        self.assertEqual({row["nome"] for row in rows}, {self.produto.nome})
+
+    def test_fanout(self):
+        for usuario in self.usuarios.values():
+            self.checkout(usuario)
+        pedidos = fanout(
+            Pedido.objects.order_by("-feito"),
+            key=attrgetter("feito"),
+            reverse=True,
+        )
+        self.assertEqual(len(pedidos), 2)
+        self.assertGreaterEqual(pedidos[0].feito, pedidos[1].feito)
+        self.assertEqual(fanout_count(PedidoProduto.objects.all()), 2)
+        self.assertEqual(shard_of(Pedido, pedidos[0].pk), pedidos[0]._state.db)
+
+    def test_cascade(self):
+        for usuario in self.usuarios.values():
+            self.checkout(usuario)
+        Usuario.objects.all().delete()
+        self.assertEqual(fanout_count(Pedido.objects.all()), 0)
+        self.assertEqual(fanout_count(PedidoProduto.objects.all()), 0)
+
+        Usuario.all_objects.all().undelete()
+        self.assertEqual(fanout_count(Pedido.objects.all()), 2)
+        self.assertEqual(fanout_count(PedidoProduto.objects.all()), 2)
+
+    def test_archive(self):
+        shard, usuario = next(iter(self.usuarios.items()))
+        self.checkout(usuario)
+        Usuario.objects.filter(pk=usuario.pk).delete()
+        deleted = timezone.now() - timedelta(days=100)
+        Usuario.all_objects.update(deleted=deleted)
+        for model in (Pedido, PedidoProduto):
+            model.all_objects.using(shard).update(deleted=deleted)
+
+        list(arquivar(timezone.now()))
+        self.assertFalse(Usuario.all_objects.filter(pk=usuario.pk))
+        self.assertEqual(fanout_count(Pedido.all_objects.all()), 0)
+
+        self.assertEqual(restaurar(Usuario, usuario.pk), 3)
+        self.assertEqual(Pedido.all_objects.using(shard).count(), 1)
+        self.assertEqual(PedidoProduto.all_objects.using(shard).count(), 1)
+
+    def test_admin(self):
+        for usuario in self.usuarios.values():
+            self.checkout(usuario)
+        self.client.force_login(
+            Usuario.objects.create_superuser(
+                username="admin", email="admin@x.com", password="x"
+            )
+        )
+        pedidos = fanout(Pedido.objects.all())
+        # Both shards, by default with the highest pk first
+        response = self.client.get("/admin/app/pedido/")
+        self.assertEqual(response.status_code, 200)
+        cl = response.context["cl"]
+        self.assertEqual((cl.result_count, cl.full_result_count), (2, 2))
+        self.assertEqual(
+            [pedido.pk for pedido in cl.result_list],
+            sorted((pedido.pk for pedido in pedidos), reverse=True),
+        )
+
+        # Sorted by usuario, the column after the checkbox and __str__, one
+        # per page
+        usuarios = sorted(pedido.usuario_id for pedido in pedidos)
+        with patch.object(PedidoAdmin, "list_per_page", 1):
+            for page, usuario_id in enumerate(usuarios):
+                response = self.client.get(
+                    "/admin/app/pedido/", {"o": "2", "p": page}
+                )
+                cl = response.context["cl"]
+                self.assertEqual(cl.result_count, 2)
+                self.assertEqual(
+                    [pedido.usuario_id for pedido in cl.result_list],
+                    [usuario_id],
+                )
+
+        response = self.client.get("/admin/app/pedidoproduto/")
+        self.assertEqual(response.context["cl"].result_count, 2)
+        for pedido in pedidos:
+            response = self.client.get(f"/admin/app/pedido/{pedido.pk}/change/")
+            self.assertEqual(response.status_code, 200)
+
+        # Actions run on every shard
+        for action, total in (("remove_selected", 0), ("undelete_selected", 2)):
+            self.client.post(
+                "/admin/app/pedido/",
+                {
+                    "action": action,
+                    "_selected_action": [str(pedido.pk) for pedido in pedidos],
+                    "index": 0,
+                },
+            )
+            self.assertEqual(fanout_count(Pedido.objects.all()), total)
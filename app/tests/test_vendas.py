@@ -0,0 +1,66 @@
+from io import StringIO
+
+from app.models import Pedido, PedidoProduto, VendaDiaria
+from app.tests.test_models import mock_pedido, mock_produto
+from app.vendas import dia_da_venda
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class VendaDiariaTestCase(TestCase):
+    def setUp(self):
+        self.pedido = mock_pedido()["pedido"]
+        self.produto = mock_produto()["produto"]
+        self.dia = dia_da_venda(self.pedido)
+
+    def vendido(self):
+        venda = VendaDiaria.objects.filter(
+            produto=self.produto, dia=self.dia
+        ).first()
+        return venda.quantidade if venda else 0
+
+    def test_incremental(self):
+        item = PedidoProduto.objects.create(
+            pedido=self.pedido, produto=self.produto, quantidade=2
+        )
+        self.assertEqual(self.vendido(), 2)
+
+        item.quantidade = 5
+        item.save()
+        self.assertEqual(self.vendido(), 5)
+
+        item.delete()
+        self.assertEqual(self.vendido(), 0)
+        item.undelete()
+        self.assertEqual(self.vendido(), 5)
+
+    def test_cascade(self):
+        PedidoProduto.objects.create(
+            pedido=self.pedido, produto=self.produto, quantidade=3
+        )
+        Pedido.objects.filter(pk=self.pedido.pk).delete()
+        self.assertEqual(self.vendido(), 0)
+        Pedido.all_objects.filter(pk=self.pedido.pk).undelete()
+        self.assertEqual(self.vendido(), 3)
+
+    def test_rebuild(self):
+        PedidoProduto.objects.create(
+            pedido=self.pedido, produto=self.produto, quantidade=3
+        )
+        outro = mock_produto()["produto"]
+        PedidoProduto.objects.create(
+            pedido=self.pedido, produto=outro, quantidade=1
+        ).delete()
+        incremental = list(
+            VendaDiaria.objects.filter(quantidade__gt=0).values_list(
+                "produto", "quantidade"
+            )
+        )
+        self.assertEqual(incremental, [(self.produto.pk, 3)])
+
+        VendaDiaria.objects.update(quantidade=42)
+        call_command("rebuild_sales_summary", stdout=StringIO())
+        self.assertEqual(
+            list(VendaDiaria.objects.values_list("produto", "quantidade")),
+            incremental,
+        )
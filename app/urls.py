@@ -1,10 +1,14 @@
+from app.api.async_views import async_read_urls
 from app.api.views import (
+    MetricsView,
     PedidoProdutoViewSet,
     PedidoViewSet,
     ProdutoViewSet,
     TokenObtainPairView,
     UsuarioViewSet,
+    VendasViewSet,
 )
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -13,15 +17,21 @@ router = DefaultRouter()
 router.register("produtos", ProdutoViewSet)
 router.register("pedidos", PedidoViewSet)
 router.register("usuarios", UsuarioViewSet)
+router.register("relatorios/vendas", VendasViewSet, basename="vendas")
 
 router.register(
     r"pedidos/(?P<pedidos_pk>[^/.]+)/produtos", PedidoProdutoViewSet
 )
 
+api_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    api_urls = async_read_urls(api_urls)
+
 urlpatterns = [
     path("api/token/", TokenObtainPairView.as_view(), name="token-obtain"),
     path(
         "api/token/refresh/", TokenRefreshView.as_view(), name="token-refresh"
     ),
-    path("api/", include(router.urls)),
+    path("api/_metrics", MetricsView.as_view(), name="metrics"),
+    path("api/", include(api_urls)),
 ]
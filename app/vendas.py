@@ -0,0 +1,112 @@
+from app.db.shards import shard_databases
+from app.models import PedidoProduto, VendaDiaria
+from django.db import connections, router, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Keys per upsert, keeps the parameters well under SQLite's limits
+LOTE = 100
+
+
+def dia_da_venda(pedido):
+    return timezone.localdate(pedido.feito)
+
+
+def somar(variacoes, linhas, sinal=1):
+    """Adds (produto_id, dia, quantidade) `linhas` into `variacoes`."""
+    for produto_id, dia, quantidade in linhas:
+        chave = (produto_id, dia)
+        variacoes[chave] = variacoes.get(chave, 0) + sinal * quantidade
+    return variacoes
+
+
+def vendas_por_dia(queryset):
+    """(produto_id, dia, quantidade) totals of a PedidoProduto queryset."""
+    return (
+        queryset.order_by()
+        .annotate(dia=TruncDate("pedido__feito"))
+        .values("produto_id", "dia")
+        .annotate(total=Sum("quantidade"))
+        .values_list("produto_id", "dia", "total")
+    )
+
+
+@transaction.atomic(savepoint=False)
+def registrar(variacoes):
+    """Adds {(produto_id, dia): quantidade} to the daily totals.
+
+    Every batch of keys is a single upsert, which creates the missing rows
+    and adds to the existing ones whatever the number of produtos.
+    """
+    variacoes = [(chave, total) for chave, total in variacoes.items() if total]
+    connection = connections[router.db_for_write(VendaDiaria)]
+    tabela = connection.ops.quote_name(VendaDiaria._meta.db_table)
+    produto = VendaDiaria._meta.get_field("produto")
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(variacoes), LOTE):
+            lote = variacoes[inicio : inicio + LOTE]
+            params = []
+            for (produto_id, dia), total in lote:
+                params += [
+                    produto.get_db_prep_value(produto_id, connection),
+                    connection.ops.adapt_datefield_value(dia),
+                    total,
+                ]
+            # ON CONFLICT needs SQLite 3.24+ or PostgreSQL 9.5+
+            cursor.execute(
+                f"INSERT INTO {tabela} (produto_id, dia, quantidade) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(lote))
+                + " ON CONFLICT (produto_id, dia) DO UPDATE SET quantidade = "
+                f"{tabela}.quantidade + excluded.quantidade",
+                params,
+            )
+
+
+def registrar_com(variacoes, db):
+    """Registers `variacoes` along with the item changes made on `db`.
+
+    On the database of the totals this joins the current transaction; the
+    items on a shard only count once their own transaction commits.
+    """
+    if not any(variacoes.values()):
+        return
+    if db == router.db_for_write(VendaDiaria):
+        registrar(variacoes)
+    else:
+        transaction.on_commit(lambda: registrar(variacoes), using=db)
+
+
+def registrar_itens(itens, db):
+    """Bulk inserts PedidoProduto `itens` on `db` with their sales.
+
+    Bulk inserts send no signals, so the totals are kept here instead.
+    """
+    PedidoProduto.all_objects.using(db).bulk_create(itens)
+    vendas = (
+        (item.produto_id, dia_da_venda(item.pedido), item.quantidade)
+        for item in itens
+    )
+    registrar_com(somar({}, vendas), db)
+
+
+def reconstruir():
+    """Recomputes the daily totals from the live items of every shard.
+
+    Item changes made while it runs may be missed, so run it with writes
+    paused, or run it again afterwards.
+    """
+    variacoes = {}
+    for db in shard_databases():
+        somar(variacoes, vendas_por_dia(PedidoProduto.objects.using(db)))
+    with transaction.atomic():
+        VendaDiaria.objects.all().delete()
+        VendaDiaria.objects.bulk_create(
+            (
+                VendaDiaria(produto_id=produto_id, dia=dia, quantidade=total)
+                for (produto_id, dia), total in variacoes.items()
+                if total
+            ),
+            batch_size=1000,
+        )
+    return len(variacoes)
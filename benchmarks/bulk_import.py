@@ -0,0 +1,138 @@
+"""Throughput of `manage.py import` for produtos, usuarios and pedidos.
+
+Writes the files to --dir and imports them into the configured database,
+so point it at a scratch database:
+
+    export DB_NAME=/tmp/import.sqlite3 SECRET_KEY=x
+    python manage.py migrate
+    python -m benchmarks.bulk_import --linhas 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from .search import SEMENTE
+
+
+def escrever_jsonl(caminho, registros):
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for registro in registros:
+            arquivo.write(json.dumps(registro) + "\n")
+
+
+def usuarios(total):
+    for i in range(total):
+        yield {
+            "username": f"import{i}",
+            "email": f"import{i}@example.com",
+            "endereco": f"Rua {i}",
+            "cpf": f"{i % 1000:03}.{i // 1000 % 1000:03}.000-00",
+            "rg": str(i),
+        }
+
+
+def linhas_pedidos(total, emails, produtos, rng):
+    """Pedidos of 1 to 9 items, spread over the last two years."""
+    inicio = datetime.now(timezone.utc) - timedelta(days=730)
+    linha = pedido = 0
+    while linha < total:
+        pedido += 1
+        usuario = rng.choice(emails)
+        endereco = f"Rua {rng.randrange(10_000)}"
+        feito = inicio + timedelta(seconds=rng.randrange(730 * 86400))
+        for produto in rng.sample(
+            produtos, min(rng.randint(1, 9), total - linha)
+        ):
+            linha += 1
+            yield {
+                "pedido": pedido,
+                "usuario": usuario,
+                "endereco": endereco,
+                "feito": feito.isoformat(),
+                "produto": produto,
+                "quantidade": rng.randint(1, 5),
+            }
+
+
+def medir(tipo, caminho, batch_size):
+    from app.importacao import importar
+
+    start = time.perf_counter()
+    linhas = importadas = rejeitadas = 0
+    for linhas, importadas, rejeitadas in importar(
+        tipo,
+        caminho,
+        progresso=f"{caminho}.progress",
+        rejeitados=f"{caminho}.rejects",
+        batch_size=batch_size,
+        recomecar=True,
+    ):
+        pass
+    elapsed = time.perf_counter() - start
+    return {
+        "lines": linhas,
+        "imported": importadas,
+        "rejected": rejeitadas,
+        "seconds": round(elapsed, 1),
+        "lines_per_second": round(linhas / elapsed),
+    }
+
+
+def run(diretorio, total_produtos, total_usuarios, total_linhas, batch_size):
+    from app.geracao import gerar_produtos
+    from app.models import Produto
+
+    rng = random.Random(SEMENTE)
+    resultados = {}
+
+    caminho = os.path.join(diretorio, "produtos.jsonl")
+    escrever_jsonl(caminho, gerar_produtos(total_produtos, rng))
+    resultados["produtos"] = medir("produtos", caminho, batch_size)
+
+    caminho = os.path.join(diretorio, "usuarios.jsonl")
+    escrever_jsonl(caminho, usuarios(total_usuarios))
+    resultados["usuarios"] = medir("usuarios", caminho, batch_size)
+
+    emails = [usuario["email"] for usuario in usuarios(total_usuarios)]
+    produtos = [
+        str(pk)
+        for pk in Produto.objects.values_list("pk", flat=True)[:total_produtos]
+    ]
+    caminho = os.path.join(diretorio, "pedidos.csv")
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        linhas = linhas_pedidos(total_linhas, emails, produtos, rng)
+        primeira = next(linhas)
+        writer = csv.DictWriter(arquivo, fieldnames=primeira)
+        writer.writeheader()
+        writer.writerow(primeira)
+        writer.writerows(linhas)
+    resultados["pedidos"] = medir("pedidos", caminho, batch_size)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    parser.add_argument("--produtos", type=int, default=10_000)
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nivelamento.settings")
+    import django
+
+    django.setup()
+    result = run(
+        args.dir, args.produtos, args.usuarios, args.linhas, args.batch_size
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
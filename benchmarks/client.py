@@ -0,0 +1,36 @@
+"""Stdlib HTTP helpers shared by the benchmarks."""
+import json
+import statistics
+import urllib.error
+import urllib.request
+
+
+def request(url, data=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, body, headers)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summary(latencies):
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(ms),
+        "p50": percentile(ms, 50),
+        "p95": percentile(ms, 95),
+        "p99": percentile(ms, 99),
+        "mean": statistics.mean(ms) if ms else float("nan"),
+    }
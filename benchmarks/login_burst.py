@@ -0,0 +1,93 @@
+"""Token issuance throughput next to /api/pedidos/ latency during a burst.
+
+Runs against a live server, e.g.
+
+    python -m benchmarks.login_burst --url http://127.0.0.1:8000 \
+        --email x@x.com --password x --concurrency 32 --duration 10
+
+Login threads hammer /api/token/ while one reader keeps listing pedidos;
+the report shows how many tokens were issued or shed (429) and whether
+order reads kept their latency.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+
+from .client import request, summary
+
+
+def login_worker(url, credentials, deadline, statuses, lock):
+    while time.monotonic() < deadline:
+        status, _ = request(f"{url}/api/token/", credentials)
+        with lock:
+            statuses[status] += 1
+
+
+def reader_worker(url, token, deadline, latencies):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        request(f"{url}/api/pedidos/", token=token)
+        latencies.append(time.perf_counter() - start)
+
+
+def run(url, email, password, concurrency, duration):
+    credentials = {"email": email, "password": password}
+    status, body = request(f"{url}/api/token/", credentials)
+    if status != 200:
+        raise SystemExit(f"Login failed with {status}: {body!r}")
+    token = json.loads(body)["access"]
+
+    baseline = []
+    reader_worker(url, token, time.monotonic() + min(duration, 3), baseline)
+
+    statuses, lock, latencies = Counter(), threading.Lock(), []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=login_worker,
+            args=(url, credentials, deadline, statuses, lock),
+        )
+        for _ in range(concurrency)
+    ]
+    threads.append(
+        threading.Thread(
+            target=reader_worker, args=(url, token, deadline, latencies)
+        )
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "duration": duration,
+        "concurrency": concurrency,
+        "tokens_per_second": statuses[200] / duration,
+        "token_statuses": dict(statuses),
+        "pedidos_baseline_ms": summary(baseline),
+        "pedidos_burst_ms": summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+    result = run(
+        args.url.rstrip("/"),
+        args.email,
+        args.password,
+        args.concurrency,
+        args.duration,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Cost of MetricsMiddleware and of its SQL counting, per request and query.
+
+Sends the same in-process requests through the full middleware stack with
+and without the metrics, alternating rounds, and times bare queries with
+and without the SQL counter. Adds the rows it needs to the configured
+database, so point it at a scratch database:
+
+    export DB_NAME=/tmp/metrics.sqlite3 SECRET_KEY=x
+    python manage.py migrate
+    python -m benchmarks.metrics_overhead
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from .search import preencher
+from .serializers import preencher_pedidos
+
+MIDDLEWARE = "app.middleware.MetricsMiddleware"
+
+
+def cliente(usuario, middleware):
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(usuario)
+    # The handler loads the middleware on its first request
+    with override_settings(MIDDLEWARE=middleware):
+        client.get("/api/produtos/")
+    return client
+
+
+def por_requisicao(client, url, requisicoes):
+    start = time.perf_counter()
+    for _ in range(requisicoes):
+        response = client.get(url)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return elapsed / requisicoes * 1e6
+
+
+def por_consulta(consultas):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        start = time.perf_counter()
+        for _ in range(consultas):
+            cursor.execute("SELECT 1")
+        return (time.perf_counter() - start) / consultas * 1e9
+
+
+def por_chamada(handler, request, chamadas):
+    start = time.perf_counter()
+    for _ in range(chamadas):
+        handler(request)
+    return (time.perf_counter() - start) / chamadas * 1e9
+
+
+def comparar(com, sem, rodadas):
+    """Medians of `com()` and `sem()`, the latter without the SQL counter."""
+    from app.middleware import count_sql
+    from django.db import connection
+
+    medidas = {"plain": [], "metrics": []}
+    for _ in range(rodadas):
+        connection.execute_wrappers.remove(count_sql)
+        try:
+            medidas["plain"].append(sem())
+        finally:
+            connection.execute_wrappers.append(count_sql)
+        medidas["metrics"].append(com())
+    plain = statistics.median(medidas["plain"])
+    metrics = statistics.median(medidas["metrics"])
+    return round(plain, 1), round(metrics, 1), round(metrics - plain, 1)
+
+
+def run(requisicoes, consultas, rodadas):
+    from app.middleware import (
+        MetricsMiddleware,
+        SQLStats,
+        install_sql_counter,
+        request_sql,
+    )
+    from django.conf import settings
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    preencher(1000, 1000)
+    usuario = preencher_pedidos(500)
+    connection.ensure_connection()
+    install_sql_counter(connection)
+
+    com_metricas = cliente(usuario, settings.MIDDLEWARE)
+    sem_metricas = cliente(
+        usuario, [path for path in settings.MIDDLEWARE if path != MIDDLEWARE]
+    )
+    pedido = usuario.pedido_set.first()
+    urls = [
+        "/api/produtos/",
+        f"/api/pedidos/{pedido.pk}/produtos/",
+        "/api/pedidos/?expand=itens.produto",
+    ]
+    resultados = {}
+    for url in urls:
+        plain, metrics, overhead = comparar(
+            lambda: por_requisicao(com_metricas, url, requisicoes),
+            lambda: por_requisicao(sem_metricas, url, requisicoes),
+            rodadas,
+        )
+        resultados[url] = {
+            "plain_us": plain,
+            "metrics_us": metrics,
+            "overhead_us": overhead,
+            "overhead_pct": round(overhead / plain * 100, 1),
+        }
+
+    def com_stats():
+        token = request_sql.set(SQLStats())
+        try:
+            return por_consulta(consultas)
+        finally:
+            request_sql.reset(token)
+
+    plain, metrics, overhead = comparar(
+        com_stats, lambda: por_consulta(consultas), rodadas
+    )
+    resultados["SELECT 1"] = {
+        "plain_ns": plain,
+        "metrics_ns": metrics,
+        "overhead_ns": overhead,
+    }
+
+    # The middleware alone, around a view that does nothing
+    request = RequestFactory().get("/api/produtos/")
+    request.resolver_match = resolve("/api/produtos/")
+    response = HttpResponse()
+
+    def view(request):
+        return response
+
+    middleware = MetricsMiddleware(view)
+    plain, metrics, overhead = comparar(
+        lambda: por_chamada(middleware, request, consultas),
+        lambda: por_chamada(view, request, consultas),
+        rodadas,
+    )
+    resultados["middleware"] = {
+        "plain_ns": plain,
+        "metrics_ns": metrics,
+        "overhead_ns": overhead,
+    }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nivelamento.settings")
+    import django
+
+    django.setup()
+    from django.test import override_settings
+
+    # The test client sends Host: testserver
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        result = run(args.requests, args.queries, args.rounds)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Read throughput of the hot API routes, with optional slow clients.
+
+Run it once against each deployment and compare the reports, e.g.
+
+    gunicorn nivelamento.wsgi --threads 8
+    ASYNC_READ_VIEWS=True uvicorn nivelamento.asgi:application
+    python -m benchmarks.read_throughput --email x@x.com --password x \
+        --label wsgi --concurrency 32 --slow-clients 200
+
+Slow clients open a connection and trickle their request headers until
+the end of the run, holding whatever the server assigns to a connection.
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .client import request, summary
+
+
+def read_urls(url, token):
+    _, body = request(f"{url}/api/produtos/?page_size=1")
+    urls = [f"{url}/api/produtos/", f"{url}/api/pedidos/"]
+    produtos = json.loads(body)["results"]
+    if produtos:
+        urls.append(f"{url}/api/produtos/{produtos[0]['id']}/")
+    _, body = request(f"{url}/api/pedidos/?page_size=1", token=token)
+    pedidos = json.loads(body)["results"]
+    if pedidos:
+        urls.append(f"{url}/api/pedidos/{pedidos[0]['id']}/produtos/")
+    return urls
+
+
+def reader(urls, token, deadline, latencies, statuses, lock):
+    i = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        status, _ = request(urls[i % len(urls)], token=token)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+        i += 1
+
+
+def slow_client(url, deadline):
+    parts = urlsplit(url)
+    try:
+        with socket.create_connection((parts.hostname, parts.port or 80)) as s:
+            head = f"GET /api/produtos/ HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+            s.sendall(head.encode())
+            while time.monotonic() < deadline:
+                s.sendall(b"X-Slow: 1\r\n")
+                time.sleep(1)
+    except OSError:
+        pass
+
+
+def run(url, email, password, concurrency, duration, slow_clients):
+    status, body = request(
+        f"{url}/api/token/", {"email": email, "password": password}
+    )
+    if status != 200:
+        raise SystemExit(f"Login failed with {status}: {body!r}")
+    token = json.loads(body)["access"]
+    urls = read_urls(url, token)
+
+    deadline = time.monotonic() + duration
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    threads = [
+        threading.Thread(target=slow_client, args=(url, deadline), daemon=True)
+        for _ in range(slow_clients)
+    ]
+    threads += [
+        threading.Thread(
+            target=reader,
+            args=(urls, token, deadline, latencies, statuses, lock),
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "duration": duration,
+        "concurrency": concurrency,
+        "slow_clients": slow_clients,
+        "requests_per_second": statuses[200] / duration,
+        "statuses": dict(statuses),
+        "latency_ms": summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--slow-clients", type=int, default=0)
+    args = parser.parse_args()
+    result = run(
+        args.url.rstrip("/"),
+        args.email,
+        args.password,
+        args.concurrency,
+        args.duration,
+        args.slow_clients,
+    )
+    print(json.dumps({"label": args.label, **result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
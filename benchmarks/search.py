@@ -0,0 +1,125 @@
+"""Produto search latency on a large catalog, through the ORM.
+
+Fills the configured database up to --produtos rows, so point it at a
+scratch database, then times the first page of a search against a plain
+icontains scan of nome and descricao:
+
+    export DB_NAME=/tmp/busca.sqlite3 SECRET_KEY=x
+    python manage.py migrate
+    python -m benchmarks.search --produtos 1000000
+"""
+import argparse
+import json
+import os
+import random
+import time
+import unicodedata
+
+from .client import summary
+
+# Same vocabulary on every run, so searches match what earlier runs loaded
+SEMENTE = 2020
+
+
+def buscas(rng):
+    """Searches for common, mid-frequency and rare words, without accents."""
+    from app.geracao import vocabulario
+
+    palavras = vocabulario(rng, 50_000)
+    sem_acento = [
+        unicodedata.normalize("NFKD", palavra)
+        .encode("ascii", "ignore")
+        .decode()
+        for palavra in palavras
+    ]
+    return [
+        sem_acento[0],
+        sem_acento[10],
+        f"{sem_acento[3]} {sem_acento[20]}",
+        sem_acento[500],
+        sem_acento[20_000],
+    ]
+
+
+def preencher(total, batch_size):
+    from app.geracao import gerar_produtos
+    from app.models import Produto
+
+    faltam = total - Produto.all_objects.count()
+    rng = random.Random(SEMENTE)
+    lote = []
+    for dados in gerar_produtos(max(faltam, 0), rng):
+        lote.append(Produto(**dados))
+        if len(lote) == batch_size:
+            Produto.objects.bulk_create(lote)
+            lote = []
+    Produto.objects.bulk_create(lote)
+    return max(faltam, 0)
+
+
+def medir(consulta, repeticoes):
+    latencias = []
+    for _ in range(repeticoes):
+        start = time.perf_counter()
+        list(consulta())
+        latencias.append(time.perf_counter() - start)
+    return latencias
+
+
+def run(total, page_size, repeticoes, batch_size):
+    from app.busca import buscar
+    from app.models import Produto
+    from django.db.models import Q
+
+    start = time.perf_counter()
+    inseridos = preencher(total, batch_size)
+    carga = time.perf_counter() - start
+
+    # The scan does not ignore accents, it is only a baseline
+    resultados = {}
+    for busca in buscas(random.Random(SEMENTE)):
+        palavra = busca.split()[0]
+        resultados[busca] = {
+            "matches": buscar(Produto.objects.all(), busca).count(),
+            "search": summary(
+                medir(
+                    lambda: buscar(Produto.objects.all(), busca)[:page_size],
+                    repeticoes,
+                )
+            ),
+            "icontains_scan": summary(
+                medir(
+                    lambda: Produto.objects.filter(
+                        Q(nome__icontains=palavra)
+                        | Q(descricao__icontains=palavra)
+                    ).order_by("nome", "id")[:page_size],
+                    repeticoes,
+                )
+            ),
+        }
+    return {
+        "produtos": Produto.all_objects.count(),
+        "inserted": inseridos,
+        "load_seconds": round(carga, 1),
+        "searches": resultados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nivelamento.settings")
+    import django
+
+    django.setup()
+    result = run(args.produtos, args.page_size, args.repeat, args.batch_size)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
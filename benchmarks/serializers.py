@@ -0,0 +1,139 @@
+"""DRF serializers against their compiled read path on 10k-row lists.
+
+Times querying, serializing and rendering the same rows both ways and
+checks that the JSON is byte-identical. Adds the rows it needs to the
+configured database, so point it at a scratch database:
+
+    export DB_NAME=/tmp/serializers.sqlite3 SECRET_KEY=x
+    python manage.py migrate
+    python -m benchmarks.serializers --rows 10000
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import time
+
+from .search import preencher
+
+
+def preencher_pedidos(total_itens, itens_por_pedido=10):
+    from app.models import Pedido, PedidoProduto, Produto, Usuario
+
+    usuario, _ = Usuario.objects.get_or_create(
+        email="serializers@example.com",
+        defaults={"username": "serializers", "cpf": "x", "rg": "x"},
+    )
+    faltam = (
+        total_itens
+        - PedidoProduto.objects.filter(pedido__usuario=usuario).count()
+    )
+    produtos = list(
+        Produto.objects.values_list("pk", flat=True)[:itens_por_pedido]
+    )
+    pedidos = Pedido.objects.bulk_create(
+        Pedido(usuario=usuario, endereco="Rua x")
+        for _ in range(max(faltam, 0) // itens_por_pedido)
+    )
+    PedidoProduto.objects.bulk_create(
+        (
+            PedidoProduto(pedido=pedido, produto_id=produto, quantidade=1)
+            for pedido in pedidos
+            for produto in produtos
+        ),
+        batch_size=5000,
+    )
+    return usuario
+
+
+def medir(render, repeticoes):
+    latencias = []
+    for _ in range(repeticoes):
+        gc.collect()
+        start = time.perf_counter()
+        body = render()
+        latencias.append(time.perf_counter() - start)
+    return body, statistics.median(latencias) * 1000
+
+
+def comparar(serializer, queryset, repeticoes):
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+    compiled = serializer.compiled()
+    drf, drf_ms = medir(
+        lambda: renderer.render(
+            type(serializer)(
+                list(queryset), many=True, context=serializer.context
+            ).data
+        ),
+        repeticoes,
+    )
+    rapido, compiled_ms = medir(
+        lambda: renderer.render(
+            compiled.represent(compiled.values(queryset), queryset.db)
+        ),
+        repeticoes,
+    )
+    return {
+        "bytes": len(drf),
+        "identical": drf == rapido,
+        "drf_ms": round(drf_ms, 1),
+        "compiled_ms": round(compiled_ms, 1),
+        "speedup": round(drf_ms / compiled_ms, 1),
+    }
+
+
+def run(rows, repeticoes):
+    from app.api.serializers import PedidoProdutoSerializer, PedidoSerializer
+    from app.api.serializers import ProdutoSerializer
+    from app.api.views import with_produto
+    from app.models import Pedido, PedidoProduto, Produto
+    from django.db.models import Prefetch
+
+    preencher(rows, 5000)
+    usuario = preencher_pedidos(rows)
+    itens = PedidoProduto.objects.filter(pedido__usuario=usuario)
+    pedidos = Pedido.objects.filter(usuario=usuario).order_by("-feito", "-id")
+
+    resultados = {}
+    resultados["produtos"] = comparar(
+        ProdutoSerializer(),
+        Produto.objects.order_by("nome", "id")[:rows],
+        repeticoes,
+    )
+    resultados["itens?expand=produto"] = comparar(
+        PedidoProdutoSerializer(context={"expand": frozenset({"produto"})}),
+        with_produto(itens.order_by("pk"))[:rows],
+        repeticoes,
+    )
+    expand = frozenset({"itens", "itens.produto"})
+    resultados["pedidos?expand=itens.produto"] = comparar(
+        PedidoSerializer(context={"expand": expand}),
+        pedidos.prefetch_related(
+            Prefetch(
+                "pedidoproduto_set",
+                queryset=with_produto(PedidoProduto.objects.all()),
+            )
+        )[: rows // 10],
+        repeticoes,
+    )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nivelamento.settings")
+    import django
+
+    django.setup()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Load benchmark of every API endpoint, comparable between commits.
+
+Seeds a scaled dataset into the configured database, starts a local
+server on it (or uses --url, for a server on the same database) and runs
+concurrent clients against each endpoint in turn. Reports throughput,
+latency percentiles and the SQL queries per request that the server's
+/api/_metrics counted. Point it at a scratch database:
+
+    export DB_NAME=/tmp/carga.sqlite3 SECRET_KEY=x
+    python manage.py migrate
+    python -m benchmarks.suite --seed --output base.json
+    git checkout <outro-commit>
+    python -m benchmarks.suite --output novo.json --compare base.json
+
+With --compare it exits with status 1 when an endpoint's p95 latency
+grew or its throughput fell by more than --threshold percent, or when
+it runs over half a query more per request.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .client import request, summary
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN = "admin@carga.example.com"
+
+METRICA = re.compile(r"^(\w+)\{(.*)\} (\S+)$")
+ROTULO = re.compile(r'(\w+)="([^"]*)"')
+
+
+def semear(usuarios, produtos, pedidos_por_usuario, senha):
+    """Fills the database up to the given generated usuarios and produtos."""
+    from app.geracao import DOMINIO, semear as gerar
+    from app.models import Produto, Usuario
+    from django.contrib.auth.hashers import make_password
+
+    # Hashing once, every usuario and the admin share the password
+    encoded = make_password(senha)
+    Usuario.objects.get_or_create(
+        email=ADMIN,
+        defaults={
+            "username": "carga-admin",
+            "password": encoded,
+            "is_staff": True,
+            "is_superuser": True,
+            "cpf": "x",
+            "rg": "x",
+        },
+    )
+    gerados = Usuario.all_objects.filter(email__endswith=f"@{DOMINIO}")
+    for _ in gerar(
+        max(usuarios - gerados.count(), 0),
+        max(produtos - Produto.all_objects.count(), 0),
+        pedidos_por_usuario,
+        encoded,
+    ):
+        pass
+
+
+def contagens():
+    from app.db.shards import fanout_count
+    from app.models import Pedido, PedidoProduto, Produto, Usuario
+
+    return {
+        "usuarios": Usuario.objects.count(),
+        "produtos": Produto.objects.count(),
+        "pedidos": fanout_count(Pedido.objects.all()),
+        "itens": fanout_count(PedidoProduto.objects.all()),
+    }
+
+
+@contextmanager
+def servidor():
+    """`manage.py runserver` on a free port, for the duration of the block."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    url = f"http://127.0.0.1:{porta}"
+    processo = subprocess.Popen(
+        [sys.executable, "manage.py", "runserver", f"127.0.0.1:{porta}"]
+        + ["--noreload"],
+        cwd=BASE_DIR,
+        env={**os.environ, "ALLOWED_HOSTS": "127.0.0.1"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if processo.poll() is not None:
+                raise SystemExit(f"runserver exited with {processo.returncode}")
+            try:
+                request(f"{url}/api/_metrics")
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit("runserver did not start in 30s")
+                time.sleep(0.2)
+        yield url
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def login(url, email, senha):
+    status, body = request(
+        f"{url}/api/token/", {"email": email, "password": senha}
+    )
+    if status != 200:
+        raise SystemExit(f"Login of {email} failed with {status}: {body!r}")
+    return json.loads(body)["access"]
+
+
+def clientes(url, concorrencia, senha):
+    """One logged-in usuario per client, with its latest pedidos."""
+    from app.geracao import DOMINIO, SEMENTE
+    from app.models import Usuario
+
+    emails = list(
+        Usuario.objects.filter(email__endswith=f"@{DOMINIO}")
+        .order_by("email")
+        .values_list("email", flat=True)
+    )
+    if len(emails) < concorrencia:
+        raise SystemExit(
+            f"{len(emails)} generated usuarios for {concorrencia} clients;"
+            " seed more with --seed --users or lower --concurrency"
+        )
+    resultado = []
+    for conta in random.Random(SEMENTE).sample(emails, concorrencia):
+        token = login(url, conta, senha)
+        _, body = request(f"{url}/api/pedidos/?page_size=10", token=token)
+        pedidos = [pedido["id"] for pedido in json.loads(body)["results"]]
+        resultado.append((conta, token, pedidos))
+    return resultado
+
+
+def cenarios(url, clientes, senha):
+    """{name: (view, method, [(token, requests) of each client])}."""
+    _, body = request(f"{url}/api/produtos/?page_size=20")
+    produtos = [produto["id"] for produto in json.loads(body)["results"]]
+    return {
+        "token": (
+            "token-obtain",
+            "POST",
+            [
+                (None, [(f"{url}/api/token/", {"email": e, "password": senha})])
+                for e, _, _ in clientes
+            ],
+        ),
+        "produtos": (
+            "produto-list",
+            "GET",
+            [
+                (token, [(f"{url}/api/produtos/", None)])
+                for _, token, _ in clientes
+            ],
+        ),
+        "produto": (
+            "produto-detail",
+            "GET",
+            [
+                (
+                    token,
+                    [(f"{url}/api/produtos/{pk}/", None) for pk in produtos],
+                )
+                for _, token, _ in clientes
+            ],
+        ),
+        "pedidos": (
+            "pedido-list",
+            "GET",
+            [
+                (token, [(f"{url}/api/pedidos/", None)])
+                for _, token, _ in clientes
+            ],
+        ),
+        "pedido_produtos": (
+            "pedidoproduto-list",
+            "GET",
+            [
+                (
+                    token,
+                    [
+                        (f"{url}/api/pedidos/{pk}/produtos/", None)
+                        for pk in pedidos
+                    ],
+                )
+                for _, token, pedidos in clientes
+                if pedidos
+            ],
+        ),
+    }
+
+
+def metricas(url, token):
+    """{(name, view, method): value} of the server's request metrics."""
+    _, body = request(f"{url}/api/_metrics", token=token)
+    valores = {}
+    for linha in body.decode().splitlines():
+        match = METRICA.match(linha)
+        if match is None:
+            continue
+        nome, rotulos, valor = match.groups()
+        rotulos = dict(ROTULO.findall(rotulos))
+        if "le" not in rotulos:
+            chave = (nome, rotulos.get("view"), rotulos.get("method"))
+            valores[chave] = float(valor)
+    return valores
+
+
+def worker(chamadas, token, deadline, latencies, statuses, lock):
+    i = 0
+    while time.monotonic() < deadline:
+        url, data = chamadas[i % len(chamadas)]
+        start = time.perf_counter()
+        status, _ = request(url, data, token=token)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+        i += 1
+
+
+def medir(url, admin, view, method, clientes, duration):
+    for token, chamadas in clientes:
+        # Warms the server's caches, the catalog's included
+        request(*chamadas[0], token=token)
+    antes = metricas(url, admin)
+    deadline = time.monotonic() + duration
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(chamadas, token, deadline, latencies, statuses, lock),
+        )
+        for token, chamadas in clientes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    depois = metricas(url, admin)
+
+    def delta(nome):
+        chave = (nome, view, method)
+        return depois.get(chave, 0) - antes.get(chave, 0)
+
+    servidas = delta("http_request_duration_seconds_count")
+    consultas = delta("http_request_sql_queries_total")
+    sucesso = sum(n for status, n in statuses.items() if status < 400)
+    return {
+        "concurrency": len(threads),
+        "requests_per_second": round(sucesso / duration, 1),
+        "statuses": dict(statuses),
+        "latency_ms": summary(latencies),
+        "queries_per_request": (
+            round(consultas / servidas, 2) if servidas else None
+        ),
+    }
+
+
+def run(url, concorrencia, duration, senha):
+    admin = login(url, ADMIN, senha)
+    logados = clientes(url, concorrencia, senha)
+    resultados = {}
+    for nome, (view, method, chamadas) in cenarios(url, logados, senha).items():
+        if chamadas:
+            resultados[nome] = medir(
+                url, admin, view, method, chamadas, duration
+            )
+    return resultados
+
+
+def regressoes(atual, base, threshold):
+    """Endpoints slower, with less throughput or more queries than `base`."""
+    limite = 1 + threshold / 100
+    encontradas = []
+    for nome, novo in atual["endpoints"].items():
+        antigo = base["endpoints"].get(nome)
+        if antigo is None:
+            continue
+        if novo["latency_ms"]["p95"] > antigo["latency_ms"]["p95"] * limite:
+            encontradas.append(
+                f"{nome}: p95 {antigo['latency_ms']['p95']:.1f} ms -> "
+                f"{novo['latency_ms']['p95']:.1f} ms"
+            )
+        if novo["requests_per_second"] * limite < antigo["requests_per_second"]:
+            encontradas.append(
+                f"{nome}: {antigo['requests_per_second']} req/s -> "
+                f"{novo['requests_per_second']} req/s"
+            )
+        consultas = (antigo["queries_per_request"], novo["queries_per_request"])
+        if None not in consultas and consultas[1] > consultas[0] + 0.5:
+            encontradas.append(
+                f"{nome}: {consultas[0]} queries/request -> {consultas[1]}"
+            )
+    return encontradas
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", help="A server on the same database (default: start one)."
+    )
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--produtos", type=int, default=100_000)
+    parser.add_argument(
+        "--pedidos-per-user",
+        type=int,
+        default=20,
+        help="Average, for the usuarios seeded now (20: about 1M items).",
+    )
+    parser.add_argument("--password", default="carga-senha")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output", help="Also write the report here.")
+    parser.add_argument("--compare", help="Report of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nivelamento.settings")
+    import django
+
+    django.setup()
+    if args.seed:
+        start = time.perf_counter()
+        semear(args.users, args.produtos, args.pedidos_per_user, args.password)
+        print(f"Seeded in {time.perf_counter() - start:.0f}s", file=sys.stderr)
+
+    report = {
+        "label": args.label,
+        "commit": commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "rows": contagens(),
+        "duration": args.duration,
+    }
+    if args.url:
+        url = args.url.rstrip("/")
+        report["endpoints"] = run(
+            url, args.concurrency, args.duration, args.password
+        )
+    else:
+        with servidor() as url:
+            report["endpoints"] = run(
+                url, args.concurrency, args.duration, args.password
+            )
+
+    encontradas = []
+    if args.compare:
+        with open(args.compare) as arquivo:
+            base = json.load(arquivo)
+        encontradas = regressoes(report, base, args.threshold)
+        report["compared_to"] = base.get("commit")
+        report["regressions"] = encontradas
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as arquivo:
+            arquivo.write(text + "\n")
+    if encontradas:
+        print("\n".join(encontradas), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 import os
 from datetime import timedelta
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,7 +28,8 @@ SECRET_KEY = config("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config("DEBUG", default=False, cast=bool)
 
-ALLOWED_HOSTS = []
+# Comma-separated host names this site serves, required when DEBUG is off
+ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="", cast=Csv())
 
 
 # Application definition
@@ -44,10 +45,11 @@ INSTALLED_APPS = [
     "safedelete",
     "rest_framework",
     # project apps
-    "app",
+    "app.apps.Config",
 ]
 
 MIDDLEWARE = [
+    "app.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -89,6 +91,76 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD", default=""),
         "HOST": config("DB_HOST", default=""),
         "PORT": config("DB_PORT", default=""),
+        # Seconds a connection is kept between requests (0 closes it after
+        # every request); keep 0 with the pooled backend, which returns it
+        # to the pool instead
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=0, cast=int),
+        # Check that a reused connection still works before using it
+        "CONN_HEALTH_CHECKS": config(
+            "DB_CONN_HEALTH_CHECKS", default=False, cast=bool
+        ),
+        # Only used by the app.db.backends.postgresql engine
+        "POOL": {
+            "SIZE": config("DB_POOL_SIZE", default=10, cast=int),
+            "TIMEOUT": config("DB_POOL_TIMEOUT", default=5, cast=float),
+            "MAX_AGE": config("DB_POOL_MAX_AGE", default=1800, cast=int),
+        },
+    }
+}
+
+# Read replicas share the primary's settings except for their NAME (e.g.
+# another SQLite file) and HOST; list reads of the API go to them
+DB_REPLICA_NAMES = config("DB_REPLICA_NAMES", default="", cast=Csv())
+DB_REPLICA_HOSTS = config("DB_REPLICA_HOSTS", default="", cast=Csv())
+DATABASE_REPLICAS = []
+for i in range(max(len(DB_REPLICA_NAMES), len(DB_REPLICA_HOSTS))):
+    alias = f"replica_{i + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "TEST": {"MIRROR": "default"},
+    }
+    if i < len(DB_REPLICA_NAMES):
+        DATABASES[alias]["NAME"] = DB_REPLICA_NAMES[i]
+    if i < len(DB_REPLICA_HOSTS):
+        DATABASES[alias]["HOST"] = DB_REPLICA_HOSTS[i]
+    DATABASE_REPLICAS.append(alias)
+
+# Shards hold the pedidos and items of the usuarios hashed to them; like
+# replicas they share the primary's settings except for NAME and HOST
+DB_SHARD_NAMES = config("DB_SHARD_NAMES", default="", cast=Csv())
+DB_SHARD_HOSTS = config("DB_SHARD_HOSTS", default="", cast=Csv())
+DATABASE_SHARDS = []
+for i in range(max(len(DB_SHARD_NAMES), len(DB_SHARD_HOSTS))):
+    alias = f"shard_{i + 1}"
+    DATABASES[alias] = dict(DATABASES["default"])
+    if i < len(DB_SHARD_NAMES):
+        DATABASES[alias]["NAME"] = DB_SHARD_NAMES[i]
+    if i < len(DB_SHARD_HOSTS):
+        DATABASES[alias]["HOST"] = DB_SHARD_HOSTS[i]
+    DATABASE_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    "app.db.routers.ShardRouter",
+    "app.db.routers.ReplicaRouter",
+]
+
+TEST_RUNNER = "app.tests.runner.ShardAwareRunner"
+
+# After writing a pedido, a user reads from the primary for this long
+DATABASE_REPLICA_STICKY_SECONDS = config(
+    "DB_REPLICA_STICKY_SECONDS", default=5, cast=int
+)
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="nivelamento"),
     }
 }
 
@@ -142,15 +214,56 @@ STATIC_URL = "/static/"
 
 AUTH_USER_MODEL = "app.Usuario"
 
+AUTHENTICATION_BACKENDS = ["app.api.hashing.PooledPasswordBackend"]
+
+# API logins hash on this many threads with this many more waiting; past
+# that the token endpoint answers 429 with Retry-After (seconds)
+PASSWORD_HASHING_WORKERS = config(
+    "PASSWORD_HASHING_WORKERS", default=2, cast=int
+)
+PASSWORD_HASHING_QUEUE = config("PASSWORD_HASHING_QUEUE", default=16, cast=int)
+PASSWORD_HASHING_RETRY_AFTER = config(
+    "PASSWORD_HASHING_RETRY_AFTER", default=5, cast=int
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "app.api.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
 
+API_PAGE_SIZE = config("API_PAGE_SIZE", default=50, cast=int)
+
+# Serialize the produto, pedido and item lists from .values() rows instead
+# of model instances
+API_COMPILED_SERIALIZERS = config(
+    "API_COMPILED_SERIALIZERS", default=True, cast=bool
+)
+
+# Rows fetched per database round trip by the streaming exports
+API_EXPORT_CHUNK_SIZE = config("API_EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Server-side cache lifetime and client max-age for public catalog reads
+CATALOG_CACHE_TIMEOUT = config("CATALOG_CACHE_TIMEOUT", default=300, cast=int)
+CATALOG_MAX_AGE = config("CATALOG_MAX_AGE", default=60, cast=int)
+
+# Serve the hot read routes as async views under ASGI; their ORM work runs
+# on a pool of ASYNC_READ_WORKERS threads
+ASYNC_READ_VIEWS = config("ASYNC_READ_VIEWS", default=False, cast=bool)
+ASYNC_READ_WORKERS = config("ASYNC_READ_WORKERS", default=8, cast=int)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
 }
+
+# Per-process cache of authenticated users; 0 disables it. With the lazy
+# option a user is only loaded when something other than its id is used
+AUTH_USER_CACHE_SIZE = config("AUTH_USER_CACHE_SIZE", default=1024, cast=int)
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=60, cast=int)
+AUTH_USER_LAZY = config("AUTH_USER_LAZY", default=False, cast=bool)
+
+# Soft-deleted rows older than this are moved to the archive table
+ARCHIVE_RETENTION_DAYS = config("ARCHIVE_RETENTION_DAYS", default=90, cast=int)